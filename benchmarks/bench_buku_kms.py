@@ -0,0 +1,66 @@
+# benchmarks/bench_buku_kms.py
+# Jalankan dari root repo: python -m benchmarks.bench_buku_kms [jumlah_balita]
+#
+# Buku KMS untuk ~150 balita: membandingkan pengambilan riwayat satu query per
+# anak dengan satu query `in_`, memperkirakan waktu render cara lama (savefig
+# PNG dpi 200 per grafik) dari sampel, lalu membuat buku lengkap dengan
+# `generate_buku_kms` (process pool dari `KMS_RENDER_WORKERS` bila > 1) dan
+# memeriksa batas waktunya.
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.data_contoh import TANGGAL_POSYANDU, buat_data_contoh
+from buku_kms import siapkan_riwayat_kms, generate_buku_kms
+from data_utils import fetch_table
+from fake_supabase import FakeSupabaseClient
+from kms_charts import JENIS_GRAFIK_KMS, get_kms_process_pool, render_kms_chart
+from laporan import anak_buku_kms, siapkan_warga, siapkan_pemeriksaan_harian
+
+BATAS_DETIK = 60
+SAMPEL_CARA_LAMA = 5
+
+
+def main(target_balita=150):
+    # Sekitar 0,32 balita hadir per warga pada data contoh
+    data = buat_data_contoh(n_warga=int(target_balita / 0.32))
+    client = FakeSupabaseClient(data)
+    tanggal = TANGGAL_POSYANDU[-1]
+    df_warga = siapkan_warga(pd.DataFrame(data["warga"]), tanggal)
+    df_pemeriksaan = pd.DataFrame(data["pemeriksaan"])
+    df_harian = siapkan_pemeriksaan_harian(df_pemeriksaan[df_pemeriksaan["tanggal_pemeriksaan"] == str(tanggal)])
+    df_anak = anak_buku_kms(df_warga, df_harian, tanggal)
+    print(f"{len(df_anak)} balita hadir pada {tanggal}")
+
+    # --- Pengambilan riwayat ---
+    awal, mulai = client.jumlah_request, time.perf_counter()
+    for warga_id in df_anak["id"]:
+        fetch_table(client, "pemeriksaan", apply_filters=lambda q: q.eq("warga_id", warga_id))
+    print(f"Per anak : {client.jumlah_request - awal:4d} request, {time.perf_counter() - mulai:.2f} s")
+    awal, mulai = client.jumlah_request, time.perf_counter()
+    df_riwayat, _ = fetch_table(client, "pemeriksaan", apply_filters=lambda q: q.in_("warga_id", df_anak["id"].tolist()))
+    print(f"Bulk in_ : {client.jumlah_request - awal:4d} request, {time.perf_counter() - mulai:.2f} s")
+    riwayat = siapkan_riwayat_kms(df_riwayat, df_anak, tanggal)
+
+    # --- Render cara lama (sampel, diekstrapolasi) ---
+    mulai = time.perf_counter()
+    for warga_id in list(riwayat)[:SAMPEL_CARA_LAMA]:
+        history_df = riwayat[warga_id]
+        for chart_type in JENIS_GRAFIK_KMS:
+            render_kms_chart(chart_type, history_df, history_df.iloc[-1]["jenis_kelamin"], history_df.iloc[-1])
+    per_anak = (time.perf_counter() - mulai) / SAMPEL_CARA_LAMA
+    print(f"Cara lama: {per_anak:.2f} s per anak -> perkiraan {per_anak * len(riwayat):.0f} s untuk {len(riwayat)} anak")
+
+    # --- Buku KMS lengkap ---
+    executor = get_kms_process_pool()
+    mulai = time.perf_counter()
+    pdf = generate_buku_kms(df_anak, riwayat, tanggal, executor=executor)
+    durasi = time.perf_counter() - mulai
+    worker = executor._max_workers if executor is not None else 1
+    print(f"Buku KMS : {durasi:.1f} s ({worker} worker), {len(pdf) / 2**20:.1f} MB")
+    assert durasi < BATAS_DETIK, f"Buku KMS {len(riwayat)} anak butuh {durasi:.1f} s (batas {BATAS_DETIK} s)"
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 150)
@@ -0,0 +1,78 @@
+# benchmarks/bench_import_halaman.py
+# Jalankan dari root repo: python -m benchmarks.bench_import_halaman [ulangan]
+#
+# Mengukur muat pertama setiap halaman di proses Python baru (seperti container
+# yang baru dinyalakan) dan mencatat pustaka berat yang ikut ter-import.
+# Streamlit, pandas, dan supabase sudah dimuat sebelum pengukuran karena
+# selalu dimuat server/halaman login; yang diukur adalah biaya halaman itu sendiri.
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Pustaka yang seharusnya baru dimuat ketika benar-benar dipakai
+MODUL_BERAT = ["matplotlib", "reportlab", "plotly.express", "PIL.Image", "kms_charts", "chart_export", "laporan_pdf", "buku_kms"]
+
+# (halaman, tombol yang diklik setelah muat pertama atau None)
+SKENARIO = [
+    ("pages/1_Manajemen_Warga.py", None),
+    ("pages/2_Input_Pemeriksaan.py", None),
+    ("pages/3_Dashboard_Laporan.py", None),
+    ("pages/3_Dashboard_Laporan.py", "Buat dan Unduh Laporan PDF"),
+]
+
+
+def ukur_satu(halaman, tombol=None):
+    """Dijalankan di proses anak: muat halaman (dan klik `tombol`), kembalikan waktu dan modul berat."""
+    import pandas  # noqa: F401
+    import streamlit  # noqa: F401
+    import supabase  # noqa: F401
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.data_contoh import buat_client_contoh
+
+    os.environ.setdefault("LOCAL_MIRROR_PATH", "")
+    os.environ.setdefault("KMS_CACHE_DIR", "")
+    logging.disable(logging.WARNING)
+
+    at = AppTest.from_file(os.path.abspath(halaman), default_timeout=120)
+    at.session_state["authenticated"] = True
+    at.session_state["supabase_client"] = buat_client_contoh()
+    modul_awal = set(sys.modules)
+    mulai = time.perf_counter()
+    at.run()
+    hasil = {"muat": time.perf_counter() - mulai}
+    if tombol is not None:
+        mulai = time.perf_counter()
+        next(b for b in at.button if b.label == tombol).click().run()
+        hasil["klik"] = time.perf_counter() - mulai
+    assert not at.exception, at.exception
+    baru = set(sys.modules) - modul_awal
+    hasil["modul"] = [m for m in MODUL_BERAT if m in baru]
+    return hasil
+
+
+def main(ulangan=3):
+    for halaman, tombol in SKENARIO:
+        runs = []
+        for _ in range(ulangan):
+            keluaran = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_import_halaman", "--anak", halaman, tombol or ""],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            runs.append(json.loads(keluaran.strip().splitlines()[-1]))
+        muat = statistics.median(r["muat"] for r in runs)
+        teks = f"{os.path.basename(halaman):<28} muat {muat:5.2f} s"
+        if tombol:
+            teks += f" + klik '{tombol}' {statistics.median(r['klik'] for r in runs):5.2f} s"
+        print(f"{teks:<80} | dimuat: {', '.join(runs[-1]['modul']) or '-'}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--anak":
+        print(json.dumps(ukur_satu(sys.argv[2], sys.argv[3] or None)))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
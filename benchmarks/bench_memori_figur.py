@@ -0,0 +1,81 @@
+# benchmarks/bench_memori_figur.py
+# Jalankan dari root repo: python -m benchmarks.bench_memori_figur [jumlah_rerun]
+#
+# Uji regresi memori: menjalankan halaman Dashboard berulang kali (dengan filter
+# berganti-ganti seperti pengguna sungguhan) dan memastikan RSS proses tetap datar
+# serta tidak ada figure yang tertinggal di registri pyplot.
+#
+# Repo ini tidak punya test runner, jadi pemeriksaan ini berupa skrip benchmark
+# yang gagal (AssertionError, kode keluar bukan nol) bila figure bocor atau RSS
+# naik melewati batas; bisa dipasang langsung sebagai langkah CI.
+import gc
+import logging
+import os
+import sys
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from benchmarks.data_contoh import buat_client_contoh
+from figure_utils import pool_figure
+
+# Toleransi pertumbuhan RSS setelah pemanasan (cache, import, font)
+BATAS_KENAIKAN_MB = 25
+RERUN_PEMANASAN = 20
+
+
+def rss_mb():
+    """RSS proses saat ini dalam MB (Linux: /proc/self/statm; lainnya: puncak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        puncak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return puncak / 2**20 if sys.platform == "darwin" else puncak / 1024
+
+
+def main(jumlah_rerun=200):
+    if jumlah_rerun <= RERUN_PEMANASAN:
+        sys.exit(f"jumlah_rerun harus lebih dari {RERUN_PEMANASAN} (rerun pemanasan), bukan {jumlah_rerun}")
+    from streamlit.testing.v1 import AppTest
+
+    os.environ.setdefault("LOCAL_MIRROR_PATH", "")
+    os.environ.setdefault("KMS_CACHE_DIR", "")
+    logging.disable(logging.WARNING)
+
+    at = AppTest.from_file(os.path.abspath("pages/3_Dashboard_Laporan.py"), default_timeout=120)
+    at.session_state["authenticated"] = True
+    at.session_state["supabase_client"] = buat_client_contoh()
+    at.run()
+    assert not at.exception, at.exception
+
+    pilihan = {s.label: s.options for s in at.selectbox}
+    wilayah, gender = pilihan["Wilayah"], pilihan["Jenis Kelamin"]
+
+    rss_awal = None
+    for i in range(1, jumlah_rerun + 1):
+        for s in at.selectbox:
+            if s.label == "Wilayah":
+                s.select(wilayah[i % len(wilayah)])
+            elif s.label == "Jenis Kelamin":
+                s.select(gender[(i // len(wilayah)) % len(gender)])
+        at.run()
+        assert not at.exception, at.exception
+        if i == RERUN_PEMANASAN:
+            gc.collect()
+            rss_awal = rss_mb()
+        if i % 20 == 0:
+            print(f"rerun {i:>4} | RSS {rss_mb():7.1f} MB | figure pyplot terbuka: {len(plt.get_fignums())} "
+                  f"| pool: dibuat {pool_figure.dibuat}, dipakai ulang {pool_figure.dipakai_ulang}")
+
+    gc.collect()
+    kenaikan = rss_mb() - rss_awal
+    print(f"Kenaikan RSS setelah rerun ke-{RERUN_PEMANASAN}: {kenaikan:+.1f} MB (batas {BATAS_KENAIKAN_MB} MB)")
+    assert not plt.get_fignums(), f"{len(plt.get_fignums())} figure pyplot tidak ditutup"
+    assert kenaikan < BATAS_KENAIKAN_MB, f"RSS naik {kenaikan:.1f} MB selama {jumlah_rerun} rerun"
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
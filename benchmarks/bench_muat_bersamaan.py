@@ -0,0 +1,94 @@
+# benchmarks/bench_muat_bersamaan.py
+# Jalankan dari root repo: python -m benchmarks.bench_muat_bersamaan [latensi_ms]
+#
+# Muat awal halaman dengan cache kosong: query berurutan (cara lama) dibanding
+# `muat_bersamaan`, memakai client Supabase palsu yang menambahkan latensi
+# jaringan tiruan per request. Diukur dua konfigurasi:
+# - mirror lokal aktif (default deployment): mirror sudah terisi, jadi setiap
+#   loader melakukan sinkron delta per tabel lalu membaca SQLite;
+# - mirror mati: setiap loader query langsung ke "server".
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import streamlit as st
+
+from benchmarks.data_contoh import buat_data_contoh
+from data_utils import (
+    get_local_mirror, load_table, load_tanggal_pemeriksaan, load_riwayat_pemeriksaan, muat_bersamaan, format_waktu_muat,
+)
+from fake_supabase import FakeSupabaseClient
+from skema import KOLOM_WARGA_RINGKAS, KOLOM_PEMERIKSAAN_RIWAYAT
+
+ULANGAN = 5
+ID_WARGA_DIPILIH = 1
+
+# Loader yang dipanggil bersamaan oleh setiap halaman, dengan argumen yang sama seperti di halaman
+HALAMAN = {
+    "3_Dashboard_Laporan": lambda c: {
+        "warga": (load_table, c, "warga", KOLOM_WARGA_RINGKAS), "tanggal": (load_tanggal_pemeriksaan, c),
+    },
+    "1_Manajemen_Warga (warga dipilih)": lambda c: {
+        "warga": (load_table, c, "warga"),
+        "pemeriksaan": (load_riwayat_pemeriksaan, c, [ID_WARGA_DIPILIH], KOLOM_PEMERIKSAAN_RIWAYAT),
+    },
+}
+
+
+class ClientLambat(FakeSupabaseClient):
+    """Client palsu dengan jeda `latensi` detik per request, di luar kunci agar request bisa tumpang tindih."""
+
+    def __init__(self, tables, latensi):
+        super().__init__(tables)
+        self.latensi = latensi
+
+    def _execute(self, query):
+        time.sleep(self.latensi)
+        return super()._execute(query)
+
+
+def berurutan(tugas):
+    hasil, waktu = {}, {}
+    for nama, (fungsi, *args) in tugas.items():
+        mulai = time.perf_counter()
+        hasil[nama] = fungsi(*args)
+        waktu[nama] = time.perf_counter() - mulai
+    return hasil, waktu
+
+
+def ukur(client, buat_tugas, cara):
+    durasi = []
+    for _ in range(ULANGAN):
+        st.cache_data.clear()
+        awal, mulai = client.jumlah_request, time.perf_counter()
+        _, waktu = cara(buat_tugas(client))
+        durasi.append(time.perf_counter() - mulai)
+    return statistics.median(durasi), waktu, client.jumlah_request - awal
+
+
+def main(latensi_ms=80):
+    logging.disable(logging.WARNING)
+    print(f"Latensi tiruan {latensi_ms} ms per request, cache kosong, median {ULANGAN} kali")
+    with tempfile.TemporaryDirectory() as folder:
+        for konfigurasi, path in (("mirror aktif", os.path.join(folder, "mirror.sqlite")), ("mirror mati", "")):
+            os.environ["LOCAL_MIRROR_PATH"] = path
+            get_local_mirror.clear()
+            client = ClientLambat(buat_data_contoh(n_warga=1_000), latensi_ms / 1000)
+            mirror = get_local_mirror()
+            if mirror is not None:
+                # Sinkron penuh pertama di luar pengukuran; setelah itu setiap muat adalah sinkron delta
+                for table_name in ("warga", "pemeriksaan"):
+                    mirror.sync(client, table_name)
+            print(f"-- {konfigurasi}")
+            for nama, buat_tugas in HALAMAN.items():
+                t_urut, _, jumlah = ukur(client, buat_tugas, berurutan)
+                t_sama, waktu, _ = ukur(client, buat_tugas, lambda tugas: muat_bersamaan(**tugas))
+                print(f"{nama:<34} {jumlah} request | berurutan {t_urut:5.2f} s | bersamaan {t_sama:5.2f} s "
+                      f"({format_waktu_muat(waktu)})")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
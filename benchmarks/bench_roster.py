@@ -0,0 +1,55 @@
+# benchmarks/bench_roster.py
+# Jalankan dari root repo: python -m benchmarks.bench_roster [jumlah_hadir] [latensi_ms]
+#
+# Mencatat satu pagi posyandu: satu insert per warga (form satu warga, cara lama)
+# dibanding roster (`validasi_roster` + satu insert bulk lewat `simpan_roster`).
+# Client Supabase palsu menambahkan latensi jaringan tiruan per request; waktu
+# rerun halaman per submit di cara lama tidak ikut dihitung.
+import datetime as dt
+import logging
+import os
+import sys
+import time
+
+from benchmarks.bench_muat_bersamaan import ClientLambat
+from benchmarks.data_contoh import buat_data_contoh
+from data_utils import load_table, load_pemeriksaan_harian
+from laporan import WILAYAH_SEMUA
+from roster import KELOMPOK_ROSTER, siapkan_roster, validasi_roster, simpan_roster
+from skema import KOLOM_WARGA_RINGKAS, KOLOM_PEMERIKSAAN_HADIR
+
+TANGGAL = dt.date(2025, 9, 1)
+KELOMPOK = "Remaja & Dewasa (>= 15 thn)"
+
+
+def isi_roster(roster, jumlah_hadir):
+    df_edit = roster.copy()
+    hadir = df_edit.index[:jumlah_hadir]
+    df_edit.loc[hadir, 'hadir'] = True
+    df_edit.loc[hadir, ['berat_badan_kg', 'tinggi_badan_cm', 'tensi_sistolik', 'tensi_diastolik']] = [62.5, 158.0, 120, 80]
+    return df_edit
+
+
+def main(jumlah_hadir=80, latensi_ms=80):
+    os.environ["LOCAL_MIRROR_PATH"] = ""
+    logging.disable(logging.WARNING)
+    kolom_ukur = KELOMPOK_ROSTER[KELOMPOK][2]
+    print(f"{jumlah_hadir} warga hadir, latensi tiruan {latensi_ms} ms per request")
+    for cara in ("satu per satu", "roster"):
+        client = ClientLambat(buat_data_contoh(n_warga=1_000), latensi_ms / 1000)
+        df_warga = load_table(client, "warga", KOLOM_WARGA_RINGKAS)
+        roster = siapkan_roster(
+            df_warga, load_pemeriksaan_harian(client, TANGGAL, KOLOM_PEMERIKSAAN_HADIR), TANGGAL, WILAYAH_SEMUA, KELOMPOK,
+        )
+        baris, _ = validasi_roster(isi_roster(roster, jumlah_hadir), TANGGAL, kolom_ukur)
+        awal, mulai = client.jumlah_request, time.perf_counter()
+        if cara == "roster":
+            simpan_roster(client, baris)
+        else:
+            for data in baris:
+                client.table("pemeriksaan").insert(data).execute()
+        print(f"{cara:<14} {client.jumlah_request - awal:3d} request, {time.perf_counter() - mulai:5.2f} s")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
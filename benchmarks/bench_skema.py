@@ -0,0 +1,55 @@
+# benchmarks/bench_skema.py
+# Jalankan dari root repo: python -m benchmarks.bench_skema [jumlah_warga]
+#
+# Ukuran payload dan memori per kebutuhan halaman: `select("*")` dengan tipe
+# bawaan pandas (cara lama) dibanding proyeksi kolom dari `skema` plus tipe
+# ringkas (`terapkan_skema`). Payload diukur sebagai JSON baris hasil query;
+# memori sebagai `memory_usage(deep=True)`. Mirror lokal dimatikan agar
+# proyeksi benar-benar dikirim ke "server".
+import json
+import logging
+import os
+import sys
+
+import streamlit as st
+
+from benchmarks.data_contoh import buat_client_contoh, TANGGAL_POSYANDU
+from data_utils import fetch_table, load_table, load_pemeriksaan_harian, load_riwayat_pemeriksaan
+from skema import SEMUA_KOLOM, KOLOM_WARGA_RINGKAS, KOLOM_PEMERIKSAAN_UKURAN, KOLOM_PEMERIKSAAN_KMS
+
+TANGGAL = TANGGAL_POSYANDU[-1]
+
+
+def _payload(client, table_name, columns):
+    df, _ = fetch_table(client, table_name, columns=columns)
+    return len(json.dumps(df.to_dict("records"), default=str).encode())
+
+
+def main(n_warga=2_000):
+    os.environ["LOCAL_MIRROR_PATH"] = ""
+    logging.disable(logging.WARNING)
+    client = buat_client_contoh(n_warga=n_warga)
+    id_warga = load_table(client, "warga", KOLOM_WARGA_RINGKAS)["id"]
+
+    # nama: (tabel untuk ukuran payload, fungsi muat dengan argumen proyeksi)
+    kebutuhan = {
+        "warga (dashboard/input)": ("warga", lambda kolom: load_table(client, "warga", kolom), KOLOM_WARGA_RINGKAS),
+        "pemeriksaan harian": (None, lambda kolom: load_pemeriksaan_harian(client, TANGGAL, kolom), KOLOM_PEMERIKSAAN_UKURAN),
+        "riwayat buku KMS": (None, lambda kolom: load_riwayat_pemeriksaan(client, id_warga, kolom), KOLOM_PEMERIKSAAN_KMS),
+        "pemeriksaan (semua)": ("pemeriksaan", lambda kolom: load_table(client, "pemeriksaan", kolom), KOLOM_PEMERIKSAAN_UKURAN),
+    }
+    print(f"{n_warga} warga; memori = select('*') tipe bawaan -> proyeksi + tipe ringkas")
+    for nama, (tabel, muat, proyeksi) in kebutuhan.items():
+        st.cache_data.clear()
+        semua, ringkas = muat(SEMUA_KOLOM), muat(proyeksi)
+        sebelum, sesudah = semua.attrs["memori"]["sebelum"], ringkas.attrs["memori"]["sesudah"]
+        baris = f"{nama:<24} {len(ringkas):>6} baris | memori {sebelum / 2**20:6.2f} MB -> {sesudah / 2**20:6.2f} MB " \
+                f"(hemat {1 - sesudah / sebelum:4.0%}; tipe ringkas saja {1 - semua.attrs['memori']['sesudah'] / sebelum:4.0%})"
+        if tabel:
+            payload_semua, payload_proyeksi = _payload(client, tabel, SEMUA_KOLOM), _payload(client, tabel, proyeksi)
+            baris += f" | payload {payload_semua / 2**20:5.2f} MB -> {payload_proyeksi / 2**20:5.2f} MB"
+        print(baris)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,74 @@
+# benchmarks/bench_sunburst.py
+# Jalankan dari root repo: python -m benchmarks.bench_sunburst
+#
+# Membandingkan diagram sunburst partisipasi yang dibangun dari data per warga
+# (kolom count=1) dengan yang dibangun dari tabel agregat `agregasi_hierarki`.
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from data_utils import agregasi_hierarki, kategorikan_usia
+
+PATH = ['total_label', 'rt', 'kategori_usia', 'jenis_kelamin']
+
+
+def data_warga(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'rt': rng.choice(['1', '2', '3', '4', '5', '6'], n),
+        'jenis_kelamin': rng.choice(['L', 'P'], n),
+        'kategori_usia': kategorikan_usia(pd.Series(rng.uniform(0, 90, n))),
+    })
+
+
+def sunburst_per_warga(df):
+    """Cara lama: satu baris per warga, Plotly yang mengagregasi hierarki."""
+    data = df.copy()
+    data['kategori_usia'] = data['kategori_usia'].astype(str)
+    data['jenis_kelamin'] = data['jenis_kelamin'].map({'L': 'Laki-laki', 'P': 'Perempuan'}).fillna('N/A')
+    data['rt'] = 'RT ' + data['rt'].astype(str)
+    data['count'] = 1
+    data['total_label'] = f'Total Hadir: {len(data)}'
+    return px.sunburst(data, path=PATH, values='count', color='rt')
+
+
+def sunburst_agregat(df):
+    """Cara baru: tabel agregat (satu baris per kombinasi) sebagai input."""
+    data = agregasi_hierarki(df, ['rt', 'kategori_usia', 'jenis_kelamin'])
+    data['kategori_usia'] = data['kategori_usia'].astype(str)
+    data['jenis_kelamin'] = data['jenis_kelamin'].map({'L': 'Laki-laki', 'P': 'Perempuan'}).fillna('N/A')
+    data['rt'] = 'RT ' + data['rt'].astype(str)
+    data['total_label'] = f"Total Hadir: {int(data['count'].sum())}"
+    return px.sunburst(data, path=PATH, values='count', color='rt')
+
+
+def ukur(fungsi, *args, ulang=7):
+    terbaik = float("inf")
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi(*args)
+        terbaik = min(terbaik, time.perf_counter() - mulai)
+    return terbaik, hasil
+
+
+def simpul(fig):
+    trace = fig.data[0]
+    return dict(zip(trace.ids, trace.values))
+
+
+def main():
+    for n in (5_000, 50_000, 200_000):
+        df = data_warga(n)
+        t_lama, fig_lama = ukur(sunburst_per_warga, df)
+        t_baru, fig_baru = ukur(sunburst_agregat, df)
+        assert simpul(fig_lama) == simpul(fig_baru), "Hierarki sunburst berbeda"
+        print(f"{n:>6} warga | per warga: {t_lama * 1000:7.1f} ms, {len(fig_lama.to_json()) / 1024:6.1f} KB "
+              f"| agregat: {t_baru * 1000:6.1f} ms, {len(fig_baru.to_json()) / 1024:6.1f} KB "
+              f"| {t_lama / t_baru:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# benchmarks/bench_supabase_pool.py
+# Jalankan dari root repo: python -m benchmarks.bench_supabase_pool [jumlah_sesi] [rtt_ms]
+#
+# Membandingkan client per login (cara lama: `create_client` publik + service
+# per sesi) dengan `SupabasePool` (satu httpx.Client bersama) untuk 20 sesi
+# bersamaan. Setiap sesi login lalu menjalankan beberapa query. Server adalah
+# tiruan Supabase lokal lewat HTTPS (sertifikat self-signed) yang menambahkan
+# jeda jaringan tiruan: 1 RTT per request dan 2 RTT per koneksi baru
+# (TCP + handshake TLS). Server tiruan hanya berbicara HTTP/1.1, jadi pool
+# diukur dengan HTTP/2 dimatikan (dengan HTTP/2, httpx menunggu negosiasi ALPN
+# koneksi pertama sebelum membuka koneksi lain, yang di sini hanya memperlambat).
+import datetime
+import json
+import os
+import socket
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from supabase import create_client
+
+from supabase_pool import SupabasePool, buat_http_client
+
+QUERY_PER_SESI = 5
+BARIS_WARGA = [{"id": i, "nama_lengkap": f"Warga {i}", "rt": str(i % 4 + 1)} for i in range(200)]
+SESI_AUTH = {
+    "access_token": "token", "refresh_token": "refresh", "token_type": "bearer", "expires_in": 3600,
+    "user": {
+        "id": "00000000-0000-0000-0000-000000000001", "aud": "authenticated", "email": "admin@posyandu.id",
+        "app_metadata": {}, "user_metadata": {}, "created_at": "2025-01-01T00:00:00Z",
+    },
+}
+
+
+def buat_sertifikat(folder):
+    """Sertifikat self-signed untuk localhost; httpx mempercayainya lewat SSL_CERT_FILE."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    kunci = ec.generate_private_key(ec.SECP256R1())
+    nama = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    sekarang = datetime.datetime.now(datetime.timezone.utc)
+    sertifikat = (
+        x509.CertificateBuilder().subject_name(nama).issuer_name(nama).public_key(kunci.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(sekarang - datetime.timedelta(days=1)).not_valid_after(sekarang + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(kunci, hashes.SHA256())
+    )
+    cert, key = os.path.join(folder, "cert.pem"), os.path.join(folder, "key.pem")
+    with open(cert, "wb") as f:
+        f.write(sertifikat.public_bytes(serialization.Encoding.PEM))
+    with open(key, "wb") as f:
+        f.write(kunci.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return cert, key
+
+
+class ServerTiruan(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, cert, key, rtt):
+        self.rtt = rtt
+        self.jumlah_koneksi = 0
+        self._lock = threading.Lock()
+        super().__init__(("localhost", 0), HandlerTiruan)
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(cert, key)
+        # Handshake dilakukan di thread handler, bukan di loop accept
+        self.socket = ctx.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+
+    def finish_request(self, request, client_address):
+        with self._lock:
+            self.jumlah_koneksi += 1
+        time.sleep(2 * self.rtt)
+        request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().finish_request(request, client_address)
+
+
+class HandlerTiruan(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _balas(self, isi):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.server.rtt)
+        data = json.dumps(isi).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._balas(BARIS_WARGA[:1] if "limit=1" in self.path else BARIS_WARGA)
+
+    def do_POST(self):
+        self._balas(SESI_AUTH if self.path.startswith("/auth/") else [])
+
+
+def sesi_lama(url):
+    """Alur login lama: client publik baru, sign in, client service baru; lalu query."""
+    mulai = time.perf_counter()
+    create_client(url, "anon").auth.sign_in_with_password({"email": "admin@posyandu.id", "password": "x"})
+    client = create_client(url, "service")
+    login = time.perf_counter() - mulai
+    return login, [_query(client) for _ in range(QUERY_PER_SESI)]
+
+
+def sesi_pool(pool):
+    """Alur login baru: client login dari pool, sign in, pinjam client service bersama; lalu query."""
+    mulai = time.perf_counter()
+    pool.client_login().auth.sign_in_with_password({"email": "admin@posyandu.id", "password": "x"})
+    client = pool.service
+    login = time.perf_counter() - mulai
+    return login, [_query(client) for _ in range(QUERY_PER_SESI)]
+
+
+def _query(client):
+    mulai = time.perf_counter()
+    client.table("warga").select("*").execute()
+    return time.perf_counter() - mulai
+
+
+def ukur(nama, server, jumlah_sesi, jalankan_sesi):
+    koneksi_awal = server.jumlah_koneksi
+    with ThreadPoolExecutor(max_workers=jumlah_sesi) as executor:
+        hasil = list(executor.map(lambda _: jalankan_sesi(), range(jumlah_sesi)))
+    login = [h[0] * 1000 for h in hasil]
+    query = [q * 1000 for h in hasil for q in h[1]]
+    p95 = statistics.quantiles(query, n=20)[-1]
+    print(f"{nama:<16} login median {statistics.median(login):6.0f} ms, maks {max(login):6.0f} ms | "
+          f"query median {statistics.median(query):5.0f} ms, p95 {p95:5.0f} ms | "
+          f"koneksi baru {server.jumlah_koneksi - koneksi_awal}")
+
+
+def main(jumlah_sesi=20, rtt_ms=30):
+    with tempfile.TemporaryDirectory() as folder:
+        cert, key = buat_sertifikat(folder)
+        os.environ["SSL_CERT_FILE"] = cert
+        server = ServerTiruan(cert, key, rtt_ms / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"https://localhost:{server.server_address[1]}"
+        print(f"{jumlah_sesi} sesi bersamaan, {QUERY_PER_SESI} query per sesi, RTT tiruan {rtt_ms} ms")
+
+        ukur("Client per login", server, jumlah_sesi, lambda: sesi_lama(url))
+        pool = SupabasePool(url, "anon", "service", http_client=buat_http_client(jumlah_sesi, http2=False))
+        ukur("Pool (dingin)", server, jumlah_sesi, lambda: sesi_pool(pool))
+        ukur("Pool (hangat)", server, jumlah_sesi, lambda: sesi_pool(pool))
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,105 @@
+# benchmarks/bench_tabel_pdf.py
+# Jalankan dari root repo: python -m benchmarks.bench_tabel_pdf
+#
+# Membandingkan tabel PDF satu `Table` besar (cara lama) dengan `tabel_panjang`
+# (potongan LongTable, gaya modul, konversi teks vektor), lalu membuat satu
+# laporan lengkap berisi ~5.000 baris hadir + tidak hadir dan memeriksa batas
+# waktu dan memori puncaknya.
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import legal
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+
+from benchmarks.data_contoh import buat_data_contoh, TANGGAL_POSYANDU
+from chart_export import ChartExporter
+from laporan import siapkan_warga, siapkan_pemeriksaan_harian, data_laporan
+from laporan_pdf import GAYA_TABEL_TIDAK_HADIR, tabel_panjang, generate_pdf_bytes
+
+# Batas untuk laporan lengkap 5.000 baris
+BATAS_DETIK = 30
+BATAS_MEMORI_MB = 100
+
+
+def data_tabel(n, seed=0):
+    rng = np.random.default_rng(seed)
+    berat = rng.normal(60, 10, n).round(1)
+    berat[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        "No": np.arange(1, n + 1),
+        "Nama Lengkap": [f"Warga {i}" for i in range(n)],
+        "Usia": "35 Tahun 2 Bulan",
+        "RT": rng.choice(["1", "2", "3", "4"], n),
+        "Blok": rng.choice(list("ABCD"), n),
+        "Berat\nBadan\n(kg)": berat,
+        "Tensi\nSistolik": rng.integers(100, 150, n),
+    })
+
+
+def tabel_lama(df):
+    """Cara lama: satu Table dari `df.values.tolist()` dengan TableStyle baru."""
+    tabel = Table([df.columns.to_list()] + df.values.tolist(), repeatRows=1, hAlign='LEFT')
+    tabel.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.darkred), ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('ALIGN', (0,0), (-1,-1), 'LEFT'), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'), ('FONTSIZE', (0,0), (-1,0), 10),
+        ('BOTTOMPADDING', (0,0), (-1,0), 12),
+        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+        ('FONTSIZE', (0,1), (-1,-1), 9)
+    ]))
+    return [tabel]
+
+
+def ukur_waktu(fungsi):
+    mulai = time.perf_counter()
+    hasil = fungsi()
+    return hasil, time.perf_counter() - mulai
+
+
+def ukur_memori(fungsi):
+    """Memori puncak (MB) selama `fungsi()`; diukur terpisah karena tracemalloc memperlambat."""
+    tracemalloc.start()
+    try:
+        fungsi()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def bangun_pdf(elements):
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer, pagesize=legal).build(elements)
+    return buffer.getvalue()
+
+
+def main():
+    for n in (1_000, 2_000, 5_000):
+        df = data_tabel(n)
+        _, t_lama = ukur_waktu(lambda: bangun_pdf(tabel_lama(df)))
+        _, t_baru = ukur_waktu(lambda: bangun_pdf(tabel_panjang(df, GAYA_TABEL_TIDAK_HADIR)))
+        print(f"{n:>5} baris | Table: {t_lama:6.2f} s | tabel_panjang: {t_baru:5.2f} s | {t_lama / t_baru:4.1f}x")
+
+    # Laporan lengkap: 5.000 warga, sekitar separuh hadir dan separuh tidak hadir
+    data = buat_data_contoh(n_warga=5_000, peluang_hadir=0.5)
+    tanggal = TANGGAL_POSYANDU[-1]
+    df_warga = siapkan_warga(pd.DataFrame(data["warga"]), tanggal)
+    df_pemeriksaan = pd.DataFrame(data["pemeriksaan"])
+    df_pemeriksaan = siapkan_pemeriksaan_harian(df_pemeriksaan[df_pemeriksaan["tanggal_pemeriksaan"] == str(tanggal)])
+    kwargs = data_laporan(df_warga, df_pemeriksaan, tanggal)
+    jumlah_baris = len(kwargs["df_rinci"]) + len(kwargs["df_tidak_hadir"])
+
+    exporter = ChartExporter()
+    pdf, durasi = ukur_waktu(lambda: generate_pdf_bytes(exporter=exporter, **kwargs))
+    puncak = ukur_memori(lambda: generate_pdf_bytes(exporter=exporter, **kwargs))
+    print(f"Laporan lengkap ({jumlah_baris} baris tabel): {durasi:.2f} s, puncak {puncak:.1f} MB, {len(pdf) / 1024:.0f} KB")
+    assert durasi < BATAS_DETIK, f"Laporan {jumlah_baris} baris butuh {durasi:.1f} s (batas {BATAS_DETIK} s)"
+    assert puncak < BATAS_MEMORI_MB, f"Memori puncak {puncak:.1f} MB (batas {BATAS_MEMORI_MB} MB)"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# benchmarks/bench_usia.py
+# Jalankan dari root repo: python -m benchmarks.bench_usia
+import time
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from data_utils import format_usia_teks_vektor
+
+
+def format_usia_apply(tgl_lahir, tgl_referensi):
+    """Cara lama: satu relativedelta per baris lewat .apply()."""
+    def satu(tgl):
+        if pd.isna(tgl):
+            return "N/A"
+        delta = relativedelta(tgl_referensi, tgl)
+        return f"{delta.years} Thn {delta.months} Bln"
+    return tgl_lahir.apply(satu)
+
+
+def ukur(fungsi, *args, ulang=3):
+    terbaik = float("inf")
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi(*args)
+        terbaik = min(terbaik, time.perf_counter() - mulai)
+    return terbaik, hasil
+
+
+def main():
+    rng = np.random.default_rng(42)
+    tgl_referensi = pd.Timestamp("2025-08-13")
+    for n in (10_000, 100_000):
+        tgl_lahir = pd.Series(pd.Timestamp("1940-01-01") + pd.to_timedelta(rng.integers(0, 31000, n), unit="D"))
+        t_apply, hasil_apply = ukur(format_usia_apply, tgl_lahir, tgl_referensi)
+        t_vektor, hasil_vektor = ukur(format_usia_teks_vektor, tgl_lahir, tgl_referensi)
+        assert (hasil_apply == hasil_vektor).all(), "Hasil vektor berbeda dari relativedelta"
+        print(f"{n:>7} warga | apply: {t_apply * 1000:8.1f} ms | vektor: {t_vektor * 1000:7.1f} ms | {t_apply / t_vektor:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
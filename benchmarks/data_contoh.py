@@ -0,0 +1,45 @@
+# benchmarks/data_contoh.py
+# Data warga & pemeriksaan acak untuk benchmark (tanpa koneksi Supabase).
+import datetime as dt
+import random
+
+from fake_supabase import FakeSupabaseClient
+
+TANGGAL_POSYANDU = [dt.date(2025, 6, 1), dt.date(2025, 7, 1), dt.date(2025, 8, 1)]
+
+
+def buat_data_contoh(n_warga=300, seed=0, peluang_hadir=0.6):
+    """
+    Membuat baris tabel `warga` dan `pemeriksaan` acak yang bentuknya sama dengan skema aplikasi.
+
+    Returns:
+        dict: `{"warga": [...], "pemeriksaan": [...]}`.
+    """
+    rnd = random.Random(seed)
+    warga, pemeriksaan = [], []
+    for i in range(1, n_warga + 1):
+        # Separuh warga balita agar bagian KMS/status gizi ikut teruji
+        umur_hari = rnd.choice([rnd.randint(0, 1800), rnd.randint(0, 30000)])
+        lahir = TANGGAL_POSYANDU[-1] - dt.timedelta(days=umur_hari)
+        warga.append({
+            "id": i, "nik": str(3200000000000000 + i), "nama_lengkap": f"Warga {i}",
+            "tanggal_lahir": str(lahir), "jenis_kelamin": rnd.choice("LP"),
+            "alamat": "Karang Baru Utara", "telepon": "08", "rt": rnd.choice(["1", "2", "3", "4"]),
+            "blok": rnd.choice("ABCD"), "created_at": f"2025-01-01T00:00:00+00:00",
+        })
+    for tanggal in TANGGAL_POSYANDU:
+        for w in warga:
+            if rnd.random() < peluang_hadir:
+                pemeriksaan.append({
+                    "id": len(pemeriksaan) + 1, "warga_id": w["id"], "tanggal_pemeriksaan": str(tanggal),
+                    "berat_badan_kg": round(rnd.uniform(3, 80), 1), "tinggi_badan_cm": round(rnd.uniform(50, 170), 1),
+                    "lingkar_lengan_cm": 12.0, "lingkar_perut_cm": 70.0, "lingkar_kepala_cm": round(rnd.uniform(33, 50), 1),
+                    "tensi_sistolik": 120, "tensi_diastolik": 80, "gula_darah": 100, "kolesterol": 180,
+                    "catatan": "", "created_at": f"{tanggal}T08:00:00+00:00",
+                })
+    return {"warga": warga, "pemeriksaan": pemeriksaan}
+
+
+def buat_client_contoh(n_warga=300, seed=0):
+    """Client Supabase palsu yang sudah berisi `buat_data_contoh`."""
+    return FakeSupabaseClient(buat_data_contoh(n_warga, seed))
@@ -0,0 +1,189 @@
+# buku_kms.py
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Optional
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from PIL import Image as PILImage
+from reportlab.lib.pagesizes import legal
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak
+
+from data_utils import hitung_usia_bulan_vektor
+from kms_charts import CONFIG, JENIS_GRAFIK_KMS, DPI_CETAK_KMS, KMSRenderCache, hash_riwayat, render_kms_banyak
+from laporan import WILAYAH_SEMUA
+from laporan_pdf import GAYA_TABEL_METRIK
+from skema import untuk_tampilan
+
+# ==============================================================================
+# BUKU KMS: GRAFIK PERTUMBUHAN SEMUA BALITA YANG HADIR DALAM SATU PDF
+# ==============================================================================
+
+# Nama kolom pemeriksaan -> nama kolom yang dipakai grafik KMS (sama dengan halaman Manajemen Warga)
+KOLOM_UKURAN_KMS = {'berat_badan_kg': 'berat_kg', 'tinggi_badan_cm': 'tinggi_cm', 'lingkar_kepala_cm': 'lingkar_kepala_cm'}
+
+# Grafik disusun dua kolom per halaman anak
+KOLOM_GRAFIK_PER_BARIS = 2
+
+GAYA_TABEL_GRAFIK = TableStyle([
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ('LEFTPADDING', (0,0), (-1,-1), 4), ('RIGHTPADDING', (0,0), (-1,-1), 4),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 10),
+])
+
+
+def siapkan_riwayat_kms(df_riwayat, df_anak, tanggal):
+    """
+    Memecah riwayat pemeriksaan (hasil satu query bulk) menjadi riwayat KMS per anak.
+
+    Hanya pemeriksaan sampai `tanggal` yang dipakai, sehingga buku KMS sesuai
+    dengan sesi posyandu terpilih. Kolom disiapkan seperti `plot_all_kms_curves`:
+    ukuran kosong menjadi 0, ditambah 'usia_bulan', 'jenis_kelamin', dan 'bmi'.
+
+    Returns:
+        dict: `{warga_id: pd.DataFrame riwayat, terurut menurut usia_bulan}`.
+    """
+    if df_riwayat.empty or df_anak.empty:
+        return {}
+    df = untuk_tampilan(df_riwayat[pd.to_datetime(df_riwayat['tanggal_pemeriksaan']).dt.date <= tanggal])
+    df = df.merge(df_anak[['id', 'tanggal_lahir', 'jenis_kelamin']], left_on='warga_id', right_on='id', suffixes=('', '_warga'))
+    df = df.rename(columns=KOLOM_UKURAN_KMS)
+    for kolom in KOLOM_UKURAN_KMS.values():
+        df[kolom] = pd.to_numeric(df[kolom], errors='coerce').fillna(0.0) if kolom in df.columns else 0.0
+    df['usia_bulan'] = hitung_usia_bulan_vektor(df['tanggal_lahir'], df['tanggal_pemeriksaan']).astype(float)
+    berat, tinggi = df['berat_kg'].to_numpy(dtype=float), df['tinggi_cm'].to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        df['bmi'] = np.where((berat > 0) & (tinggi > 0), berat / (tinggi / 100) ** 2, 0.0)
+    return {
+        warga_id: grup.sort_values('usia_bulan').reset_index(drop=True)
+        for warga_id, grup in df.groupby('warga_id', sort=False)
+    }
+
+
+def _render_grafik(riwayat, executor, render_cache, dpi, lapor):
+    """
+    Grafik cetak semua anak: `{warga_id: {chart_type: (bytes JPEG, interpretasi) atau Exception}}`.
+
+    Grafik yang sudah ada di `render_cache` dipakai langsung; sisanya dirender
+    paralel lewat `render_kms_banyak` dan disimpan ke cache.
+    """
+    grafik, permintaan, kunci_cache = {}, {}, {}
+    for warga_id, history_df in riwayat.items():
+        latest_data = history_df.iloc[-1]
+        riwayat_hash = hash_riwayat(history_df)
+        grafik[warga_id] = {}
+        for chart_type in JENIS_GRAFIK_KMS:
+            kunci_cache[warga_id, chart_type] = (warga_id, chart_type, riwayat_hash, dpi)
+            hasil = render_cache.get(kunci_cache[warga_id, chart_type]) if render_cache is not None else None
+            if hasil is not None:
+                grafik[warga_id][chart_type] = hasil
+        kurang = [ct for ct in JENIS_GRAFIK_KMS if ct not in grafik[warga_id]]
+        if kurang:
+            permintaan[warga_id] = (history_df, latest_data['jenis_kelamin'], latest_data, kurang)
+
+    lapor(0.05, f"Membuat grafik {len(permintaan)} anak ({len(riwayat) - len(permintaan)} dari cache)...")
+    for selesai, (warga_id, future) in enumerate(render_kms_banyak(permintaan, executor, dpi), start=1):
+        try:
+            hasil = future.result()
+        except Exception as e:
+            # Satu anak yang gagal tidak menggagalkan seluruh buku; galatnya dicetak di halamannya
+            hasil = {ct: e for ct in permintaan[warga_id][3]}
+        for chart_type, nilai in hasil.items():
+            grafik[warga_id][chart_type] = nilai
+            if render_cache is not None and not isinstance(nilai, Exception):
+                render_cache.put(kunci_cache[warga_id, chart_type], nilai)
+        lapor(0.05 + 0.85 * selesai / len(permintaan), f"Grafik {selesai}/{len(permintaan)} anak selesai")
+    return grafik
+
+
+def _angka(nilai, satuan):
+    return f"{nilai:.1f} {satuan}" if nilai and nilai > 0 else "-"
+
+
+def _halaman_anak(anak, history_df, grafik_anak, lebar, styles):
+    """Flowable satu halaman anak: identitas, pengukuran terakhir, dan lima grafik + interpretasi."""
+    elements = [Paragraph(escape(str(anak['nama_lengkap'])), styles['h2'])]
+    terakhir = history_df.iloc[-1]
+    identitas = [
+        ['NIK', f": {anak['nik']}", 'Jenis Kelamin', f": {'Perempuan' if anak['jenis_kelamin'] == 'P' else 'Laki-laki'}"],
+        ['Tanggal Lahir', f": {anak['tanggal_lahir'].strftime('%d-%m-%Y')}", 'Usia', f": {anak['usia_teks']}"],
+        ['RT / Blok', f": {anak['rt']} / {anak['blok']}", 'Jumlah Pemeriksaan', f": {len(history_df)}"],
+        ['Berat Badan', f": {_angka(terakhir['berat_kg'], 'kg')}", 'Panjang/Tinggi Badan', f": {_angka(terakhir['tinggi_cm'], 'cm')}"],
+        ['Lingkar Kepala', f": {_angka(terakhir['lingkar_kepala_cm'], 'cm')}", 'IMT', f": {_angka(terakhir['bmi'], 'kg/m²')}"],
+    ]
+    tabel_identitas = Table(identitas, colWidths=[1.3*inch, 2.2*inch, 1.6*inch, 2.2*inch], hAlign='LEFT')
+    tabel_identitas.setStyle(GAYA_TABEL_METRIK)
+    elements += [tabel_identitas, Spacer(1, 0.15 * inch)]
+
+    lebar_grafik = lebar / KOLOM_GRAFIK_PER_BARIS - 8
+    sel = []
+    for chart_type in JENIS_GRAFIK_KMS:
+        judul = CONFIG[chart_type]['title']
+        nilai = grafik_anak.get(chart_type)
+        if isinstance(nilai, Exception) or nilai is None:
+            sel.append([Paragraph(f"<b>{judul}:</b> grafik gagal dibuat ({escape(str(nilai))})", styles['Normal'])])
+            continue
+        gambar, interpretasi = nilai
+        lebar_px, tinggi_px = PILImage.open(BytesIO(gambar)).size  # hanya membaca header
+        teks = f"<b>{judul}:</b> {interpretasi}" if interpretasi else f"<b>{judul}:</b> data tidak tersedia"
+        sel.append([
+            Image(BytesIO(gambar), width=lebar_grafik, height=lebar_grafik * tinggi_px / lebar_px),
+            Paragraph(teks, styles['Normal']),
+        ])
+    sel += [""] * (-len(sel) % KOLOM_GRAFIK_PER_BARIS)
+    baris = [sel[i:i + KOLOM_GRAFIK_PER_BARIS] for i in range(0, len(sel), KOLOM_GRAFIK_PER_BARIS)]
+    tabel_grafik = Table(baris, colWidths=[lebar / KOLOM_GRAFIK_PER_BARIS] * KOLOM_GRAFIK_PER_BARIS)
+    tabel_grafik.setStyle(GAYA_TABEL_GRAFIK)
+    elements.append(tabel_grafik)
+    return elements
+
+
+def generate_buku_kms(df_anak, riwayat, tanggal, wilayah=WILAYAH_SEMUA, executor: Optional[ProcessPoolExecutor] = None,
+                      render_cache: Optional[KMSRenderCache] = None, progres=None, dpi=DPI_CETAK_KMS) -> bytes:
+    """
+    Membuat buku KMS: satu halaman per balita berisi lima grafik pertumbuhan dan interpretasinya.
+
+    Riwayat seluruh anak dimuat pemanggil dengan satu query (`load_riwayat_pemeriksaan`)
+    lalu dipecah dengan `siapkan_riwayat_kms`. Grafik dirender paralel di `executor`
+    (`get_kms_process_pool()`) dan disimpan di `render_cache` (`get_kms_render_cache()`);
+    keduanya sebaiknya diambil di thread skrip bila fungsi ini dijalankan di thread lain.
+
+    Args:
+        df_anak (pd.DataFrame): Hasil `anak_buku_kms`.
+        riwayat (dict): Hasil `siapkan_riwayat_kms`.
+        progres (callable, opsional): `progres(fraksi, pesan)` untuk indikator kemajuan.
+
+    Returns:
+        bytes: Isi PDF.
+    """
+    lapor = progres or (lambda fraksi, pesan: None)
+    mulai = time.perf_counter()
+    df_anak = df_anak[df_anak['id'].isin(riwayat)]
+    grafik = _render_grafik({warga_id: riwayat[warga_id] for warga_id in df_anak['id']}, executor, render_cache, dpi, lapor)
+
+    lapor(0.92, "Menyusun PDF...")
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=legal, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+    styles = getSampleStyleSheet()
+    elements = [
+        Paragraph("Buku KMS Posyandu Mawar - KBU", styles['h1']),
+        Paragraph(
+            f"<b>Tanggal:</b> {tanggal.strftime('%d %B %Y')}<br/><b>Wilayah:</b> {wilayah}<br/>"
+            f"<b>Jumlah Balita:</b> {len(df_anak)}", styles['Normal']
+        ),
+        Spacer(1, 0.2 * inch),
+    ]
+    if df_anak.empty:
+        elements.append(Paragraph("Tidak ada balita yang hadir pada tanggal dan wilayah ini.", styles['Normal']))
+    for i, anak in enumerate(df_anak.to_dict('records')):
+        if i > 0:
+            elements.append(PageBreak())
+        elements += _halaman_anak(anak, riwayat[anak['id']], grafik[anak['id']], doc.width, styles)
+
+    doc.build(elements)
+    lapor(1.0, f"Selesai dalam {time.perf_counter() - mulai:.1f} detik")
+    return buffer.getvalue()
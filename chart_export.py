@@ -0,0 +1,340 @@
+# chart_export.py
+import base64
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Ukuran default Kaleido bila figure tidak menentukan width/height sendiri
+LEBAR_DEFAULT, TINGGI_DEFAULT = 700, 500
+
+# Warna cadangan (sama dengan urutan warna default Plotly) bila trace tidak membawa warna
+_WARNA_PLOTLY = ["#636EFA", "#EF553B", "#00CC96", "#AB63FA", "#FFA15A", "#19D3F3", "#FF6692", "#B6E880", "#FF97FF", "#FECB52"]
+
+# Template Plotly "streamlit" (aktif sejak streamlit di-import) hanya membawa warna
+# placeholder #000001..#000010 yang diganti frontend Streamlit di browser. Untuk
+# ekspor di server, placeholder kategori diganti palet kategori tema terang Streamlit.
+_WARNA_KATEGORI_STREAMLIT = ["#0068c9", "#83c9ff", "#ff2b2b", "#ffabab", "#29b09d", "#7defa1", "#ff8700", "#ffd16a", "#6d3fc0", "#d5dae5"]
+_PLACEHOLDER_STREAMLIT = {f"#{i:06d}": w for i, w in enumerate(_WARNA_KATEGORI_STREAMLIT, start=1)}
+
+
+def _ganti_placeholder(nilai):
+    """Mengganti placeholder warna tema Streamlit secara rekursif pada dict figure."""
+    if isinstance(nilai, str):
+        return _PLACEHOLDER_STREAMLIT.get(nilai.lower(), nilai)
+    if isinstance(nilai, dict):
+        return {k: _ganti_placeholder(v) for k, v in nilai.items()}
+    if isinstance(nilai, (list, tuple)):
+        return type(nilai)(_ganti_placeholder(v) for v in nilai)
+    return nilai
+
+
+class GrafikTidakDidukung(ValueError):
+    """Figure tidak bisa diekspor: Kaleido tidak tersedia dan fallback Matplotlib tidak mendukung trace-nya."""
+
+
+def _figure_siap_ekspor(fig) -> go.Figure:
+    """Salinan figure dengan placeholder warna tema Streamlit sudah diganti warna sebenarnya."""
+    return go.Figure(_ganti_placeholder(fig.to_dict()))
+
+
+class ChartExporter:
+    """
+    Layanan ekspor grafik Plotly ke PNG untuk laporan PDF.
+
+    - Satu renderer Kaleido/Chromium dijaga tetap hidup (`kaleido.start_sync_server`),
+      sehingga biaya start browser hanya dibayar sekali per proses.
+    - Hasil PNG di-cache (LRU) berdasarkan hash isi figure + opsi ekspor, sehingga
+      laporan yang dibuat ulang dengan filter sama tidak merender ulang grafiknya.
+    - Bila Kaleido/Chromium tidak tersedia (atau gagal), sunburst dan pie/donut
+      digambar ulang dengan Matplotlib tanpa browser.
+    """
+
+    def __init__(self, max_items: int = 64, gunakan_kaleido: bool = True):
+        self.max_items = max_items
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self.backend = "kaleido" if gunakan_kaleido and self._mulai_kaleido() else "matplotlib"
+
+    # --- RENDERER ---
+
+    @staticmethod
+    def _mulai_kaleido() -> bool:
+        """Menyalakan server Kaleido global (Chromium tetap hidup di thread latar)."""
+        try:
+            import kaleido
+            from choreographer.browsers.chromium import Chromium
+        except ImportError as e:
+            logger.warning("Kaleido tidak tersedia, ekspor grafik memakai Matplotlib: %s", e)
+            return False
+        # Server sinkron Kaleido tidak melaporkan kegagalan start (thread-nya mati diam-diam
+        # dan permintaan berikutnya menunggu selamanya), jadi Chromium dicek lebih dulu.
+        try:
+            ada_browser = Chromium.find_browser(skip_local=False) is not None
+        except Exception:
+            ada_browser = False
+        if not ada_browser:
+            logger.warning("Chrome/Chromium tidak ditemukan, ekspor grafik memakai Matplotlib.")
+            return False
+        if hasattr(kaleido, "start_sync_server"):
+            kaleido.start_sync_server(silence_warnings=True)
+        return True
+
+    def _render(self, fig, width: int, height: int, scale: float) -> bytes:
+        if self.backend == "kaleido":
+            try:
+                return pio.to_image(fig, format="png", width=width, height=height, scale=scale)
+            except Exception as e:
+                # Mis. Chromium tidak terpasang: pindah permanen ke Matplotlib untuk proses ini
+                logger.warning("Ekspor Kaleido gagal, beralih ke Matplotlib: %s", e)
+                self.backend = "matplotlib"
+        return render_matplotlib(fig, width, height, scale)
+
+    # --- CACHE ---
+
+    @staticmethod
+    def kunci_figure(fig_json: str, width: int, height: int, scale: float) -> str:
+        h = hashlib.sha1(fig_json.encode("utf-8"))
+        h.update(f"|{width}x{height}@{scale}".encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def _ukuran(fig, width: Optional[int], height: Optional[int]) -> Tuple[int, int]:
+        return (
+            int(width or fig.layout.width or LEBAR_DEFAULT),
+            int(height or fig.layout.height or TINGGI_DEFAULT),
+        )
+
+    def export_png(self, fig, width: Optional[int] = None, height: Optional[int] = None, scale: float = 2) -> bytes:
+        """Mengembalikan PNG satu figure (dari cache bila isi dan ukurannya sama)."""
+        width, height = self._ukuran(fig, width, height)
+        kunci = self.kunci_figure(fig.to_json(), width, height, scale)
+        with self._lock:
+            if kunci in self._cache:
+                self._cache.move_to_end(kunci)
+                return self._cache[kunci]
+        # Satu render pada satu waktu: server Kaleido melayani antrean tunggal
+        with self._render_lock:
+            png = self._render(_figure_siap_ekspor(fig), width, height, scale)
+        with self._lock:
+            self._cache[kunci] = png
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+        return png
+
+    def export_many(self, permintaan: Iterable, scale: float = 2) -> List[Optional[bytes]]:
+        """
+        Mengekspor beberapa figure dalam satu permintaan.
+
+        Args:
+            permintaan: Tiap elemen berupa figure Plotly, tuple `(figure, opsi)` dengan
+                opsi `width`/`height`/`scale`, atau None (dilewati, hasilnya None).
+            scale (float): Skala default bila tidak ditentukan per figure.
+
+        Returns:
+            list: PNG per figure, urutan sama dengan `permintaan`. Figure yang tidak bisa
+            diekspor (`GrafikTidakDidukung`) dilewati dengan peringatan log dan hasilnya None.
+        """
+        hasil = []
+        for item in permintaan:
+            fig, opsi = item if isinstance(item, tuple) else (item, {})
+            try:
+                hasil.append(None if fig is None else self.export_png(fig, **{"scale": scale, **opsi}))
+            except GrafikTidakDidukung as e:
+                logger.warning("Grafik dilewati: %s", e)
+                hasil.append(None)
+        return hasil
+
+
+@st.cache_resource
+def get_chart_exporter() -> ChartExporter:
+    """Layanan ekspor grafik bersama (satu renderer hangat per proses)."""
+    return ChartExporter()
+
+
+# ==============================================================================
+# FALLBACK MATPLOTLIB (TANPA BROWSER) UNTUK SUNBURST DAN PIE/DONUT
+# ==============================================================================
+# Matplotlib di-import di dalam fungsi: hanya dimuat bila Kaleido tidak tersedia.
+
+def _warna(nilai, cadangan: str):
+    """Mengubah warna Plotly ('rgb(...)', 'rgba(...)', hex, nama) menjadi RGBA Matplotlib."""
+    from matplotlib.colors import to_rgba
+
+    if nilai is None:
+        return to_rgba(cadangan)
+    teks = str(nilai).strip()
+    m = re.match(r"rgba?\(([^)]*)\)", teks)
+    if m:
+        bagian = [float(v) for v in m.group(1).split(",")]
+        alpha = bagian[3] if len(bagian) > 3 else 1.0
+        return (bagian[0] / 255, bagian[1] / 255, bagian[2] / 255, alpha)
+    try:
+        return to_rgba(teks)
+    except ValueError:
+        return to_rgba(cadangan)
+
+
+def _teks_polos(teks) -> str:
+    """Menghapus tag HTML Plotly (<b>, <br>) dari teks anotasi/judul."""
+    teks = re.sub(r"<br\s*/?>", "\n", str(teks or ""))
+    return re.sub(r"<[^>]+>", "", teks)
+
+
+def _larik(nilai) -> np.ndarray:
+    """Array angka trace; Plotly >= 6 dapat menyimpannya sebagai `{'dtype', 'bdata'}` base64."""
+    if isinstance(nilai, dict) and "bdata" in nilai:
+        return np.frombuffer(base64.b64decode(nilai["bdata"]), dtype=np.dtype(nilai["dtype"])).astype(float)
+    return np.asarray(nilai, dtype=float)
+
+
+def _daftar(nilai, n: int) -> list:
+    if nilai is None:
+        return [None] * n
+    if isinstance(nilai, (str, bytes)):
+        return [nilai] * n
+    return list(nilai)
+
+
+def _area_plot(fig, width: int, height: int) -> Tuple[float, float, float, float]:
+    """Area plot (koordinat 'paper' Plotly) sebagai pecahan kanvas: (kiri, bawah, lebar, tinggi)."""
+    m = fig.layout.margin
+    kiri, kanan = (m.l if m.l is not None else 80), (m.r if m.r is not None else 80)
+    atas, bawah = (m.t if m.t is not None else 100), (m.b if m.b is not None else 80)
+    return kiri / width, bawah / height, 1 - (kiri + kanan) / width, 1 - (atas + bawah) / height
+
+
+def _ke_kanvas(area, x: float, y: float) -> Tuple[float, float]:
+    return area[0] + x * area[2], area[1] + y * area[3]
+
+
+def _axes_domain(fig_mpl, area, trace):
+    """Axes Matplotlib seluas domain trace di dalam area plot."""
+    dom = trace.domain
+    x0, x1 = dom.x if dom and dom.x else (0, 1)
+    y0, y1 = dom.y if dom and dom.y else (0, 1)
+    kiri, bawah = _ke_kanvas(area, x0, y0)
+    ax = fig_mpl.add_axes([kiri, bawah, (x1 - x0) * area[2], (y1 - y0) * area[3]])
+    ax.set_axis_off()
+    return ax
+
+
+def _gambar_sunburst(ax, trace) -> None:
+    """Menggambar trace sunburst sebagai cincin `Wedge` bertingkat (kedalaman d = cincin d..d+1)."""
+    from matplotlib.patches import Wedge
+
+    ids = list(trace.ids if trace.ids is not None else trace.labels)
+    labels = list(trace.labels)
+    values = _larik(trace.values)
+    warna = _daftar(trace.marker.colors if trace.marker else None, len(ids))
+    anak = {}
+    for n, p in enumerate(trace.parents):
+        anak.setdefault(p or "", []).append(n)
+
+    def isi(n):
+        # branchvalues 'remainder': nilai induk belum termasuk anak-anaknya
+        if trace.branchvalues == "total":
+            return values[n]
+        return values[n] + sum(isi(c) for c in anak.get(ids[n], []))
+
+    kedalaman_maks = 0
+
+    def gambar(n, sudut_awal, rentang, kedalaman, nilai_induk, warna_cabang):
+        nonlocal kedalaman_maks
+        nilai = isi(n)
+        if nilai <= 0:
+            return
+        kedalaman_maks = max(kedalaman_maks, kedalaman)
+        warna_node = warna_cabang if warna[n] is None else warna[n]
+        ax.add_patch(Wedge((0, 0), kedalaman + 1, sudut_awal, sudut_awal + rentang, width=1,
+                           facecolor=_warna(warna_node, warna_cabang), edgecolor="white", linewidth=1))
+        # Label hanya pada irisan yang cukup lebar agar tidak bertumpuk
+        if rentang >= 12:
+            lingkaran_penuh = kedalaman == 0 and rentang >= 359
+            r_teks = 0 if lingkaran_penuh else kedalaman + 0.5
+            tengah = np.deg2rad(sudut_awal + rentang / 2)
+            teks = labels[n] if not nilai_induk else f"{labels[n]}\n{nilai / nilai_induk * 100:.0f}%"
+            ax.text(r_teks * np.cos(tengah), r_teks * np.sin(tengah), teks, ha="center", va="center", fontsize=7)
+        sudut = sudut_awal
+        for i, c in enumerate(anak.get(ids[n], [])):
+            porsi = isi(c) / nilai * rentang
+            # Anak langsung dari akar mendapat warna palet sendiri, cucu mewarisi warna cabangnya
+            cadangan = _WARNA_PLOTLY[i % len(_WARNA_PLOTLY)] if kedalaman == 0 else warna_cabang
+            gambar(c, sudut, porsi, kedalaman + 1, nilai, cadangan)
+            sudut += porsi
+
+    akar = anak.get("", [])
+    total_akar = sum(isi(n) for n in akar) or 1.0
+    sudut = 90.0
+    for i, n in enumerate(akar):
+        porsi = isi(n) / total_akar * 360
+        gambar(n, sudut, porsi, 0, None, _WARNA_PLOTLY[i % len(_WARNA_PLOTLY)])
+        sudut += porsi
+
+    batas = kedalaman_maks + 1.05
+    ax.set_xlim(-batas, batas)
+    ax.set_ylim(-batas, batas)
+    ax.set_aspect("equal")
+    ax.set_axis_off()
+
+
+def _gambar_pie(ax, trace) -> None:
+    """Menggambar trace pie/donut (hole > 0) dengan `ax.pie`."""
+    values = _larik(trace.values)
+    warna = _daftar(trace.marker.colors if trace.marker else None, len(values))
+    warna = [_warna(c, _WARNA_PLOTLY[i % len(_WARNA_PLOTLY)]) for i, c in enumerate(warna)]
+    total = values.sum()
+    ax.pie(
+        values, colors=warna,
+        startangle=trace.rotation if trace.rotation is not None else 90,
+        counterclock=trace.direction != "clockwise",
+        autopct=(lambda p: f"{p * total / 100:.0f}") if total else None, pctdistance=(1 + (trace.hole or 0)) / 2,
+        wedgeprops=dict(width=1 - (trace.hole or 0)), textprops=dict(fontsize=8),
+    )
+    ax.set_aspect("equal")
+
+
+def render_matplotlib(fig, width: int = LEBAR_DEFAULT, height: int = TINGGI_DEFAULT, scale: float = 2) -> bytes:
+    """
+    Merender figure Plotly berisi trace sunburst dan/atau pie dengan Matplotlib.
+
+    Anotasi ber-`xref/yref='paper'` (judul subplot, teks tengah donut) dan judul
+    layout ikut digambar. Jenis trace lain menimbulkan `GrafikTidakDidukung`.
+    """
+    jenis = {t.type for t in fig.data}
+    if not jenis <= {"sunburst", "pie"}:
+        raise GrafikTidakDidukung(f"fallback Matplotlib tidak mendukung trace: {sorted(jenis - {'sunburst', 'pie'})}")
+    from figure_utils import figur
+
+    area = _area_plot(fig, width, height)
+    buffer = BytesIO()
+    # 1 piksel Plotly = 1/100 inci di sini, jadi ukuran font px dikali 0.72 menjadi poin
+    with figur(figsize=(width / 100, height / 100)) as (fig_mpl, ax):
+        ax.set_axis_off()
+        for trace in fig.data:
+            gambar = _gambar_sunburst if trace.type == "sunburst" else _gambar_pie
+            gambar(_axes_domain(fig_mpl, area, trace), trace)
+        for anotasi in fig.layout.annotations or ():
+            if anotasi.xref != "paper" or anotasi.yref != "paper":
+                continue
+            ukuran = (anotasi.font.size if anotasi.font and anotasi.font.size else 12) * 0.72
+            fig_mpl.text(
+                *_ke_kanvas(area, anotasi.x, anotasi.y), _teks_polos(anotasi.text), ha="center",
+                va={"bottom": "bottom", "top": "top"}.get(anotasi.yanchor, "center"),
+                fontsize=ukuran, fontweight="bold" if "<b>" in str(anotasi.text) else "normal",
+            )
+        if fig.layout.title and fig.layout.title.text:
+            fig_mpl.suptitle(_teks_polos(fig.layout.title.text), fontsize=12)
+        fig_mpl.savefig(buffer, format="png", dpi=100 * scale, facecolor="white")
+    return buffer.getvalue()
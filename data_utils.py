@@ -1,7 +1,340 @@
 # data_utils.py
-from dateutil.relativedelta import relativedelta #13082025 untuk akomodasi format ..Tahun...Bulan
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+from skema import SEMUA_KOLOM, proyeksikan, terapkan_skema
+from who_standards import zscore, kategori_z
 # ... (kode load_raw_data tetap ada di atas) ...
 
+# ==============================================================================
+# AKSES DATA TERPUSAT (CACHE PER TABEL + INVALIDASI)
+# ==============================================================================
+
+# Batas umur cache; invalidasi eksplisit membuat data baru langsung terlihat.
+CACHE_TTL_DETIK = 600
+
+# PostgREST di Supabase membatasi satu respons (default 1000 baris),
+# jadi tabel selalu diambil per halaman dengan .range().
+UKURAN_HALAMAN_DEFAULT = 1000
+
+_versi_lock = threading.Lock()
+
+
+@st.cache_resource
+def _versi_tabel():
+    """Penghitung versi per tabel, dibagi oleh semua sesi dalam satu proses."""
+    return {}
+
+
+def versi_tabel(table_name):
+    """Mengembalikan versi data terkini dari sebuah tabel."""
+    return _versi_tabel().get(table_name, 0)
+
+
+def iter_table_rows(supabase, table_name, columns="*", page_size=UKURAN_HALAMAN_DEFAULT, order_by="id", apply_filters=None):
+    """
+    Menelusuri tabel halaman demi halaman dengan `.range()` dan menghasilkan list baris mentah.
+
+    Halaman pertama meminta `count="exact"` sehingga penelusuran berhenti tepat
+    di baris terakhir, walaupun server memotong respons di bawah `page_size`.
+    Parameter sama dengan `iter_table_pages`.
+    """
+    start = 0
+    total = None
+    while True:
+        query = supabase.table(table_name).select(columns, count="exact" if total is None else None)
+        if apply_filters is not None:
+            query = apply_filters(query)
+        response = query.order(order_by).range(start, start + page_size - 1).execute()
+        rows = response.data or []
+        if total is None:
+            total = getattr(response, "count", None)
+        if not rows:
+            break
+        yield rows
+        start += len(rows)
+        if total is not None and start >= total:
+            break
+
+
+def iter_table_pages(supabase, table_name, columns="*", page_size=UKURAN_HALAMAN_DEFAULT, order_by="id", apply_filters=None):
+    """
+    Menelusuri tabel halaman demi halaman dengan `.range()` dan menghasilkan potongan DataFrame.
+
+    Args:
+        supabase: Client Supabase aktif.
+        table_name (str): Nama tabel.
+        columns (str): Proyeksi kolom untuk `.select()`.
+        page_size (int): Jumlah baris yang diminta per halaman.
+        order_by (str): Kolom unik untuk urutan yang stabil antar halaman.
+        apply_filters (callable, opsional): Fungsi `query -> query` untuk menambah filter.
+
+    Yields:
+        pd.DataFrame: Satu potongan per halaman yang berisi data.
+    """
+    for rows in iter_table_rows(supabase, table_name, columns, page_size, order_by, apply_filters):
+        yield pd.DataFrame(rows)
+
+
+def fetch_table(supabase, table_name, columns="*", page_size=UKURAN_HALAMAN_DEFAULT, order_by="id", apply_filters=None):
+    """
+    Mengambil seluruh baris tabel (melewati batas baris PostgREST) dalam satu DataFrame.
+
+    Returns:
+        tuple[pd.DataFrame, dict]: DataFrame gabungan dan ringkasan
+        `{"total_baris": ..., "jumlah_halaman": ...}`.
+    """
+    potongan = list(iter_table_pages(supabase, table_name, columns, page_size, order_by, apply_filters))
+    df = pd.concat(potongan, ignore_index=True) if potongan else pd.DataFrame()
+    info = {"total_baris": len(df), "jumlah_halaman": len(potongan)}
+    return df, info
+
+
+@st.cache_resource
+def get_local_mirror():
+    """
+    Mengembalikan mirror lokal bersama (satu per proses), atau None jika dimatikan.
+
+    Lokasi diatur lewat env/secrets `LOCAL_MIRROR_PATH`; isi string kosong
+    untuk mematikan mirror dan selalu membaca langsung dari Supabase.
+    """
+    from local_mirror import DEFAULT_MIRROR_PATH, LocalMirror
+
+    path = os.environ.get("LOCAL_MIRROR_PATH")
+    if path is None:
+        try:
+            path = st.secrets.get("LOCAL_MIRROR_PATH", DEFAULT_MIRROR_PATH)
+        except Exception:
+            path = DEFAULT_MIRROR_PATH
+    return LocalMirror(path) if path else None
+
+
+def _info_mirror(df, info_sinkron):
+    """Ringkasan pengambilan untuk data yang dibaca dari mirror lokal."""
+    return {"total_baris": len(df), "jumlah_halaman": info_sinkron["jumlah_halaman"], "sinkron": info_sinkron["mode"]}
+
+
+def _ringkas(df, table_name, info):
+    """Mencatat info pengambilan lalu mengubah frame ke tipe ringkas (`skema.terapkan_skema`)."""
+    df.attrs["info_pengambilan"] = info
+    return terapkan_skema(df, table_name)
+
+
+@st.cache_data(ttl=CACHE_TTL_DETIK, show_spinner=False)
+def _ambil_tabel(_supabase, table_name, columns, versi):
+    """Mengambil seluruh isi tabel. `versi` hanya dipakai sebagai bagian kunci cache."""
+    mirror = get_local_mirror()
+    if mirror is not None:
+        info_sinkron = mirror.sync(_supabase, table_name)
+        df = proyeksikan(mirror.read(table_name), columns)
+        return _ringkas(df, table_name, _info_mirror(df, info_sinkron))
+    df, info = fetch_table(_supabase, table_name, columns=columns)
+    return _ringkas(df, table_name, info)
+
+
+def load_table(supabase, table_name, columns=SEMUA_KOLOM):
+    """
+    Memuat tabel dari Supabase melalui cache TTL yang dikunci per tabel.
+
+    Perubahan filter di halaman tidak memicu panggilan jaringan; data baru
+    diambil setelah TTL habis atau setelah `invalidate_table` dipanggil.
+
+    Args:
+        supabase: Client Supabase aktif.
+        table_name (str): Nama tabel, misal "warga" atau "pemeriksaan".
+        columns (str): Proyeksi kolom (lihat konstanta di `skema`); setiap
+            proyeksi punya entri cache sendiri.
+
+    Returns:
+        pd.DataFrame: Salinan isi tabel (aman untuk diubah oleh pemanggil),
+        bertipe ringkas menurut `skema.SKEMA`. Ringkasan pengambilan tersedia
+        di `df.attrs["info_pengambilan"]`, penghematan memori di `df.attrs["memori"]`.
+    """
+    return _ambil_tabel(supabase, table_name, columns, versi_tabel(table_name))
+
+
+@st.cache_data(ttl=CACHE_TTL_DETIK, show_spinner=False)
+def _ambil_tanggal_pemeriksaan(_supabase, versi):
+    """Mengambil daftar tanggal pemeriksaan unik lewat proyeksi satu kolom."""
+    mirror = get_local_mirror()
+    if mirror is not None:
+        mirror.sync(_supabase, "pemeriksaan")
+        tanggal = mirror.distinct_dates("pemeriksaan", "tanggal_pemeriksaan")
+        return sorted(pd.to_datetime(pd.Series(tanggal, dtype=object)).dt.date.unique(), reverse=True)
+    df, _ = fetch_table(_supabase, "pemeriksaan", columns="tanggal_pemeriksaan", order_by="tanggal_pemeriksaan")
+    if df.empty:
+        return []
+    return sorted(pd.to_datetime(df['tanggal_pemeriksaan']).dt.date.unique(), reverse=True)
+
+
+def load_tanggal_pemeriksaan(supabase):
+    """
+    Mengembalikan tanggal pelaksanaan posyandu yang tersedia, terbaru lebih dulu.
+
+    Hanya kolom `tanggal_pemeriksaan` yang diunduh, sehingga jauh lebih ringan
+    daripada memuat seluruh riwayat pemeriksaan.
+
+    Returns:
+        list[date]: Tanggal unik, diurutkan menurun.
+    """
+    return _ambil_tanggal_pemeriksaan(supabase, versi_tabel("pemeriksaan"))
+
+
+@st.cache_data(ttl=CACHE_TTL_DETIK, show_spinner=False)
+def _ambil_pemeriksaan_harian(_supabase, tanggal, columns, versi):
+    """Mengambil baris pemeriksaan untuk satu tanggal (kunci cache: tanggal + proyeksi + versi)."""
+    mirror = get_local_mirror()
+    if mirror is not None:
+        info_sinkron = mirror.sync(_supabase, "pemeriksaan")
+        df = proyeksikan(mirror.read_where_date("pemeriksaan", "tanggal_pemeriksaan", tanggal), columns)
+        return _ringkas(df, "pemeriksaan", _info_mirror(df, info_sinkron))
+    hari_berikut = tanggal + timedelta(days=1)
+    # Rentang [tanggal, tanggal+1) berlaku untuk kolom bertipe date maupun timestamp
+    df, info = fetch_table(
+        _supabase, "pemeriksaan", columns=columns,
+        apply_filters=lambda q: q.gte("tanggal_pemeriksaan", str(tanggal)).lt("tanggal_pemeriksaan", str(hari_berikut)),
+    )
+    return _ringkas(df, "pemeriksaan", info)
+
+
+def load_pemeriksaan_harian(supabase, tanggal, columns=SEMUA_KOLOM):
+    """
+    Memuat hanya baris pemeriksaan pada tanggal tertentu.
+
+    Args:
+        supabase: Client Supabase aktif.
+        tanggal (date): Tanggal pelaksanaan posyandu.
+        columns (str): Proyeksi kolom, misal `skema.KOLOM_PEMERIKSAAN_UKURAN`.
+
+    Returns:
+        pd.DataFrame: Baris pemeriksaan tanggal tersebut (bertipe ringkas); ukuran
+        payload tidak bertambah seiring menumpuknya riwayat.
+    """
+    return _ambil_pemeriksaan_harian(supabase, tanggal, columns, versi_tabel("pemeriksaan"))
+
+
+# Jumlah id per filter `in_`: daftar id ikut di URL PostgREST, jadi daftar panjang dipecah
+UKURAN_POTONGAN_IN = 200
+
+
+@st.cache_data(ttl=CACHE_TTL_DETIK, show_spinner=False)
+def _ambil_riwayat_pemeriksaan(_supabase, warga_ids, columns, versi):
+    """Mengambil semua pemeriksaan milik `warga_ids` (tuple terurut; kunci cache: id + proyeksi + versi)."""
+    mirror = get_local_mirror()
+    if mirror is not None:
+        info_sinkron = mirror.sync(_supabase, "pemeriksaan")
+        df = proyeksikan(mirror.read_where_in("pemeriksaan", "warga_id", warga_ids), columns)
+        return _ringkas(df, "pemeriksaan", _info_mirror(df, info_sinkron))
+    potongan, info = [], {"total_baris": 0, "jumlah_halaman": 0}
+    for i in range(0, len(warga_ids), UKURAN_POTONGAN_IN):
+        ids = list(warga_ids[i:i + UKURAN_POTONGAN_IN])
+        df, info_potongan = fetch_table(
+            _supabase, "pemeriksaan", columns=columns, apply_filters=lambda q: q.in_("warga_id", ids),
+        )
+        potongan.append(df)
+        info = {k: info[k] + info_potongan[k] for k in info}
+    df = pd.concat(potongan, ignore_index=True) if potongan else pd.DataFrame()
+    return _ringkas(df, "pemeriksaan", info)
+
+
+def load_riwayat_pemeriksaan(supabase, warga_ids, columns=SEMUA_KOLOM):
+    """
+    Memuat seluruh riwayat pemeriksaan sekelompok warga dengan satu query `in_`.
+
+    Dipakai untuk ekspor banyak anak sekaligus (mis. buku KMS), menggantikan
+    satu query per anak.
+
+    Args:
+        supabase: Client Supabase aktif.
+        warga_ids (iterable): Id warga yang riwayatnya diperlukan.
+        columns (str): Proyeksi kolom, misal `skema.KOLOM_PEMERIKSAAN_KMS`.
+
+    Returns:
+        pd.DataFrame: Baris pemeriksaan milik warga tersebut (semua tanggal, bertipe ringkas).
+    """
+    warga_ids = tuple(sorted({int(i) if isinstance(i, (int, np.integer)) else i for i in warga_ids}))
+    return _ambil_riwayat_pemeriksaan(supabase, warga_ids, columns, versi_tabel("pemeriksaan"))
+
+
+def invalidate_table(*table_names, ids=None):
+    """
+    Menandai cache tabel sebagai usang setelah insert/update/delete.
+
+    Args:
+        *table_names (str): Nama-nama tabel yang datanya baru saja berubah.
+        ids (list, opsional): Id baris yang di-update/dihapus, agar mirror lokal
+            memuat ulang baris tersebut (insert sudah tertangkap sinkron delta).
+    """
+    if ids:
+        mirror = get_local_mirror()
+        if mirror is not None:
+            for table_name in table_names:
+                mirror.tandai_berubah(table_name, ids)
+    with _versi_lock:
+        versi = _versi_tabel()
+        for table_name in table_names:
+            versi[table_name] = versi.get(table_name, 0) + 1
+
+
+# ==============================================================================
+# PEMUATAN BERSAMAAN (QUERY YANG SALING BEBAS)
+# ==============================================================================
+
+def _muat_terukur(future, fungsi, args):
+    mulai = time.perf_counter()
+    try:
+        future.set_result((fungsi(*args), time.perf_counter() - mulai))
+    except Exception as e:
+        future.set_exception(e)
+
+
+def muat_bersamaan(**tugas):
+    """
+    Menjalankan beberapa pemuatan data yang saling bebas secara bersamaan.
+
+    Latensi halaman menjadi latensi query terlama, bukan jumlah semua query.
+    Setiap query berjalan di thread sendiri yang membawa konteks sesi pemanggil
+    (dibutuhkan cache Streamlit), dan koneksinya dipinjam dari pool Supabase
+    bersama. Fungsi yang dipanggil sebaiknya fungsi `load_*` di atas, sehingga
+    query yang datanya ada di cache selesai seketika.
+
+    Args:
+        **tugas: `nama=(fungsi, arg1, ...)`, misal
+            `warga=(load_table, supabase, "warga")`.
+
+    Returns:
+        tuple: `(hasil, waktu)` - `{nama: hasil fungsi}` dan `{nama: durasi dalam detik}`.
+
+    Raises:
+        Exception: Galat query pertama (menurut urutan `tugas`), setelah semua query selesai.
+    """
+    futures, threads = {}, []
+    for nama, (fungsi, *args) in tugas.items():
+        futures[nama] = Future()
+        thread = threading.Thread(target=_muat_terukur, args=(futures[nama], fungsi, args), name=f"muat_{nama}", daemon=True)
+        threads.append(add_script_run_ctx(thread))
+        thread.start()
+    for thread in threads:
+        thread.join()
+    hasil, waktu = {}, {}
+    for nama, future in futures.items():
+        hasil[nama], waktu[nama] = future.result()
+    return hasil, waktu
+
+
+def format_waktu_muat(waktu):
+    """Ringkasan waktu per query untuk caption, misal "warga 0.21 s, tanggal 0.05 s"."""
+    return ", ".join(f"{nama} {detik:.2f} s" for nama, detik in waktu.items())
+
+
 def calculate_age(dataframe, reference_date):
     """
     Menghitung dan menambahkan kolom 'usia' ke DataFrame warga.
@@ -24,12 +357,274 @@ def calculate_age(dataframe, reference_date):
     return df_copy
 
 
+# ==============================================================================
+# KATEGORI USIA & DEMOGRAFI
+# ==============================================================================
+
+KATEGORI_USIA = [
+    "Bayi (0-6 bln)", "Baduta (>6 bln - 2 thn)", "Balita (>2 - 5 thn)",
+    "Anak Pra-Sekolah (>5 - <6 thn)", "Anak Usia Sekolah dan Remaja (6 - 18 thn)",
+    "Dewasa (>18 - <60 thn)", "Lansia (≥60 thn)"
+]
+
+# Batas atas tiap kategori (tahun). Batas "< x" digeser satu ulp ke bawah agar satu
+# np.searchsorted(side='left') meniru campuran "<=" dan "<" pada definisi kategori.
+_BATAS_KATEGORI_USIA = np.array([0.5, 2, 5, np.nextafter(6, -np.inf), 18, np.nextafter(60, -np.inf)])
+
+
+def kategorikan_usia(usia):
+    """
+    Memetakan kolom usia (tahun, desimal) ke kategori usia posyandu sekaligus.
+
+    Args:
+        usia (pd.Series): Usia dalam tahun.
+
+    Returns:
+        pd.Series: Categorical berurutan sesuai `KATEGORI_USIA` (NaN bila usia kosong).
+    """
+    nilai = usia.to_numpy(dtype=float)
+    kode = np.searchsorted(_BATAS_KATEGORI_USIA, nilai, side='left')
+    kode[np.isnan(nilai)] = -1
+    return pd.Series(pd.Categorical.from_codes(kode, categories=KATEGORI_USIA, ordered=True), index=usia.index)
+
+
+def hitung_demografi(df_warga, id_hadir=()):
+    """
+    Menghitung komposisi warga dan kehadiran per kategori usia dalam satu groupby.
+
+    Args:
+        df_warga (pd.DataFrame): Warga dengan kolom 'id', 'kategori_usia', 'jenis_kelamin' ('L'/'P').
+        id_hadir (array-like): Id warga yang hadir pada tanggal terpilih.
+
+    Returns:
+        pd.DataFrame: Index = semua `KATEGORI_USIA`; kolom 'total', 'laki', 'perempuan',
+        'hadir', 'hadir_laki', 'hadir_perempuan'.
+    """
+    data = pd.DataFrame({
+        'kategori_usia': pd.Categorical(df_warga['kategori_usia'], categories=KATEGORI_USIA, ordered=True),
+        'jenis_kelamin': pd.Categorical(df_warga['jenis_kelamin'], categories=['L', 'P']),
+        'hadir': df_warga['id'].isin(id_hadir).to_numpy(),
+    })
+    hitung = data.groupby(['kategori_usia', 'jenis_kelamin'], observed=False)['hadir'].agg(jumlah='size', hadir='sum')
+    tabel = hitung.unstack('jenis_kelamin', fill_value=0)
+    demografi = pd.DataFrame({
+        'laki': tabel[('jumlah', 'L')], 'perempuan': tabel[('jumlah', 'P')],
+        'hadir_laki': tabel[('hadir', 'L')], 'hadir_perempuan': tabel[('hadir', 'P')],
+    }).astype(int)
+    demografi.insert(0, 'total', demografi['laki'] + demografi['perempuan'])
+    demografi.insert(3, 'hadir', demografi['hadir_laki'] + demografi['hadir_perempuan'])
+    demografi.index = demografi.index.astype(str)
+    return demografi
+
+
+
+def agregasi_hierarki(df, kolom_hierarki):
+    """
+    Menghitung jumlah baris per kombinasi kolom hierarki (input siap pakai untuk sunburst).
+
+    Args:
+        df (pd.DataFrame): Data per warga.
+        kolom_hierarki (list): Kolom dari pusat ke luar, mis. ['rt', 'kategori_usia', 'jenis_kelamin'].
+
+    Returns:
+        pd.DataFrame: Satu baris per kombinasi yang ada, dengan kolom `kolom_hierarki` + 'count'.
+    """
+    return df.groupby(kolom_hierarki, observed=True, sort=True, dropna=False).size().reset_index(name='count')
+
+# ==============================================================================
+# MESIN USIA VEKTORISASI (TAHUN, BULAN, HARI PENUH)
+# ==============================================================================
+
+def _ke_hari(nilai):
+    """Mengubah skalar/Series/array tanggal (string ISO, date, datetime) menjadi array datetime64[D]."""
+    if isinstance(nilai, (pd.Series, pd.Index, np.ndarray, list)):
+        seri = pd.Series(nilai)
+    else:
+        seri = pd.Series([nilai])
+    if not pd.api.types.is_datetime64_any_dtype(seri):
+        seri = pd.to_datetime(seri, errors='coerce', utc=True, format='ISO8601')
+    if getattr(seri.dt, 'tz', None) is not None:
+        seri = seri.dt.tz_localize(None)
+    hari = seri.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    return hari if isinstance(nilai, (pd.Series, pd.Index, np.ndarray, list)) else hari[0]
+
+
+def _tanggal_plus_bulan(awal, jumlah_bulan):
+    """`awal + jumlah_bulan` bulan, dengan hari dipotong ke akhir bulan (seperti relativedelta)."""
+    bulan_awal = awal.astype('datetime64[M]')
+    hari_ke = (awal - bulan_awal.astype('datetime64[D]')).astype(np.int64)
+    bulan_tujuan = bulan_awal + jumlah_bulan
+    awal_tujuan = bulan_tujuan.astype('datetime64[D]')
+    panjang_bulan = ((bulan_tujuan + 1).astype('datetime64[D]') - awal_tujuan).astype(np.int64)
+    return awal_tujuan + np.minimum(hari_ke, panjang_bulan - 1)
+
+
+def hitung_usia_vektor(tgl_lahir, tgl_referensi):
+    """
+    Menghitung usia lengkap (tahun, bulan, hari penuh) untuk banyak warga sekaligus.
+
+    Hasilnya identik dengan `relativedelta(tgl_referensi, tgl_lahir)` per baris,
+    tetapi dihitung dengan operasi NumPy pada seluruh Series.
+
+    Args:
+        tgl_lahir: Skalar atau Series tanggal lahir.
+        tgl_referensi: Skalar atau Series tanggal acuan (misal tanggal pemeriksaan).
+
+    Returns:
+        pd.DataFrame: Kolom 'tahun', 'bulan', 'hari' (Int64, <NA> bila tanggal kosong),
+        dengan index mengikuti argumen yang berupa Series.
+    """
+    index = next((x.index for x in (tgl_lahir, tgl_referensi) if isinstance(x, pd.Series)), None)
+    lahir, referensi = np.broadcast_arrays(np.atleast_1d(_ke_hari(tgl_lahir)), np.atleast_1d(_ke_hari(tgl_referensi)))
+    kosong = np.isnat(lahir) | np.isnat(referensi)
+    lahir = np.where(kosong, np.datetime64('2000-01-01'), lahir)
+    referensi = np.where(kosong, np.datetime64('2000-01-01'), referensi)
+
+    # Sama seperti relativedelta: jangkar = lahir + total_bulan, lalu dikoreksi satu bulan
+    total_bulan = referensi.astype('datetime64[M]').astype(np.int64) - lahir.astype('datetime64[M]').astype(np.int64)
+    jangkar = _tanggal_plus_bulan(lahir, total_bulan)
+    negatif = referensi < lahir
+    koreksi = np.where(negatif, referensi > jangkar, -(referensi < jangkar).astype(np.int64))
+    total_bulan = total_bulan + koreksi
+    jangkar = np.where(koreksi != 0, _tanggal_plus_bulan(lahir, total_bulan), jangkar)
+    hari = (referensi - jangkar).astype(np.int64)
+
+    tanda = np.sign(total_bulan)
+    hasil = pd.DataFrame({
+        'tahun': tanda * (np.abs(total_bulan) // 12),
+        'bulan': tanda * (np.abs(total_bulan) % 12),
+        'hari': hari,
+    }, index=index).astype('Int64')
+    hasil[kosong] = pd.NA
+    return hasil
+
+
+def hitung_usia_bulan_vektor(tgl_lahir, tgl_referensi):
+    """Usia dalam bulan penuh (Int64) untuk skalar/Series tanggal."""
+    usia = hitung_usia_vektor(tgl_lahir, tgl_referensi)
+    return usia['tahun'] * 12 + usia['bulan']
+
+
+def format_usia_teks_vektor(tgl_lahir, tgl_referensi):
+    """
+    Versi vektor dari `format_usia_teks`: Series string 'X Thn Y Bln' ("N/A" bila tanggal kosong).
+    """
+    usia = hitung_usia_vektor(tgl_lahir, tgl_referensi)
+    teks = usia['tahun'].astype(str) + " Thn " + usia['bulan'].astype(str) + " Bln"
+    return teks.where(usia["tahun"].notna(), "N/A")
+
+
 def format_usia_teks(tgl_lahir, tgl_referensi): #12082025 tambahan fungsi untuk ..Tahun..Bulan
     """
     Mengubah tanggal lahir menjadi format string 'X Tahun Y Bulan'.
-    Bekerja dengan objek datetime dari Pandas.
+    Untuk satu warga; gunakan `format_usia_teks_vektor` untuk satu kolom penuh.
     """
     if pd.isna(tgl_lahir):
         return "N/A"
-    delta = relativedelta(tgl_referensi, tgl_lahir)
-    return f"{delta.years} Thn {delta.months} Bln"
\ No newline at end of file
+    return format_usia_teks_vektor(pd.Series([tgl_lahir]), tgl_referensi).iloc[0]
+
+
+# ==============================================================================
+# STATUS GIZI BALITA (Z-SCORE WHO UNTUK BANYAK ANAK SEKALIGUS)
+# ==============================================================================
+
+# Tabel WHO yang tersedia mencakup umur 0-60 bulan (batas atas ikut dihitung sebagai balita)
+USIA_BALITA_BULAN = 60
+
+
+
+def adalah_balita(usia_bulan):
+    """
+    Satu-satunya definisi balita (0 sampai `USIA_BALITA_BULAN` bulan, batas atas termasuk).
+
+    Dipakai rekap status gizi, Buku KMS, dan grafik KMS Manajemen Warga agar ketiganya sepakat.
+
+    Args:
+        usia_bulan (pd.Series): Usia dalam bulan penuh (hasil `hitung_usia_bulan_vektor`).
+
+    Returns:
+        pd.Series: Boolean dengan index yang sama; usia kosong dianggap bukan balita.
+    """
+    return ((usia_bulan >= 0) & (usia_bulan <= USIA_BALITA_BULAN)).fillna(False).astype(bool)
+
+
+INDIKATOR_GIZI = ["wfa", "lhfa", "wfh", "bmi", "hcfa"]
+
+# Kasus gizi yang direkap per RT: {kolom: (indikator, label)}
+KASUS_GIZI = {
+    "stunting": ("lhfa", "Stunting"),
+    "wasting": ("wfh", "Wasting"),
+    "underweight": ("wfa", "Underweight"),
+    "overweight": ("wfh", "Overweight"),
+}
+
+
+def hitung_status_gizi(df_pemeriksaan):
+    """
+    Menghitung z-score WHO dan kategori status gizi seluruh balita dalam satu proses vektor.
+
+    Args:
+        df_pemeriksaan (pd.DataFrame): Pemeriksaan yang sudah digabung dengan data warga; perlu kolom
+            'tanggal_lahir', 'tanggal_pemeriksaan', 'jenis_kelamin' ('L'/'P'), 'berat_badan_kg',
+            'tinggi_badan_cm', dan 'lingkar_kepala_cm'.
+
+    Returns:
+        pd.DataFrame: Hanya baris balita (0-60 bulan), ditambah 'usia_bulan', 'z_<indikator>',
+        'status_<indikator>' untuk setiap `INDIKATOR_GIZI`, dan kolom boolean `KASUS_GIZI`.
+    """
+    usia_bulan = hitung_usia_bulan_vektor(df_pemeriksaan['tanggal_lahir'], df_pemeriksaan['tanggal_pemeriksaan'])
+    balita_saja = adalah_balita(usia_bulan).to_numpy()
+    balita = df_pemeriksaan[balita_saja].copy()
+    balita['usia_bulan'] = usia_bulan[balita_saja].to_numpy(dtype=float)
+
+    def angka(kolom):
+        if kolom not in balita.columns:
+            return np.full(len(balita), np.nan)
+        return pd.to_numeric(balita[kolom], errors='coerce').to_numpy(dtype=float)
+
+    x = balita['usia_bulan'].to_numpy()
+    berat, tinggi, lingkar_kepala = angka('berat_badan_kg'), angka('tinggi_badan_cm'), angka('lingkar_kepala_cm')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bmi = np.where(tinggi > 0, berat / (tinggi / 100) ** 2, np.nan)
+
+    z = {indikator: np.full(len(balita), np.nan) for indikator in INDIKATOR_GIZI}
+    jenis_kelamin = balita['jenis_kelamin'].to_numpy()
+    for gender in ('L', 'P'):
+        m = jenis_kelamin == gender
+        if not m.any():
+            continue
+        z['wfa'][m] = zscore('wfa', gender, x[m], berat[m])
+        z['lhfa'][m] = zscore('lhfa', gender, x[m], tinggi[m])
+        z['bmi'][m] = zscore('bmi', gender, x[m], bmi[m])
+        z['hcfa'][m] = zscore('hcfa', gender, x[m], lingkar_kepala[m])
+        # BB/PB untuk < 24 bulan, BB/TB untuk >= 24 bulan (sama seperti grafik KMS)
+        muda, tua = m & (x < 24), m & (x >= 24)
+        z['wfh'][muda] = zscore('wfl', gender, tinggi[muda], berat[muda])
+        z['wfh'][tua] = zscore('wfh', gender, tinggi[tua], berat[tua])
+
+    for indikator, nilai in z.items():
+        balita[f'z_{indikator}'] = nilai
+        balita[f'status_{indikator}'] = kategori_z(indikator, nilai)
+
+    with np.errstate(invalid='ignore'):
+        balita['stunting'] = z['lhfa'] < -2
+        balita['wasting'] = z['wfh'] < -2
+        balita['underweight'] = z['wfa'] < -2
+        balita['overweight'] = z['wfh'] > 2
+    return balita
+
+
+def rekap_status_gizi(df_status, by='rt'):
+    """
+    Merekap jumlah balita dan kasus gizi (`KASUS_GIZI`) per kelompok, misalnya per RT.
+
+    Returns:
+        pd.DataFrame: Index = nilai `by`; kolom 'jumlah_balita' dan satu kolom per kasus.
+    """
+    kolom_kasus = list(KASUS_GIZI)
+    if df_status.empty:
+        return pd.DataFrame(columns=['jumlah_balita'] + kolom_kasus, dtype=int)
+    grup = df_status.groupby(by)
+    rekap = grup[kolom_kasus].sum().astype(int)
+    rekap.insert(0, 'jumlah_balita', grup.size())
+    return rekap
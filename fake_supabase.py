@@ -0,0 +1,174 @@
+# fake_supabase.py
+import copy
+import itertools
+import threading
+from datetime import datetime, timezone
+
+
+class FakeResponse:
+    """Meniru objek respons postgrest (`.data` dan `.count`)."""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Query builder minimal yang meniru rantai `.select().eq().order().range().execute()`."""
+
+    def __init__(self, client, table_name):
+        self._client = client
+        self._table_name = table_name
+        self._filters = []
+        self._order = []
+        self._range = None
+        self._count = None
+        self._action = "select"
+        self._payload = None
+
+    # --- AKSI ---
+    def select(self, columns="*", count=None):
+        self._action, self._count = "select", count
+        self._columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, rows):
+        self._action, self._payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict="id"):
+        self._action, self._payload, self._on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, data):
+        self._action, self._payload = "update", data
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    # --- FILTER ---
+    def _filter(self, column, predicate):
+        self._filters.append(lambda row: row.get(column) is not None and predicate(row.get(column)))
+        return self
+
+    def eq(self, column, value): return self._filter(column, lambda v: v == value)
+    def neq(self, column, value): return self._filter(column, lambda v: v != value)
+    def gt(self, column, value): return self._filter(column, lambda v: str(v) > str(value) if isinstance(value, str) else v > value)
+    def gte(self, column, value): return self._filter(column, lambda v: str(v) >= str(value) if isinstance(value, str) else v >= value)
+    def lt(self, column, value): return self._filter(column, lambda v: str(v) < str(value) if isinstance(value, str) else v < value)
+    def lte(self, column, value): return self._filter(column, lambda v: str(v) <= str(value) if isinstance(value, str) else v <= value)
+    def in_(self, column, values): return self._filter(column, lambda v: v in set(values))
+
+    def order(self, column, desc=False):
+        self._order.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def limit(self, n):
+        self._range = (0, n - 1)
+        return self
+
+    # --- EKSEKUSI ---
+    def _cocok(self, row):
+        return all(f(row) for f in self._filters)
+
+    def execute(self):
+        return self._client._execute(self)
+
+
+class FakeSupabaseClient:
+    """
+    Client Supabase palsu dalam memori untuk menjalankan dan menguji aplikasi secara offline.
+
+    Mendukung subset API yang dipakai aplikasi: select (termasuk `count="exact"`
+    dan proyeksi kolom), filter eq/neq/gt/gte/lt/lte/in_, order, range/limit,
+    insert, upsert, update, dan delete. Kolom `id`, `created_at`, dan
+    `updated_at` diisi otomatis, dan respons dipotong di `max_rows` baris
+    seperti batas baris PostgREST.
+
+    Args:
+        tables (dict, opsional): Data awal, `{nama_tabel: [baris, ...]}`.
+        max_rows (int): Batas baris per respons.
+    """
+
+    def __init__(self, tables=None, max_rows=1000):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.max_rows = max_rows
+        self.jumlah_request = 0
+        self._lock = threading.Lock()
+        semua_id = [r["id"] for rows in self.tables.values() for r in rows if isinstance(r.get("id"), int)]
+        self._id_counter = itertools.count(max(semua_id, default=0) + 1)
+
+    def table(self, table_name):
+        return FakeQuery(self, table_name)
+
+    def _sekarang(self):
+        return datetime.now(timezone.utc).isoformat()
+
+    def _execute(self, query):
+        with self._lock:
+            self.jumlah_request += 1
+            rows = self.tables.setdefault(query._table_name, [])
+            handler = getattr(self, f"_do_{query._action}")
+            return handler(query, rows)
+
+    def _do_select(self, query, rows):
+        hasil = [r for r in rows if query._cocok(r)]
+        for column, desc in reversed(query._order):
+            hasil.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        total = len(hasil)
+        if query._range is not None:
+            start, end = query._range
+            hasil = hasil[start:end + 1]
+        hasil = hasil[:self.max_rows]
+        if query._columns is not None:
+            hasil = [{c: r.get(c) for c in query._columns} for r in hasil]
+        return FakeResponse(copy.deepcopy(hasil), total if query._count == "exact" else None)
+
+    def _baris_baru(self, row):
+        baru = dict(row)
+        baru.setdefault("id", next(self._id_counter))
+        baru.setdefault("created_at", self._sekarang())
+        baru["updated_at"] = self._sekarang()
+        return baru
+
+    def _do_insert(self, query, rows):
+        payload = query._payload if isinstance(query._payload, list) else [query._payload]
+        baru = [self._baris_baru(r) for r in payload]
+        rows.extend(baru)
+        return FakeResponse(copy.deepcopy(baru))
+
+    def _do_upsert(self, query, rows):
+        payload = query._payload if isinstance(query._payload, list) else [query._payload]
+        kunci = [k.strip() for k in query._on_conflict.split(",")]
+        hasil = []
+        for r in payload:
+            lama = next((x for x in rows if all(k in r and x.get(k) == r[k] for k in kunci)), None)
+            if lama is not None:
+                lama.update(r)
+                lama["updated_at"] = self._sekarang()
+                hasil.append(lama)
+            else:
+                baru = self._baris_baru(r)
+                rows.append(baru)
+                hasil.append(baru)
+        return FakeResponse(copy.deepcopy(hasil))
+
+    def _do_update(self, query, rows):
+        hasil = []
+        for r in rows:
+            if query._cocok(r):
+                r.update(query._payload)
+                r["updated_at"] = self._sekarang()
+                hasil.append(r)
+        return FakeResponse(copy.deepcopy(hasil))
+
+    def _do_delete(self, query, rows):
+        hasil = [r for r in rows if query._cocok(r)]
+        rows[:] = [r for r in rows if not query._cocok(r)]
+        return FakeResponse(copy.deepcopy(hasil))
@@ -0,0 +1,80 @@
+# figure_utils.py
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import matplotlib
+from matplotlib.figure import Figure
+
+# Batas figure menganggur yang disimpan per ukuran; kelebihannya dibuang ke GC
+MAKS_FIGURE_PER_UKURAN = 16
+
+_KOLOM_SUBPLOT = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+
+class FigurePool:
+    """
+    Kumpulan objek `matplotlib.figure.Figure` yang dipakai ulang antar-rerun.
+
+    Figure dibuat di luar pyplot, sehingga tidak pernah masuk ke registri
+    global `plt` yang membuat figure lama tertahan di memori selama server
+    hidup. Setelah dipakai, figure dikosongkan (semua axes/artist dilepas),
+    dikembalikan ke setelan awal, lalu disimpan untuk dipakai rerun berikutnya.
+    """
+
+    def __init__(self, maks_per_ukuran: int = MAKS_FIGURE_PER_UKURAN):
+        self.maks_per_ukuran = maks_per_ukuran
+        self._menganggur: Dict[Tuple[float, float], List[Figure]] = {}
+        self._lock = threading.Lock()
+        self.dibuat = self.dipakai_ulang = 0
+
+    def ambil(self, figsize: Tuple[float, float]) -> Figure:
+        kunci = tuple(float(v) for v in figsize)
+        with self._lock:
+            daftar = self._menganggur.get(kunci)
+            if daftar:
+                self.dipakai_ulang += 1
+                return daftar.pop()
+            self.dibuat += 1
+        return Figure(figsize=kunci)
+
+    def kembalikan(self, fig: Figure) -> None:
+        fig.clear()
+        fig.set_facecolor(matplotlib.rcParams["figure.facecolor"])
+        fig.set_edgecolor(matplotlib.rcParams["figure.edgecolor"])
+        # tight_layout/subplots_adjust mengubah jarak subplot; kembalikan ke default
+        fig.subplots_adjust(**{k: matplotlib.rcParams[f"figure.subplot.{k}"] for k in _KOLOM_SUBPLOT})
+        kunci = tuple(float(v) for v in fig.get_size_inches())
+        with self._lock:
+            daftar = self._menganggur.setdefault(kunci, [])
+            if len(daftar) < self.maks_per_ukuran:
+                daftar.append(fig)
+
+    def jumlah_menganggur(self) -> int:
+        with self._lock:
+            return sum(len(d) for d in self._menganggur.values())
+
+
+# Pool bersama untuk semua halaman dalam satu proses server
+pool_figure = FigurePool()
+
+
+@contextmanager
+def figur(figsize: Tuple[float, float] = (6.4, 4.8), nrows: int = 1, ncols: int = 1, **subplots_kwargs):
+    """
+    Meminjam figure dari pool selama blok `with`, lalu selalu mengosongkan dan mengembalikannya.
+
+    Contoh:
+        with figur(figsize=(3, 3)) as (fig, ax):
+            ax.pie(...)
+            st.pyplot(fig)
+
+    Yields:
+        tuple: (Figure, Axes atau array Axes dari `fig.subplots`).
+    """
+    fig = pool_figure.ambil(figsize)
+    try:
+        ax = fig.subplots(nrows, ncols, **subplots_kwargs)
+        yield fig, ax
+    finally:
+        pool_figure.kembalikan(fig)
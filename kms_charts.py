@@ -0,0 +1,655 @@
+# kms_charts.py
+import hashlib
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import streamlit as st
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import MultipleLocator
+from PIL import Image
+
+from figure_utils import figur
+from who_standards import (
+    zscore, kurva_sd, rentang_x,
+    get_interpretation_wfa, get_interpretation_wfh, get_interpretation_bmi,
+    get_interpretation_lhfa, get_interpretation_hcfa,
+)
+
+# ==============================================================================
+# GRAFIK KMS (0-5 TAHUN)
+# ==============================================================================
+
+# --- KONFIGURASI KURVA PERTUMBUHAN WHO ---
+CONFIG: Dict[str, Dict[str, Any]] = {
+    "wfa": {
+        "title": "Berat Badan menurut Umur", "y_col": "berat_kg", "y_label": "Berat Badan (kg)",
+        "interpretation_func": get_interpretation_wfa,
+        "ranges": [
+            {"max_age": 24, "xlim": (0, 24), "ylim": (0, 18), "x_major": 1, "y_major": 1, "age_range_label": "0-24 Bulan"},
+            {"max_age": 61, "xlim": (24, 60), "ylim": (7, 30), "x_major": 1, "y_major": 1, "age_range_label": "24-60 Bulan"},
+        ],
+        "x_axis_label": "Umur (Bulan)",
+    },
+    "wfh": {
+        "title": "Berat Badan menurut Tinggi/Panjang Badan", "x_col": "tinggi_cm", "y_col": "berat_kg", "y_label": "Berat Badan (kg)",
+        "interpretation_func": get_interpretation_wfh,
+        "ranges": [
+            {"max_age": 24, "file_key": "wfl", "x_label": "Panjang Badan (cm)", "xlim": (45, 110), "ylim": (1, 25), "x_major": 5, "y_major": 2},
+            {"max_age": 61, "file_key": "wfh", "x_label": "Tinggi Badan (cm)", "xlim": (65, 120), "ylim": (5, 31), "x_major": 5, "y_major": 2},
+        ],
+    },
+    "bmi": {
+        "title": "Indeks Massa Tubuh (IMT) menurut Umur", "y_col": "bmi", "y_label": "IMT (kg/m²)",
+        "interpretation_func": get_interpretation_bmi,
+        "ranges": [
+            {"max_age": 24, "xlim": (0, 24), "ylim": (9, 23), "x_major": 1, "y_major": 1, "age_range_label": "0-24 Bulan"},
+            {"max_age": 61, "xlim": (24, 60), "ylim": (11.6, 21), "x_major": 2, "y_major": 1, "age_range_label": "24-60 Bulan"},
+        ],
+        "x_axis_label": "Umur (Bulan)",
+    },
+    "lhfa": {
+        "title": "Panjang/Tinggi Badan menurut Umur", "y_col": "tinggi_cm", "y_label": "Panjang/Tinggi Badan (cm)",
+        "interpretation_func": get_interpretation_lhfa,
+        "ranges": [
+            {"max_age": 24, "xlim": (0, 24), "ylim": (43, 100), "x_major": 1, "y_major": 5, "age_range_label": "0-24 Bulan"},
+            {"max_age": 61, "xlim": (24, 60), "ylim": (76, 125), "x_major": 2, "y_major": 5, "age_range_label": "2-5 Tahun"},
+        ],
+        "x_axis_label": "Umur (Bulan)",
+    },
+    "hcfa": {
+        "title": "Lingkar Kepala menurut Umur", "y_col": "lingkar_kepala_cm", "y_label": "Lingkar Kepala (cm)",
+        "interpretation_func": get_interpretation_hcfa,
+        "ranges": [
+            {"max_age": 24, "xlim": (0, 24), "ylim": (32, 52), "x_major": 1, "y_major": 1, "age_range_label": "0-24 Bulan"},
+            {"max_age": 61, "xlim": (24, 60), "ylim": (42, 56), "x_major": 2, "y_major": 1, "age_range_label": "2-5 Tahun"},
+        ],
+        "x_axis_label": "Umur (Bulan)",
+    },
+}
+
+# --- FUNGSI-FUNGSI PEMBANTU UNTUK KMS ---
+
+def calculate_bmi(weight_kg: float, height_cm: float) -> float:
+    """Menghitung Indeks Massa Tubuh (IMT)."""
+    if height_cm == 0 or weight_kg == 0:
+        return 0.0
+    return weight_kg / ((height_cm / 100) ** 2)
+
+# --- FUNGSI PLOTTING UTAMA UNTUK KMS ---
+def _pilih_rentang(chart_type: str, latest_data: pd.Series) -> Tuple[int, Dict[str, Any], str]:
+    """Memilih rentang grafik (indeks, konfigurasi) dan indikator WHO untuk pengukuran terakhir."""
+    cfg = CONFIG[chart_type]
+    # Grafik berbasis umur maupun BB/TB memilih rentang dari umur anak (bulan)
+    umur = latest_data["usia_bulan"]
+    idx = next((i for i, r in enumerate(cfg["ranges"]) if umur < r["max_age"]), len(cfg["ranges"]) - 1)
+    range_cfg = cfg["ranges"][idx]
+    return idx, range_cfg, range_cfg.get("file_key", chart_type)
+
+
+def _gambar_latar(ax: plt.Axes, chart_type: str, gender: str, range_cfg: Dict[str, Any], indikator: str) -> None:
+    """Menggambar bagian grafik yang hanya bergantung pada indikator, jenis kelamin, dan rentang umur."""
+    cfg = CONFIG[chart_type]
+    fig = ax.figure
+    fig.set_facecolor('hotpink' if gender == 'P' else 'steelblue')
+    x_smooth = np.linspace(*rentang_x(indikator, gender, range_cfg["xlim"][0]), 300)
+    smooth_data = kurva_sd(indikator, gender, x_smooth)
+
+    ax.fill_between(x_smooth, smooth_data['SD3neg'], smooth_data['SD2neg'], color='yellow', alpha=0.5)
+    ax.fill_between(x_smooth, smooth_data['SD2neg'], smooth_data['SD2'], color='green', alpha=0.4)
+    ax.fill_between(x_smooth, smooth_data['SD2'], smooth_data['SD3'], color='yellow', alpha=0.5)
+    
+    for col, data in smooth_data.items():
+        ax.plot(x_smooth, data, color='red' if col in ['SD3', 'SD3neg'] else 'black', lw=1, alpha=0.8)
+
+    title_text = f"Grafik {cfg['title']} - {'Perempuan' if gender == 'P' else 'Laki-laki'}"
+    if 'age_range_label' in range_cfg:
+        title_text += f" ({range_cfg['age_range_label']})"
+        
+    ax.set_title(title_text, pad=20, fontsize=16, color='white', fontweight='bold')
+    ax.set_xlabel(cfg.get('x_axis_label') or range_cfg.get('x_label'), fontsize=12, color='white')
+    ax.set_ylabel(cfg['y_label'], fontsize=12, color='white')
+    
+    # Batas sumbu ditetapkan di sini, sehingga lapisan anak tidak mengubah skala
+    ax.set_xlim(range_cfg["xlim"])
+    ax.set_ylim(range_cfg["ylim"])
+
+    ax2 = ax.twinx(); ax2.set_ylim(ax.get_ylim())
+    ax2.yaxis.set_major_locator(MultipleLocator(range_cfg["y_major"]))
+    #ax2.yaxis.set_minor_locator(MultipleLocator(range_cfg["y_minor"]))
+
+    ax.xaxis.set_major_locator(MultipleLocator(range_cfg["x_major"]))
+    ax.yaxis.set_major_locator(MultipleLocator(range_cfg["y_major"]))
+
+    for spine_position in ['top', 'bottom', 'left', 'right']:
+        ax.spines[spine_position].set_visible(False)
+        ax2.spines[spine_position].set_visible(False)
+
+    ax.grid(which='major', linestyle='-', linewidth='0.8', color='gray')
+    ax.grid(which='minor', axis='y', linestyle=':', linewidth='0.5', color='lightgray')
+    
+    # ax.tick_params(axis='x', colors='white')
+    # ax.tick_params(axis='y', colors='white')
+    ax.tick_params(which='major', axis='x', labelcolor='white', length=0)
+    ax.tick_params(which='major', axis='y', labelcolor='white', length=0)
+    ax2.tick_params(which='both', axis='y', labelcolor='white', length=0)
+    fig.tight_layout()
+
+
+def _gambar_anak(ax: plt.Axes, chart_type: str, history_df: pd.DataFrame, x_latest, y_latest, interpretation: str, color: str) -> list:
+    """Menggambar riwayat, pengukuran terakhir, dan interpretasi; mengembalikan artist yang dibuat."""
+    cfg = CONFIG[chart_type]
+    x_col = cfg.get("x_col", "usia_bulan")
+    y_col = cfg["y_col"]
+    artists = ax.plot(history_df[x_col].astype(float), history_df[y_col].astype(float), marker='o', linestyle='-', color='darkviolet', label='Riwayat Pertumbuhan')
+    artists.append(ax.scatter(x_latest, y_latest, marker='*', c='cyan', s=300, ec='black', zorder=10, label='Pengukuran Terakhir'))
+
+    # Anotasi dan Label
+    props = dict(boxstyle='round', facecolor=color, alpha=0.8)
+    artists.append(ax.text(0.03, 0.97, f"Interpretasi: {interpretation}", transform=ax.transAxes, fontsize=12, color='white', fontweight='bold', va='top', bbox=props))
+    artists.append(ax.legend(loc='lower right'))
+    return artists
+
+
+def _data_terakhir(chart_type: str, latest_data: pd.Series):
+    cfg = CONFIG[chart_type]
+    return latest_data[cfg.get("x_col", "usia_bulan")], latest_data[cfg["y_col"]]
+
+
+def _interpretasi_terakhir(chart_type: str, gender: str, latest_data: pd.Series, indikator: str) -> Tuple[str, str]:
+    x_latest, y_latest = _data_terakhir(chart_type, latest_data)
+    # Z-score dihitung langsung dari parameter LMS WHO (tanpa pencocokan kurva)
+    z_latest = zscore(indikator, gender, x_latest, y_latest)
+    return CONFIG[chart_type]["interpretation_func"](z_latest)
+
+
+def _gambar_kosong(ax: plt.Axes, chart_type: str) -> None:
+    ax.text(0.5, 0.5, 'Data tidak tersedia', horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
+    ax.set_title(f"Grafik {CONFIG[chart_type]['title']}", pad=20, fontsize=16)
+
+
+def create_growth_chart(ax: plt.Axes, chart_type: str, history_df: pd.DataFrame, gender: str, latest_data: pd.Series) -> Optional[str]:
+    """Menggambar satu grafik KMS lengkap pada `ax`; mengembalikan teks interpretasi (None jika data kosong)."""
+    x_latest, y_latest = _data_terakhir(chart_type, latest_data)
+    if y_latest is None or y_latest <= 0:
+        _gambar_kosong(ax, chart_type)
+        return None
+
+    _, range_cfg, indikator = _pilih_rentang(chart_type, latest_data)
+    interpretation, color = _interpretasi_terakhir(chart_type, gender, latest_data, indikator)
+    _gambar_latar(ax, chart_type, gender, range_cfg, indikator)
+    _gambar_anak(ax, chart_type, history_df, x_latest, y_latest, interpretation, color)
+    return interpretation
+
+
+# ==============================================================================
+# TEMPLATE LATAR GRAFIK KMS (SEKALI PER INDIKATOR x JENIS KELAMIN x RENTANG)
+# ==============================================================================
+
+class _TemplateKMS:
+    """Figure berisi latar grafik yang siap ditimpa lapisan data anak; dipakai bergantian lewat `lock`."""
+
+    def __init__(self, chart_type: str, gender: str, range_idx: int):
+        range_cfg = CONFIG[chart_type]["ranges"][range_idx]
+        # Figure di luar pyplot: tidak ikut dikelola (atau ditutup) oleh state global pyplot
+        self.fig = Figure(figsize=(12, 7))
+        self.ax = self.fig.subplots()
+        self.lock = threading.Lock()
+        _gambar_latar(self.ax, chart_type, gender, range_cfg, range_cfg.get("file_key", chart_type))
+
+
+_templates: Dict[Tuple[str, str, int], _TemplateKMS] = {}
+_templates_lock = threading.Lock()
+
+
+def _template_kms(chart_type: str, gender: str, range_idx: int) -> _TemplateKMS:
+    key = (chart_type, gender, range_idx)
+    with _templates_lock:
+        if key not in _templates:
+            _templates[key] = _TemplateKMS(*key)
+        return _templates[key]
+
+
+class _TemplateRasterKMS(_TemplateKMS):
+    """
+    Template yang latarnya sudah dirender menjadi piksel (untuk cetak massal).
+
+    Latar digambar sekali pada `dpi` tertentu; untuk setiap anak piksel latar
+    dipulihkan, lapisan anak saja yang digambar di atasnya (blit), lalu hasilnya
+    dipotong ke batas "tight" yang juga dihitung sekali.
+    """
+
+    def __init__(self, chart_type: str, gender: str, range_idx: int, dpi: int):
+        super().__init__(chart_type, gender, range_idx)
+        self.fig.set_dpi(dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.canvas.draw()
+        self.latar = self.canvas.copy_from_bbox(self.fig.bbox)
+        # Setara bbox_inches="tight" (pad 0.1 inci) milik savefig, dalam piksel dari kiri atas
+        x0, y0, x1, y1 = (self.fig.get_tightbbox(self.canvas.get_renderer()).padded(0.1).extents * dpi).round().astype(int)
+        tinggi = int(self.fig.bbox.height)
+        self.potong = (slice(max(0, tinggi - y1), tinggi - max(0, y0)), slice(max(0, x0), x1))
+
+
+_templates_raster: Dict[Tuple[str, str, int, int], _TemplateRasterKMS] = {}
+
+
+def _template_raster_kms(chart_type: str, gender: str, range_idx: int, dpi: int) -> _TemplateRasterKMS:
+    key = (chart_type, gender, range_idx, dpi)
+    with _templates_lock:
+        if key not in _templates_raster:
+            _templates_raster[key] = _TemplateRasterKMS(*key)
+        return _templates_raster[key]
+
+
+# Naikkan jika tampilan grafik berubah agar PNG lama di cache disk tidak dipakai lagi
+VERSI_RENDER = 2
+
+# Urutan grafik KMS yang ditampilkan untuk setiap anak
+JENIS_GRAFIK_KMS = ["wfa", "lhfa", "wfh", "bmi", "hcfa"]
+
+# Kolom riwayat yang menentukan isi grafik (dipakai untuk hash riwayat)
+_KOLOM_RIWAYAT = ["usia_bulan", "berat_kg", "tinggi_cm", "lingkar_kepala_cm", "bmi", "jenis_kelamin"]
+
+
+def render_kms_chart(chart_type: str, history_df: pd.DataFrame, gender: str, latest_data: pd.Series) -> Tuple[bytes, Optional[str]]:
+    """
+    Merender satu grafik KMS menjadi PNG tanpa menampilkan apa pun ke halaman.
+
+    Latar (pita dan garis SD, sumbu, judul) diambil dari template yang sudah
+    digambar; hanya riwayat, bintang pengukuran terakhir, dan kotak interpretasi
+    yang digambar per anak, lalu dilepas lagi setelah disimpan.
+
+    Returns:
+        tuple: (bytes PNG, teks interpretasi atau None).
+    """
+    buffer = BytesIO()
+    x_latest, y_latest = _data_terakhir(chart_type, latest_data)
+    if y_latest is None or y_latest <= 0:
+        with figur(figsize=(12, 7)) as (fig, ax):
+            _gambar_kosong(ax, chart_type)
+            fig.savefig(buffer, format="png", bbox_inches="tight", dpi=200)
+        return buffer.getvalue(), None
+
+    range_idx, _, indikator = _pilih_rentang(chart_type, latest_data)
+    interpretation, color = _interpretasi_terakhir(chart_type, gender, latest_data, indikator)
+    template = _template_kms(chart_type, gender, range_idx)
+    with template.lock:
+        artists = _gambar_anak(template.ax, chart_type, history_df, x_latest, y_latest, interpretation, color)
+        try:
+            # Setara dengan keluaran st.pyplot (PNG, bbox tight, dpi 200)
+            template.fig.savefig(buffer, format="png", bbox_inches="tight", dpi=200)
+        finally:
+            for artist in artists:
+                artist.remove()
+    return buffer.getvalue(), interpretation
+
+
+# Resolusi dan kualitas grafik untuk PDF; cukup tajam untuk cetak setengah lebar halaman
+DPI_CETAK_KMS = 80
+KUALITAS_JPEG_CETAK = 75
+
+
+def render_kms_chart_cetak(chart_type: str, history_df: pd.DataFrame, gender: str, latest_data: pd.Series,
+                           dpi: int = DPI_CETAK_KMS) -> Tuple[bytes, Optional[str]]:
+    """
+    Seperti `render_kms_chart`, tetapi latar tidak digambar ulang per anak dan hasilnya JPEG (untuk buku KMS).
+
+    Piksel latar diambil dari `_TemplateRasterKMS`, sehingga yang dirender per
+    grafik hanya riwayat, bintang, kotak interpretasi, dan legenda. Hasilnya sama
+    dengan `savefig(bbox_inches="tight")` pada `dpi` yang sama.
+
+    Returns:
+        tuple: (bytes JPEG, teks interpretasi atau None).
+    """
+    x_latest, y_latest = _data_terakhir(chart_type, latest_data)
+    if y_latest is None or y_latest <= 0:
+        buffer = BytesIO()
+        with figur(figsize=(12, 7)) as (fig, ax):
+            _gambar_kosong(ax, chart_type)
+            fig.savefig(buffer, format="jpeg", bbox_inches="tight", dpi=dpi, pil_kwargs={"quality": KUALITAS_JPEG_CETAK})
+        return buffer.getvalue(), None
+
+    range_idx, _, indikator = _pilih_rentang(chart_type, latest_data)
+    interpretation, color = _interpretasi_terakhir(chart_type, gender, latest_data, indikator)
+    template = _template_raster_kms(chart_type, gender, range_idx, dpi)
+    with template.lock:
+        template.canvas.restore_region(template.latar)
+        artists = _gambar_anak(template.ax, chart_type, history_df, x_latest, y_latest, interpretation, color)
+        try:
+            for artist in artists:
+                template.ax.draw_artist(artist)
+            piksel = np.asarray(template.canvas.buffer_rgba())[template.potong]
+            gambar = Image.fromarray(piksel).convert("RGB")
+        finally:
+            for artist in artists:
+                artist.remove()
+    buffer = BytesIO()
+    # JPEG disisipkan reportlab apa adanya ke PDF (PNG harus di-decode dan dikompresi ulang)
+    gambar.save(buffer, format="jpeg", quality=KUALITAS_JPEG_CETAK)
+    return buffer.getvalue(), interpretation
+
+
+def hash_riwayat(history_df: pd.DataFrame) -> str:
+    """Hash isi riwayat pengukuran; berubah hanya jika ada pemeriksaan baru/diedit."""
+    kolom = [k for k in _KOLOM_RIWAYAT if k in history_df.columns]
+    data = history_df[kolom].sort_values(kolom[0]).reset_index(drop=True) if kolom else history_df
+    nilai = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    h = hashlib.sha1(nilai.tobytes())
+    h.update(f"{VERSI_RENDER}|{','.join(kolom)}".encode())
+    return h.hexdigest()
+
+
+# Batas ukuran cache disk KMS; bila terlampaui, berkas yang paling lama tidak dipakai dihapus
+BATAS_CACHE_DISK_MB = 200
+
+# Nama berkas/folder yang dibuat `KMSRenderCache` (hanya ini yang boleh dihapus saat dibersihkan)
+_POLA_BERKAS_CACHE = re.compile(r"[0-9a-f]{40}\.(png|txt)")
+_POLA_FOLDER_VERSI = re.compile(r"v\d+")
+
+
+class KMSRenderCache:
+    """
+    Cache gambar grafik KMS (PNG layar, JPEG cetak) berkunci `(warga_id, chart_type, hash riwayat[, dpi])`.
+
+    Tingkat pertama adalah memori dengan pengusiran LRU (`max_items` entri);
+    tingkat kedua (opsional) adalah folder di disk sehingga grafik tetap
+    tersedia setelah aplikasi dimulai ulang. Aman dipakai bersama oleh
+    beberapa sesi sekaligus.
+
+    Berkas disk disimpan di subfolder `v<VERSI_RENDER>`; folder versi lain (yang
+    tidak akan pernah dibaca lagi) dihapus saat cache dibuat. Total ukurannya
+    dibatasi `max_disk_bytes`: bila terlampaui, entri dengan waktu pakai terlama
+    (mtime, diperbarui tiap kali dibaca) dihapus sampai tersisa ~80% batas.
+    """
+
+    def __init__(self, max_items: int = 256, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = BATAS_CACHE_DISK_MB * 2**20):
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._items: "OrderedDict[Hashable, Tuple[bytes, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._kunci_pangkas = threading.Lock()
+        self.hits = self.misses = 0
+        self._ukuran_disk = 0
+        if disk_dir:
+            self.disk_dir = os.path.join(disk_dir, f"v{VERSI_RENDER}")
+            self._hapus_versi_lama(disk_dir)
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._ukuran_disk = sum(ukuran for _, _, ukuran in self._entri_disk())
+
+    def _hapus_versi_lama(self, folder: str) -> None:
+        """Menghapus cache versi render lain dan berkas lepas dari tata letak lama (langsung di `folder`)."""
+        try:
+            isi = os.listdir(folder)
+        except OSError:
+            return
+        for nama in isi:
+            path = os.path.join(folder, nama)
+            if _POLA_FOLDER_VERSI.fullmatch(nama) and nama != f"v{VERSI_RENDER}":
+                shutil.rmtree(path, ignore_errors=True)
+            elif _POLA_BERKAS_CACHE.fullmatch(nama):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _entri_disk(self) -> list:
+        """Entri di folder disk: list `(waktu pakai terakhir, path tanpa ekstensi, ukuran byte)`."""
+        entri = {}
+        with os.scandir(self.disk_dir) as isi:
+            for berkas in isi:
+                if not _POLA_BERKAS_CACHE.fullmatch(berkas.name):
+                    continue
+                try:
+                    info = berkas.stat()
+                except OSError:
+                    continue
+                path = os.path.join(self.disk_dir, berkas.name[:-4])
+                waktu, ukuran = entri.get(path, (0.0, 0))
+                entri[path] = (max(waktu, info.st_mtime), ukuran + info.st_size)
+        return [(waktu, path, ukuran) for path, (waktu, ukuran) in entri.items()]
+
+    def _pangkas_disk(self) -> None:
+        """Menghapus entri disk terlama sampai total ukuran <= 80% `max_disk_bytes`."""
+        if not self._kunci_pangkas.acquire(blocking=False):
+            return  # Thread lain sedang memangkas
+        try:
+            entri = sorted(self._entri_disk())
+            total = sum(ukuran for _, _, ukuran in entri)
+            target = self.max_disk_bytes * 0.8
+            for _, path, ukuran in entri:
+                if total <= target:
+                    break
+                for ekstensi in (".png", ".txt"):
+                    try:
+                        os.remove(path + ekstensi)
+                    except OSError:
+                        pass
+                total -= ukuran
+            with self._lock:
+                self._ukuran_disk = total
+        finally:
+            self._kunci_pangkas.release()
+
+    def _path_disk(self, key: Hashable) -> str:
+        nama = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, nama)
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, Optional[str]]]:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        if self.disk_dir:
+            path = self._path_disk(key)
+            try:
+                with open(path + ".png", "rb") as f:
+                    png = f.read()
+                with open(path + ".txt", encoding="utf-8") as f:
+                    interpretasi = f.read() or None
+                # Tandai baru dipakai agar tidak ikut terpangkas lebih dulu
+                os.utime(path + ".png")
+            except OSError:
+                pass
+            else:
+                self._simpan_memori(key, (png, interpretasi))
+                with self._lock:
+                    self.hits += 1
+                return png, interpretasi
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: Hashable, value: Tuple[bytes, Optional[str]]) -> None:
+        self._simpan_memori(key, value)
+        if self.disk_dir:
+            path = self._path_disk(key)
+            png, interpretasi = value
+            ditulis = 0
+            # Tulis ke berkas sementara lalu ganti nama agar pembaca tidak melihat berkas setengah jadi
+            for ekstensi, isi, mode in ((".txt", (interpretasi or "").encode("utf-8"), "wb"), (".png", png, "wb")):
+                sementara = f"{path}{ekstensi}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(sementara, mode) as f:
+                    f.write(isi)
+                os.replace(sementara, path + ekstensi)
+                ditulis += len(isi)
+            with self._lock:
+                self._ukuran_disk += ditulis
+                penuh = self._ukuran_disk > self.max_disk_bytes
+            if penuh:
+                self._pangkas_disk()
+
+    def _simpan_memori(self, key: Hashable, value: Tuple[bytes, Optional[str]]) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Tuple[bytes, Optional[str]]]) -> Tuple[bytes, Optional[str]]:
+        """Mengembalikan entri dari cache, atau memanggil `render()` lalu menyimpannya."""
+        value = self.get(key)
+        if value is None:
+            value = render()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+@st.cache_resource
+def get_kms_render_cache() -> KMSRenderCache:
+    """
+    Cache render KMS bersama (satu per proses).
+
+    Folder tingkat disk diatur lewat env/secrets `KMS_CACHE_DIR`; isi string
+    kosong untuk hanya memakai cache memori. Ukurannya dibatasi `BATAS_CACHE_DISK_MB`.
+    """
+    default_dir = os.path.join(".cache", "kms")
+    disk_dir = os.environ.get("KMS_CACHE_DIR")
+    if disk_dir is None:
+        try:
+            disk_dir = st.secrets.get("KMS_CACHE_DIR", default_dir)
+        except Exception:
+            disk_dir = default_dir
+    return KMSRenderCache(disk_dir=disk_dir or None)
+
+
+# ==============================================================================
+# RENDER PARALEL (PROCESS POOL)
+# ==============================================================================
+
+def _init_worker() -> None:
+    """Inisialisasi proses worker: backend Agg (tanpa GUI) untuk render PNG."""
+    matplotlib.use("Agg")
+
+
+def _jumlah_worker_render() -> int:
+    jumlah = os.environ.get("KMS_RENDER_WORKERS")
+    if jumlah is None:
+        try:
+            jumlah = st.secrets.get("KMS_RENDER_WORKERS")
+        except Exception:
+            jumlah = None
+    if jumlah is None:
+        return min(len(JENIS_GRAFIK_KMS), os.cpu_count() or 1)
+    return int(jumlah)
+
+
+@st.cache_resource
+def get_kms_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool bersama untuk render grafik KMS, atau None jika render dilakukan berurutan.
+
+    Jumlah worker diatur lewat env/secrets `KMS_RENDER_WORKERS` (default:
+    satu per grafik, dibatasi jumlah CPU); isi 0 atau 1 untuk mematikan.
+    Worker dibuat dengan metode "spawn" agar tidak mewarisi thread server Streamlit.
+    """
+    jumlah = _jumlah_worker_render()
+    if jumlah <= 1:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=jumlah, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+    )
+
+
+def _future_selesai(fungsi: Callable[[], Any]) -> Future:
+    future: Future = Future()
+    try:
+        future.set_result(fungsi())
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def render_kms_charts(chart_types: Iterable[str], history_df: pd.DataFrame, gender: str, latest_data: pd.Series,
+                      executor: Optional[ProcessPoolExecutor] = None) -> Iterator[Tuple[str, Future]]:
+    """
+    Merender beberapa grafik KMS sekaligus dan menghasilkan `(chart_type, future)` sesuai urutan selesai.
+
+    Dengan `executor`, setiap grafik dirender di proses terpisah sehingga waktu total
+    mendekati grafik yang paling lambat; tanpa executor (atau bila pool rusak) grafik
+    dirender berurutan di proses ini. Panggil `future.result()` untuk mendapatkan
+    `(bytes PNG, interpretasi)` atau memunculkan galat render grafik tersebut.
+    """
+    chart_types = list(chart_types)
+
+    def render_lokal(chart_type):
+        return _future_selesai(lambda: render_kms_chart(chart_type, history_df, gender, latest_data))
+
+    if executor is None:
+        for chart_type in chart_types:
+            yield chart_type, render_lokal(chart_type)
+        return
+
+    try:
+        futures = {executor.submit(render_kms_chart, ct, history_df, gender, latest_data): ct for ct in chart_types}
+    except (BrokenProcessPool, RuntimeError):
+        get_kms_process_pool.clear()
+        yield from render_kms_charts(chart_types, history_df, gender, latest_data)
+        return
+
+    for future in as_completed(futures):
+        chart_type = futures[future]
+        if isinstance(future.exception(), BrokenProcessPool):
+            # Worker mati (mis. kehabisan memori): buat pool baru nanti, render grafik ini di sini
+            get_kms_process_pool.clear()
+            future = render_lokal(chart_type)
+        yield chart_type, future
+
+
+def render_kms_anak(history_df: pd.DataFrame, gender: str, latest_data: pd.Series,
+                    chart_types: Iterable[str] = JENIS_GRAFIK_KMS, dpi: int = DPI_CETAK_KMS) -> Dict[str, Tuple[bytes, Optional[str]]]:
+    """Merender grafik cetak satu anak; `{chart_type: (bytes JPEG, interpretasi)}`."""
+    return {ct: render_kms_chart_cetak(ct, history_df, gender, latest_data, dpi) for ct in chart_types}
+
+
+def render_kms_banyak(permintaan: Dict[Hashable, Tuple[pd.DataFrame, str, pd.Series, Iterable[str]]],
+                      executor: Optional[ProcessPoolExecutor] = None, dpi: int = DPI_CETAK_KMS) -> Iterator[Tuple[Hashable, Future]]:
+    """
+    Merender grafik cetak banyak anak sekaligus; menghasilkan `(kunci, future)` sesuai urutan selesai.
+
+    `permintaan` berisi `{kunci: (history_df, gender, latest_data, chart_types)}`.
+    Dengan `executor`, satu tugas per anak dibagi ke proses worker (template latar
+    dipakai ulang di setiap worker); tanpa executor, atau bila pool rusak, grafik
+    dirender berurutan di proses ini. `future.result()` berisi keluaran `render_kms_anak`.
+    """
+    def render_lokal(kunci):
+        history_df, gender, latest_data, chart_types = permintaan[kunci]
+        return _future_selesai(lambda: render_kms_anak(history_df, gender, latest_data, chart_types, dpi))
+
+    if executor is None:
+        for kunci in permintaan:
+            yield kunci, render_lokal(kunci)
+        return
+
+    try:
+        futures = {executor.submit(render_kms_anak, *args, dpi): kunci for kunci, args in permintaan.items()}
+    except (BrokenProcessPool, RuntimeError):
+        get_kms_process_pool.clear()
+        yield from render_kms_banyak(permintaan, dpi=dpi)
+        return
+
+    for future in as_completed(futures):
+        kunci = futures[future]
+        if isinstance(future.exception(), BrokenProcessPool):
+            get_kms_process_pool.clear()
+            future = render_lokal(kunci)
+        yield kunci, future
@@ -0,0 +1,309 @@
+# laporan.py
+import pandas as pd
+
+from data_utils import (
+    format_usia_teks_vektor, KATEGORI_USIA, kategorikan_usia, hitung_demografi,
+    agregasi_hierarki, hitung_status_gizi, rekap_status_gizi, KASUS_GIZI, hitung_usia_bulan_vektor, adalah_balita
+)
+
+# ==============================================================================
+# DATA LAPORAN (DIPAKAI HALAMAN DASHBOARD DAN PDF)
+# ==============================================================================
+
+WILAYAH_SEMUA = "Lingkungan (Semua RT)"
+KATEGORI_SEMUA = "Tampilkan Semua"
+
+# Kolom tabel demografi (`hitung_demografi`) untuk tiap pilihan filter jenis kelamin
+KOLOM_DEMOGRAFI_GENDER = {
+    "Semua": ("total", "hadir"),
+    "Laki-laki": ("laki", "hadir_laki"),
+    "Perempuan": ("perempuan", "hadir_perempuan"),
+}
+KODE_GENDER = {"Laki-laki": "L", "Perempuan": "P"}
+
+COLUMN_MAPS = {
+    'nama_lengkap': 'Nama Lengkap',
+    'usia_teks': 'Usia',
+    'rt': 'RT',
+    'blok': 'Blok',
+    'berat_badan_kg': 'Berat\nBadan\n(kg)',
+    'tinggi_badan_cm': 'Tinggi\nBadan\n(cm)',
+    'lingkar_lengan_cm': 'Lingkar\nLengan\n(cm)',
+    'lingkar_perut_cm': 'Lingkar\nPerut\n(cm)',
+    'lingkar_kepala_cm': 'Lingkar\nKepala\n(cm)',
+    'tensi_sistolik': 'Tensi\nSistolik',
+    'tensi_diastolik': 'Tensi\nDiastolik',
+    'gula_darah': 'Gula\nDarah',
+    'kolesterol': 'Kolesterol'
+}
+
+KOLOM_TIDAK_HADIR_PDF = ['kategori_usia', 'nama_lengkap', 'usia_teks', 'rt', 'blok']
+
+
+def siapkan_warga(df_warga, tanggal):
+    """
+    Menambahkan usia (tahun), usia_teks, dan kategori_usia pada tanggal posyandu.
+
+    Warga yang belum lahir pada `tanggal` dibuang, sehingga semua perhitungan
+    selanjutnya hanya memakai data yang valid.
+
+    Returns:
+        pd.DataFrame: Salinan `df_warga` dengan kolom tambahan.
+    """
+    df = df_warga.copy()
+    df['tanggal_lahir'] = pd.to_datetime(df['tanggal_lahir'])
+    df['usia'] = (pd.to_datetime(tanggal) - df['tanggal_lahir']).dt.days / 365.25
+    df = df[df['usia'] >= 0].copy()
+    df['usia_teks'] = format_usia_teks_vektor(df['tanggal_lahir'], tanggal)
+    df['kategori_usia'] = kategorikan_usia(df['usia'])
+    return df
+
+
+def siapkan_pemeriksaan_harian(df_pemeriksaan_harian):
+    """Menormalkan kolom tanggal pemeriksaan; tabel kosong tetap punya kolom kunci."""
+    if df_pemeriksaan_harian.empty:
+        return pd.DataFrame(columns=['id', 'warga_id', 'tanggal_pemeriksaan'])
+    df = df_pemeriksaan_harian.copy()
+    df['tanggal_pemeriksaan'] = pd.to_datetime(df['tanggal_pemeriksaan']).dt.date
+    return df
+
+
+def daftar_wilayah(df_warga):
+    """Pilihan wilayah: seluruh lingkungan lalu setiap RT."""
+    return [WILAYAH_SEMUA] + sorted(df_warga['rt'].dropna().unique().tolist())
+
+
+def filter_wilayah(df_warga, wilayah):
+    return df_warga if wilayah == WILAYAH_SEMUA else df_warga[df_warga['rt'] == wilayah]
+
+
+def _label_jenis_kelamin(kode):
+    return kode.map({'L': 'Laki-laki', 'P': 'Perempuan'}).fillna('N/A')
+
+
+def buat_sunburst_komposisi(df_warga_wilayah, gender="Semua"):
+    """
+    Sunburst komposisi warga (Total > Kategori Usia > Jenis Kelamin) dari data teragregasi,
+    sehingga ukuran figure tidak bergantung pada jumlah warga.
+
+    Returns:
+        go.Figure | None: None jika tidak ada warga yang cocok dengan filter.
+    """
+    df_komposisi = agregasi_hierarki(df_warga_wilayah, ['kategori_usia', 'jenis_kelamin'])
+    df_komposisi['kategori_usia'] = df_komposisi['kategori_usia'].astype(str)
+    df_komposisi['jenis_kelamin'] = _label_jenis_kelamin(df_komposisi['jenis_kelamin'])
+    if gender != "Semua":
+        df_komposisi = df_komposisi[df_komposisi['jenis_kelamin'] == gender]
+    if df_komposisi.empty:
+        return None
+
+    import plotly.express as px  # dimuat saat grafik pertama digambar
+
+    # Kolom label total sebagai pusat diagram
+    df_komposisi = df_komposisi.assign(total_label=f"Total Warga: {int(df_komposisi['count'].sum())}")
+    fig = px.sunburst(
+        df_komposisi,
+        path=['total_label', 'kategori_usia', 'jenis_kelamin'],
+        values='count',
+        title='Diagram Komposisi Warga (Total > Kategori Usia > Jenis Kelamin)',
+        color='kategori_usia',
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+    fig.update_layout(margin=dict(t=50, l=25, r=25, b=25))
+    fig.update_traces(textinfo='label+percent parent', insidetextorientation='radial')
+    return fig
+
+
+def buat_sunburst_partisipasi(df_warga_wilayah, id_hadir, gender="Semua"):
+    """
+    Sunburst warga yang hadir (Total > RT > Kategori Usia > Jenis Kelamin).
+
+    Returns:
+        go.Figure | None: None jika tidak ada warga hadir yang cocok dengan filter.
+    """
+    df_partisipasi = agregasi_hierarki(
+        df_warga_wilayah[df_warga_wilayah['id'].isin(id_hadir)],
+        ['rt', 'kategori_usia', 'jenis_kelamin']
+    )
+    df_partisipasi['kategori_usia'] = df_partisipasi['kategori_usia'].astype(str)
+    df_partisipasi['jenis_kelamin'] = _label_jenis_kelamin(df_partisipasi['jenis_kelamin'])
+    df_partisipasi['rt'] = 'RT ' + df_partisipasi['rt'].astype(str)
+    if gender != "Semua":
+        df_partisipasi = df_partisipasi[df_partisipasi['jenis_kelamin'] == gender]
+    if df_partisipasi.empty:
+        return None
+
+    import plotly.express as px
+
+    df_partisipasi = df_partisipasi.assign(total_label=f"Total Hadir: {int(df_partisipasi['count'].sum())}")
+    fig = px.sunburst(
+        df_partisipasi,
+        path=['total_label', 'rt', 'kategori_usia', 'jenis_kelamin'],
+        values='count',
+        title='Diagram Partisipasi Warga Hadir (Total > RT > Kategori Usia > Jenis Kelamin)',
+        color='rt',
+        color_discrete_sequence=px.colors.qualitative.Antique
+    )
+    fig.update_layout(margin=dict(t=50, l=25, r=25, b=25))
+    fig.update_traces(textinfo='label+percent parent', insidetextorientation='radial')
+    return fig
+
+
+def buat_donut_partisipasi(demografi, kolom_total="total", kolom_hadir="hadir", kolom_per_baris=4):
+    """
+    Membuat satu figure Plotly berisi donut Hadir/Tidak Hadir untuk setiap kategori usia.
+
+    Args:
+        demografi (pd.DataFrame): Hasil `hitung_demografi` (index = kategori usia).
+        kolom_total (str): Kolom jumlah warga (mis. 'total', 'laki', 'perempuan').
+        kolom_hadir (str): Kolom jumlah hadir yang sesuai dengan `kolom_total`.
+
+    Returns:
+        go.Figure | None: None jika tidak ada kategori dengan warga.
+    """
+    data = demografi[demografi[kolom_total] > 0]
+    if data.empty:
+        return None
+
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    jumlah_baris = -(-len(data) // kolom_per_baris)
+    fig = make_subplots(
+        rows=jumlah_baris, cols=kolom_per_baris,
+        specs=[[{"type": "domain"}] * kolom_per_baris for _ in range(jumlah_baris)],
+        subplot_titles=[k.replace(" (", "<br>(") for k in data.index], vertical_spacing=0.12,
+    )
+    fig.update_annotations(font_size=11)  # judul subplot = nama kategori
+    for i, (nama_kategori, baris) in enumerate(data.iterrows()):
+        total, hadir = int(baris[kolom_total]), int(baris[kolom_hadir])
+        fig.add_trace(go.Pie(
+            labels=['Hadir', 'Tidak Hadir'], values=[hadir, total - hadir], name=nama_kategori,
+            hole=0.6, sort=False, direction='counterclockwise', rotation=90,
+            marker=dict(colors=['#4CAF50', '#FFC107']), textinfo='value',
+        ), row=i // kolom_per_baris + 1, col=i % kolom_per_baris + 1)
+        # Persentase partisipasi di tengah donut
+        domain = fig.data[-1].domain
+        fig.add_annotation(
+            x=sum(domain.x) / 2, y=sum(domain.y) / 2, xref='paper', yref='paper', showarrow=False,
+            text=f"<b>{hadir / total * 100:.1f}%</b>", font=dict(size=18),
+        )
+    fig.update_layout(height=300 * jumlah_baris, margin=dict(t=50, l=25, r=25, b=25))
+    return fig
+
+
+def buat_rekap_gizi(df_merged, gender="Semua"):
+    """
+    Status gizi balita yang hadir (pemeriksaan terakhir per anak) dan rekap per RT.
+
+    Returns:
+        tuple: (df_status_gizi, df_rekap_gizi) — rekap memakai nama kolom tampilan
+        dan baris terakhir 'Total'.
+    """
+    df_gizi_sumber = df_merged.sort_values('id_x').drop_duplicates('warga_id', keep='last')
+    if gender != "Semua":
+        df_gizi_sumber = df_gizi_sumber[df_gizi_sumber['jenis_kelamin'] == KODE_GENDER[gender]]
+    df_status_gizi = hitung_status_gizi(df_gizi_sumber)
+    rekap_gizi = rekap_status_gizi(df_status_gizi, by='rt')
+
+    df_rekap_gizi = rekap_gizi.copy()
+    df_rekap_gizi.loc['Total'] = rekap_gizi.sum()
+    df_rekap_gizi = df_rekap_gizi.reset_index().rename(columns={
+        'rt': 'RT', 'jumlah_balita': 'Jumlah Balita',
+        **{kolom: label for kolom, (_, label) in KASUS_GIZI.items()},
+    })
+    return df_status_gizi, df_rekap_gizi
+
+
+def filter_laporan(tanggal, wilayah, kategori, gender):
+    """Ringkasan filter yang dicetak di kepala PDF (juga dipakai sebagai kunci cache)."""
+    return {
+        "selected_date_str": tanggal.strftime('%d %B %Y'),
+        "rt": wilayah,
+        "kategori": kategori,
+        "gender": gender
+    }
+
+
+def nama_file_laporan(tanggal, wilayah):
+    return f"Laporan_Posyandu_{tanggal.strftime('%Y-%m-%d')}_{wilayah}.pdf"
+
+
+def nama_file_buku_kms(tanggal, wilayah):
+    return f"Buku_KMS_{tanggal.strftime('%Y-%m-%d')}_{wilayah}.pdf"
+
+
+def data_laporan(df_warga, df_pemeriksaan_harian, tanggal, wilayah=WILAYAH_SEMUA, gender="Semua", kategori=KATEGORI_SEMUA):
+    """
+    Menyusun seluruh argumen `generate_pdf_report` untuk satu kombinasi filter.
+
+    Args:
+        df_warga (pd.DataFrame): Hasil `siapkan_warga` untuk `tanggal`.
+        df_pemeriksaan_harian (pd.DataFrame): Hasil `siapkan_pemeriksaan_harian`.
+
+    Returns:
+        dict: Argumen kata kunci untuk `generate_pdf_report` / `generate_pdf_bytes`.
+    """
+    df_warga_wilayah = filter_wilayah(df_warga, wilayah)
+    id_hadir = df_pemeriksaan_harian['warga_id'].unique()
+    demografi = hitung_demografi(df_warga_wilayah, id_hadir)
+    kolom_total, kolom_hadir = KOLOM_DEMOGRAFI_GENDER[gender]
+
+    df_merged = pd.merge(df_pemeriksaan_harian, df_warga_wilayah, left_on='warga_id', right_on='id', how='inner')
+    df_status_gizi, df_rekap_gizi = buat_rekap_gizi(df_merged, gender)
+
+    df_tidak_hadir = df_warga_wilayah[~df_warga_wilayah['id'].isin(df_merged['warga_id'].unique())]
+    if gender != "Semua":
+        df_tidak_hadir = df_tidak_hadir[df_tidak_hadir['jenis_kelamin'] == KODE_GENDER[gender]]
+
+    df_rinci = df_merged
+    if kategori != KATEGORI_SEMUA:
+        df_rinci = df_rinci[df_rinci['kategori_usia'] == kategori]
+        df_tidak_hadir = df_tidak_hadir[df_tidak_hadir['kategori_usia'] == kategori]
+
+    # Metrik dari tabel demografi sesuai filter
+    demografi_terfilter = demografi if kategori == KATEGORI_SEMUA else demografi.loc[[kategori]]
+    total_warga = int(demografi_terfilter[kolom_total].sum())
+    hadir = int(demografi_terfilter[kolom_hadir].sum())
+
+    return dict(
+        filters=filter_laporan(tanggal, wilayah, kategori, gender),
+        metrics={
+            "total_warga": total_warga,
+            "hadir_hari_ini": hadir,
+            "partisipasi_hari_ini": (hadir / total_warga * 100) if total_warga > 0 else 0,
+        },
+        df_rinci=df_rinci,
+        fig_komposisi=buat_sunburst_komposisi(df_warga_wilayah, gender),
+        fig_partisipasi=buat_sunburst_partisipasi(df_warga_wilayah, id_hadir, gender),
+        df_tidak_hadir=df_tidak_hadir[KOLOM_TIDAK_HADIR_PDF].rename(columns=COLUMN_MAPS),
+        semua_kategori_defs=KATEGORI_USIA,
+        data_komposisi=[
+            (nama, int(baris.total), int(baris.laki), int(baris.perempuan))
+            for nama, baris in zip(demografi.index, demografi.itertuples())
+        ],
+        column_maps=COLUMN_MAPS,
+        df_rekap_gizi=df_rekap_gizi if not df_status_gizi.empty else None,
+        fig_donut=buat_donut_partisipasi(demografi, kolom_total, kolom_hadir),
+    )
+
+
+def anak_buku_kms(df_warga, df_pemeriksaan_harian, tanggal, wilayah=WILAYAH_SEMUA):
+    """
+    Balita yang hadir pada `tanggal` di wilayah terpilih, diurutkan per RT lalu nama.
+
+    Balita ditentukan `adalah_balita` (0-60 bulan), sama dengan rekap status gizi dan
+    grafik KMS di halaman Manajemen Warga.
+
+    Args:
+        df_warga (pd.DataFrame): Hasil `siapkan_warga` untuk `tanggal`.
+        df_pemeriksaan_harian (pd.DataFrame): Hasil `siapkan_pemeriksaan_harian`.
+
+    Returns:
+        pd.DataFrame: Baris warga balita, ditambah kolom 'usia_bulan' pada `tanggal`.
+    """
+    df = filter_wilayah(df_warga, wilayah)
+    df = df[df['id'].isin(df_pemeriksaan_harian['warga_id'])].copy()
+    df['usia_bulan'] = hitung_usia_bulan_vektor(df['tanggal_lahir'], tanggal)
+    df = df[adalah_balita(df['usia_bulan'])]
+    return df.sort_values(['rt', 'nama_lengkap']).reset_index(drop=True)
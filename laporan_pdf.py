@@ -0,0 +1,414 @@
+# laporan_pdf.py
+# Pembuatan PDF laporan (reportlab). Modul ini dan renderer grafiknya baru
+# di-import ketika laporan diminta, bukan saat halaman Dashboard dimuat.
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import legal
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, LongTable, TableStyle, PageBreak
+
+from chart_export import ChartExporter, get_chart_exporter
+from laporan import KATEGORI_SEMUA, siapkan_warga, siapkan_pemeriksaan_harian, daftar_wilayah, nama_file_laporan, data_laporan
+from skema import untuk_tampilan
+
+# Stream PDF tidak dikodekan ASCII85 (hanya menambah ~25% ukuran): tanpa akselerator C
+# reportlab (paket `rl_accel`), pengodean Python murninya mendominasi waktu PDF bergambar
+rl_config.useA85 = 0
+
+# ==============================================================================
+# PDF LAPORAN (VERSI FINAL DENGAN TOTAL ROW & URUTAN BARU)
+# ==============================================================================
+
+# Gaya tabel dibuat sekali dan dipakai ulang oleh semua tabel/laporan
+GAYA_TABEL_METRIK = TableStyle([
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE')
+])
+
+# Tabel ringkasan dengan baris terakhir sebagai total (komposisi warga, status gizi)
+GAYA_TABEL_TOTAL = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.lightblue), ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'), ('FONTSIZE', (0,0), (-1,0), 10),
+    ('BOTTOMPADDING', (0,0), (-1,0), 12),
+    ('BACKGROUND', (0,1), (-1,-2), colors.beige), # Latar belakang untuk baris data
+    ('BACKGROUND', (0,-1), (-1,-1), colors.lightgrey), # Latar belakang untuk baris total
+    ('GRID', (0,0), (-1,-1), 1, colors.black),
+    ('FONTSIZE', (0,1), (-1,-1), 9),
+    ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold') # Membuat baris terakhir (total) menjadi tebal
+])
+
+
+def _gaya_tabel_data(warna_kepala):
+    return TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), warna_kepala), ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('ALIGN', (0,0), (-1,-1), 'LEFT'), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'), ('FONTSIZE', (0,0), (-1,0), 10),
+        ('BOTTOMPADDING', (0,0), (-1,0), 12),
+        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+        ('FONTSIZE', (0,1), (-1,-1), 9)
+    ])
+
+
+GAYA_TABEL_HADIR = _gaya_tabel_data(colors.darkslategray)
+GAYA_TABEL_TIDAK_HADIR = _gaya_tabel_data(colors.darkred)
+
+# Jumlah baris per potongan tabel. Memecah tabel besar di antara halaman makin
+# lambat seiring jumlah barisnya, jadi daftar panjang dipotong menjadi beberapa tabel.
+UKURAN_POTONGAN_TABEL = 200
+
+# Padding kiri + kanan default sel reportlab
+_PADDING_SEL = 12
+
+
+def tabel_panjang(df, gaya, ukuran_potongan=UKURAN_POTONGAN_TABEL):
+    """
+    Menyusun DataFrame menjadi beberapa `LongTable` berukuran tetap untuk PDF.
+
+    Nilai diubah menjadi teks dalam satu langkah vektor (NaN menjadi sel kosong,
+    ukuran float32 dibulatkan lewat `untuk_tampilan`),
+    lebar kolom diukur sekali untuk seluruh data agar semua potongan sejajar,
+    dan setiap potongan mengulang baris judul (juga di setiap halaman baru).
+
+    Args:
+        df (pd.DataFrame): Data tabel; nama kolom menjadi baris judul.
+        gaya (TableStyle): Gaya tabel (mis. `GAYA_TABEL_HADIR`), dipakai ulang tiap potongan.
+        ukuran_potongan (int): Jumlah baris data per tabel.
+
+    Returns:
+        list: Flowable `LongTable`, siap ditambahkan ke `elements`.
+    """
+    df = untuk_tampilan(df)
+    teks = df.astype(object).where(df.notna(), "").astype(str)
+    kepala = [str(kolom) for kolom in df.columns]
+
+    lebar_kolom = []
+    for judul, (_, isi) in zip(kepala, teks.items()):
+        lebar_judul = max(stringWidth(baris, "Helvetica-Bold", 10) for baris in judul.split("\n"))
+        terpanjang = isi.iloc[int(np.argmax(isi.str.len().to_numpy()))] if len(isi) else ""
+        lebar_kolom.append(max(lebar_judul, stringWidth(terpanjang, "Helvetica", 9)) + _PADDING_SEL)
+
+    baris = teks.to_numpy().tolist()
+    potongan = []
+    for awal in range(0, max(len(baris), 1), ukuran_potongan):
+        tabel = LongTable([kepala] + baris[awal:awal + ukuran_potongan], colWidths=lebar_kolom, repeatRows=1, hAlign='LEFT')
+        tabel.setStyle(gaya)
+        potongan.append(tabel)
+    return potongan
+
+
+def _grafik(png, width, height, styles):
+    """Gambar grafik untuk PDF, atau keterangan pengganti bila grafik tidak bisa diekspor (`png` None)."""
+    if png is None:
+        return Paragraph("<i>Grafik tidak dapat ditampilkan di PDF (jenis grafik tidak didukung tanpa Kaleido).</i>", styles['Normal'])
+    return Image(BytesIO(png), width=width, height=height)
+
+
+def generate_pdf_report(filters, metrics, df_rinci, fig_komposisi, fig_partisipasi, df_tidak_hadir, semua_kategori_defs, data_komposisi, column_maps, df_rekap_gizi=None, fig_donut=None, progres=None, exporter=None):
+    """
+    Membuat laporan PDF dari data yang sudah difilter.
+    Fungsi ini menyertakan total row pada tabel komposisi dan urutan elemen yang disesuaikan.
+
+    `progres(fraksi, pesan)` (opsional) dipanggil di tiap tahap, untuk indikator
+    kemajuan saat laporan dibuat di latar belakang. `exporter` sebaiknya diambil
+    di thread skrip (`get_chart_exporter()`) bila fungsi ini dijalankan di thread lain.
+    """
+    lapor = progres or (lambda fraksi, pesan: None)
+    lapor(0.05, "Menyusun ringkasan...")
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=legal, rightMargin=72, leftMargin=12, topMargin=72, bottomMargin=18)
+    
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='Center', alignment=TA_CENTER))
+    styles.add(ParagraphStyle(name='H3_Bold', parent=styles['h3'], fontName='Helvetica-Bold'))
+    elements = []
+
+    # --- Header ---
+    elements.append(Paragraph("Laporan Posyandu Mawar - KBU", styles['h1']))
+    elements.append(Spacer(1, 0.2 * inch))
+    
+    filter_text = f"<b>Filter Laporan:</b><br/>- Tanggal: {filters['selected_date_str']}<br/>- Wilayah: {filters['rt']}<br/>- Kategori Usia: {filters['kategori']}<br/>- Jenis Kelamin: {filters['gender']}"
+    elements.append(Paragraph(filter_text, styles['Normal']))
+    elements.append(Spacer(1, 0.3 * inch))
+
+    # --- Ringkasan Metrik ---
+    elements.append(Paragraph("Ringkasan Laporan", styles['h2']))
+    metric_data = [
+        ['Total Warga (sesuai filter)', f": {metrics['total_warga']}"],
+        ['Jumlah Kunjungan (Hadir)', f": {metrics['hadir_hari_ini']}"],
+        ['Tingkat Partisipasi', f": {metrics['partisipasi_hari_ini']:.1f}%"]
+    ]
+    metric_table = Table(metric_data, colWidths=[2.5*inch, 2.5*inch])
+    metric_table.setStyle(GAYA_TABEL_METRIK)
+    elements.append(metric_table)
+    elements.append(Spacer(1, 0.2 * inch))
+
+    # Semua grafik diekspor sekaligus lewat renderer bersama (PNG di-cache per isi figure)
+    lapor(0.15, "Mengekspor grafik...")
+    png_komposisi, png_partisipasi, png_donut = (exporter or get_chart_exporter()).export_many([
+        fig_komposisi,
+        fig_partisipasi,
+        (fig_donut, dict(width=1000, height=fig_donut.layout.height)) if fig_donut else None,
+    ])
+
+    # --- [PERUBAHAN 2] Urutan diubah: Diagram dulu, baru tabel ---
+    # Pindah ke halaman baru jika ada grafik
+    if fig_komposisi or fig_partisipasi:
+         elements.append(PageBreak())
+
+    # Tampilkan Diagram Komposisi Warga
+    if fig_komposisi:
+        elements.append(Paragraph("Diagram Komposisi Warga", styles['h2']))
+        elements.append(_grafik(png_komposisi, 6*inch, 4.3*inch, styles))
+        elements.append(Spacer(1, 0.1 * inch))
+
+    # Tampilkan Tabel Rincian Komposisi Warga (setelah diagramnya)
+    elements.append(Paragraph("Rincian Komposisi Warga", styles['h2']))
+    elements.append(Spacer(1, 0.2 * inch))
+    
+    # --- [PERUBAHAN 1] Hitung total untuk baris terakhir ---
+    total_keseluruhan = sum(row[1] for row in data_komposisi)
+    total_laki = sum(row[2] for row in data_komposisi)
+    total_perempuan = sum(row[3] for row in data_komposisi)
+    total_row = ['Total Keseluruhan', total_keseluruhan, total_laki, total_perempuan]
+    
+    # Siapkan header dan gabungkan dengan data
+    table_data_komposisi = [['Kategori Usia', 'Total', 'Laki-laki', 'Perempuan']]
+    table_data_komposisi.extend(data_komposisi)
+    table_data_komposisi.append(total_row) # Tambahkan baris total ke data tabel
+
+    komposisi_table = Table(table_data_komposisi, colWidths=[2.5*inch, 0.8*inch, 1*inch, 1*inch], hAlign='LEFT')
+    komposisi_table.setStyle(GAYA_TABEL_TOTAL)
+    elements.append(komposisi_table)
+    elements.append(Spacer(1, 0.2 * inch))
+    
+    # Tampilkan Diagram Partisipasi Warga
+    if fig_partisipasi:
+        elements.append(Paragraph("Diagram Partisipasi Warga Hadir", styles['h2']))
+        elements.append(_grafik(png_partisipasi, 6*inch, 4.3*inch, styles))
+
+    # Tampilkan Diagram Tingkat Partisipasi per Kategori Usia (figure yang sama dengan di layar)
+    if fig_donut:
+        elements.append(Paragraph("Tingkat Partisipasi Berdasarkan Usia", styles['h2']))
+        elements.append(_grafik(png_donut, 6*inch, 6*inch * fig_donut.layout.height / 1000, styles))
+
+    # --- Rekap Status Gizi Balita per RT (baris terakhir adalah total) ---
+    if df_rekap_gizi is not None and not df_rekap_gizi.empty:
+        elements.append(Spacer(1, 0.2 * inch))
+        elements.append(Paragraph("Status Gizi Balita yang Hadir (Standar WHO)", styles['h2']))
+        elements.append(Spacer(1, 0.1 * inch))
+        table_data_gizi = [df_rekap_gizi.columns.to_list()] + df_rekap_gizi.astype(str).values.tolist()
+        gizi_table = Table(table_data_gizi, hAlign='LEFT')
+        gizi_table.setStyle(GAYA_TABEL_TOTAL)
+        elements.append(gizi_table)
+        elements.append(Paragraph("Stunting: TB/U &lt; -2 SD; Wasting: BB/TB &lt; -2 SD; Underweight: BB/U &lt; -2 SD; Overweight: BB/TB &gt; +2 SD.", styles['Normal']))
+
+    elements.append(PageBreak())
+    
+    # --- Tabel Data Rinci Kunjungan (Warga Hadir) per Kategori ---
+    lapor(0.45, "Menyusun tabel kunjungan...")
+    elements.append(Paragraph("Data Rinci Kunjungan (Warga Hadir)", styles['h2']))
+    elements.append(Spacer(1, 0.2 * inch))
+    
+    kategori_filter = filters.get('kategori', 'Tampilkan Semua')
+    ada_data_hadir = False
+
+    kategori_iterator = list(semua_kategori_defs) if kategori_filter == "Tampilkan Semua" else [kategori_filter]
+
+    for nama_kategori in kategori_iterator:
+        df_kategori = df_rinci[df_rinci['kategori_usia'] == nama_kategori]
+        if not df_kategori.empty:
+            ada_data_hadir = True
+            elements.append(Paragraph(f"Kategori: {nama_kategori}", styles['H3_Bold']))
+            elements.append(Spacer(1, 0.1 * inch))
+
+            # --- [PERUBAHAN UTAMA] LOGIKA PEMILIHAN KOLOM DINAMIS ADA DI SINI ---
+            if nama_kategori in ["Dewasa (>18 - <60 thn)", "Lansia (≥60 thn)"]:
+                kolom_hadir_pdf = [
+                    'nama_lengkap', 'usia_teks', 'rt', 'blok',
+                    'berat_badan_kg', 'tinggi_badan_cm', 'lingkar_perut_cm',
+                    'tensi_sistolik', 'tensi_diastolik', 
+                    'gula_darah', 'kolesterol'
+                ]
+            else: # Untuk kategori lainnya
+                kolom_hadir_pdf = [
+                    'nama_lengkap', 'usia_teks', 'rt', 'blok',
+                    'berat_badan_kg', 'tinggi_badan_cm',
+                    'lingkar_lengan_cm', 'lingkar_kepala_cm'
+                ]
+            kolom_valid = [kol for kol in kolom_hadir_pdf if kol in df_kategori.columns]
+            # df_display = df_kategori.copy()
+            # df_display = df_display.drop(columns=['kategori_usia'])
+            df_display = df_kategori[kolom_valid].copy().rename(columns=column_maps)
+            df_display.insert(0, "No", range(1, len(df_display) + 1))
+            
+            elements.extend(tabel_panjang(df_display, GAYA_TABEL_HADIR))
+            elements.append(Spacer(1, 0.2 * inch))
+
+    if not ada_data_hadir:
+        elements.append(Paragraph("Tidak ada data kunjungan rinci untuk ditampilkan.", styles['Normal']))
+
+    # --- Tabel Data Warga Tidak Hadir per Kategori ---
+    lapor(0.6, "Menyusun tabel warga tidak hadir...")
+    elements.append(PageBreak())
+    elements.append(Paragraph("Data Warga Tidak Hadir", styles['h2']))
+    elements.append(Spacer(1, 0.2 * inch))
+    
+    ada_data_tidak_hadir = False
+    if df_tidak_hadir is not None and not df_tidak_hadir.empty:
+        for nama_kategori in kategori_iterator:
+            df_kategori_tidak_hadir = df_tidak_hadir[df_tidak_hadir['kategori_usia'] == nama_kategori]
+            if not df_kategori_tidak_hadir.empty:
+                ada_data_tidak_hadir = True
+                elements.append(Paragraph(f"Kategori: {nama_kategori}", styles['H3_Bold']))
+                elements.append(Spacer(1, 0.1 * inch))
+                
+                df_display_tidak_hadir = df_kategori_tidak_hadir.copy()
+                df_display_tidak_hadir = df_display_tidak_hadir.drop(columns=['kategori_usia'])
+                df_display_tidak_hadir.insert(0, "No", range(1, len(df_display_tidak_hadir) + 1))
+                
+                elements.extend(tabel_panjang(df_display_tidak_hadir, GAYA_TABEL_TIDAK_HADIR))
+                elements.append(Spacer(1, 0.2 * inch))
+
+    if not ada_data_tidak_hadir:
+        elements.append(Paragraph("Semua warga yang relevan hadir atau tidak ada data tidak hadir untuk ditampilkan.", styles['Normal']))
+
+    lapor(0.75, "Menulis file PDF...")
+    doc.build(elements)
+    buffer.seek(0)
+    lapor(1.0, "Selesai")
+    return buffer
+
+
+def generate_pdf_bytes(**kwargs):
+    """Seperti `generate_pdf_report`, tetapi mengembalikan bytes agar aman dibagi antar-sesi."""
+    return generate_pdf_report(**kwargs).getvalue()
+
+
+# ==============================================================================
+# EKSPOR MASSAL: SATU PDF PER RT (+ LINGKUNGAN) DALAM SATU ZIP
+# ==============================================================================
+
+def _jumlah_worker_laporan() -> int:
+    jumlah = os.environ.get("LAPORAN_WORKERS")
+    if jumlah is None:
+        try:
+            jumlah = st.secrets.get("LAPORAN_WORKERS")
+        except Exception:
+            jumlah = None
+    if jumlah is None:
+        return min(4, os.cpu_count() or 1)
+    return int(jumlah)
+
+
+@st.cache_resource
+def get_laporan_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool bersama untuk membuat banyak PDF sekaligus, atau None bila berurutan.
+
+    Jumlah worker diatur lewat env/secrets `LAPORAN_WORKERS` (default: jumlah
+    CPU, maksimal 4); isi 0 atau 1 untuk mematikan. Worker dibuat dengan metode
+    "spawn" agar tidak mewarisi thread server Streamlit.
+    """
+    jumlah = _jumlah_worker_laporan()
+    if jumlah <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=jumlah, mp_context=multiprocessing.get_context("spawn"))
+
+
+# Renderer grafik milik proses worker (dibuat sekali per proses, di luar runtime Streamlit)
+_exporter_worker: Optional[ChartExporter] = None
+
+
+def _buat_pdf_terukur(nama_file, kwargs, exporter=None):
+    """Membuat satu PDF; mengembalikan (nama_file, bytes, durasi detik)."""
+    global _exporter_worker
+    if exporter is None:
+        if _exporter_worker is None:
+            _exporter_worker = ChartExporter()
+        exporter = _exporter_worker
+    mulai = time.perf_counter()
+    pdf = generate_pdf_bytes(exporter=exporter, **kwargs)
+    return nama_file, pdf, time.perf_counter() - mulai
+
+
+def generate_batch_zip(df_warga, df_pemeriksaan_harian, tanggal, gender="Semua", kategori=KATEGORI_SEMUA,
+                       executor: Optional[ProcessPoolExecutor] = None, exporter=None, progres=None):
+    """
+    Membuat laporan lingkungan dan setiap RT untuk satu tanggal, dikemas dalam satu ZIP.
+
+    Data warga dan pemeriksaan dimuat sekali oleh pemanggil; di sini data hanya
+    dipotong per wilayah, lalu pembuatan PDF dibagi ke `executor` (process pool).
+    Tanpa executor, atau bila pool rusak, PDF dibuat berurutan di proses ini.
+
+    Args:
+        df_warga (pd.DataFrame): Tabel warga mentah (belum `siapkan_warga`).
+        df_pemeriksaan_harian (pd.DataFrame): Pemeriksaan pada `tanggal`.
+        progres (callable, opsional): `progres(fraksi, pesan)` setiap satu PDF selesai.
+
+    Returns:
+        tuple: (bytes ZIP, pd.DataFrame waktu per laporan: Wilayah, File, Durasi (detik), Ukuran (KB)).
+    """
+    lapor = progres or (lambda fraksi, pesan: None)
+    mulai_total = time.perf_counter()
+    df_warga = siapkan_warga(df_warga, tanggal)
+    df_pemeriksaan_harian = siapkan_pemeriksaan_harian(df_pemeriksaan_harian)
+
+    pekerjaan = {}
+    for wilayah in daftar_wilayah(df_warga):
+        kwargs = data_laporan(df_warga, df_pemeriksaan_harian, tanggal, wilayah, gender, kategori)
+        pekerjaan[nama_file_laporan(tanggal, wilayah)] = (wilayah, kwargs)
+    lapor(0.1, f"Membuat {len(pekerjaan)} laporan...")
+
+    hasil = {}
+
+    def catat(nama_file, pdf, durasi):
+        hasil[nama_file] = (pdf, durasi)
+        lapor(0.1 + 0.85 * len(hasil) / len(pekerjaan), f"{len(hasil)}/{len(pekerjaan)} laporan selesai")
+
+    futures = {}
+    if executor is not None:
+        try:
+            futures = {executor.submit(_buat_pdf_terukur, nama, kwargs): nama for nama, (_, kwargs) in pekerjaan.items()}
+        except (BrokenProcessPool, RuntimeError):
+            get_laporan_process_pool.clear()
+            futures = {}
+    for future in as_completed(futures):
+        try:
+            catat(*future.result())
+        except BrokenProcessPool:
+            # Worker mati (mis. kehabisan memori): buat pool baru nanti, sisanya dibuat di sini
+            get_laporan_process_pool.clear()
+            break
+    for nama, (_, kwargs) in pekerjaan.items():
+        if nama not in hasil:
+            catat(*_buat_pdf_terukur(nama, kwargs, exporter))
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for nama in pekerjaan:
+            zf.writestr(nama, hasil[nama][0])
+    df_waktu = pd.DataFrame(
+        [(wilayah, nama, round(hasil[nama][1], 2), round(len(hasil[nama][0]) / 1024, 1)) for nama, (wilayah, _) in pekerjaan.items()],
+        columns=["Wilayah", "File", "Durasi (detik)", "Ukuran (KB)"],
+    )
+    df_waktu.attrs["durasi_total"] = time.perf_counter() - mulai_total
+    lapor(1.0, "Selesai")
+    return buffer.getvalue(), df_waktu
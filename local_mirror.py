@@ -0,0 +1,240 @@
+# local_mirror.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+import pandas as pd
+
+from data_utils import iter_table_rows
+
+# Lokasi default berkas mirror lokal (bisa diganti lewat secrets/env LOCAL_MIRROR_PATH;
+# string kosong mematikan mirror).
+#
+# PERHATIAN DATA PRIBADI: mirror menyimpan baris lengkap tabel `warga` (NIK, nama,
+# tanggal lahir, alamat, telepon) dan `pemeriksaan` sebagai JSON polos di berkas ini.
+# Folder dibuat 0700 dan berkas 0600 (hanya pemilik proses), tidak ikut git (.gitignore),
+# dan baris yang dihapus di Supabase ikut terhapus pada sinkron penuh berikutnya
+# (paling lama `INTERVAL_SINKRON_PENUH_DETIK`). Hapus seluruh berkas dengan
+# `LocalMirror.hapus()` saat server dipindahkan/dinonaktifkan, atau matikan mirror
+# di host bersama yang tidak terenkripsi.
+DEFAULT_MIRROR_PATH = os.path.join(".cache", "posyandu_mirror.sqlite")
+
+# Sinkron penuh berkala menangkap update/hapus yang dilakukan di luar aplikasi ini
+INTERVAL_SINKRON_PENUH_DETIK = 6 * 3600
+
+# Kolom yang dicoba (berurutan) sebagai penanda waktu perubahan baris
+KOLOM_WATERMARK = ("updated_at", "created_at")
+
+
+class LocalMirror:
+    """
+    Salinan lokal (SQLite) tabel Supabase dengan sinkronisasi delta.
+
+    Setiap baris disimpan sebagai JSON per (tabel, id). Sinkron pertama
+    mengunduh seluruh tabel; berikutnya hanya baris dengan `updated_at`
+    (atau `created_at` bila kolom itu tidak ada) >= watermark terakhir.
+    Baris yang diubah/dihapus lewat aplikasi ini ditandai dengan
+    `tandai_berubah` dan dimuat ulang pada sinkron berikutnya.
+
+    Unduhan berjalan tanpa kunci; hanya pembacaan status dan penerapan hasil
+    ke SQLite yang dikunci, dan kuncinya per tabel. Sinkron `pemeriksaan` yang
+    lambat tidak menahan `warga`, dan pembacaan tidak pernah menunggu jaringan.
+    Isi berkas berupa data pribadi warga (lihat `DEFAULT_MIRROR_PATH`).
+    """
+
+    def __init__(self, path=DEFAULT_MIRROR_PATH, interval_sinkron_penuh=INTERVAL_SINKRON_PENUH_DETIK):
+        self.path = path
+        self.interval_sinkron_penuh = interval_sinkron_penuh
+        self._kunci_tabel = {}
+        self._kunci_daftar = threading.Lock()
+        # Per tabel: nomor sinkron terakhir yang dimulai dan yang sudah diterapkan
+        self._nomor_mulai = {}
+        self._nomor_diterapkan = {}
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, mode=0o700, exist_ok=True)
+        if not os.path.exists(path):
+            # Berkas dibuat dengan izin pemilik saja sebelum SQLite membukanya
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS baris (tabel TEXT, id TEXT, data TEXT, PRIMARY KEY (tabel, id))")
+            conn.execute("CREATE TABLE IF NOT EXISTS watermark (tabel TEXT PRIMARY KEY, kolom TEXT, nilai TEXT, sinkron_penuh REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS berubah (tabel TEXT, id TEXT, PRIMARY KEY (tabel, id))")
+
+    @contextmanager
+    def _connect(self):
+        """Membuka koneksi SQLite sebagai satu transaksi, lalu menutupnya."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- SINKRONISASI ---
+
+    def _kunci(self, table_name):
+        """Kunci milik satu tabel (dibuat saat pertama kali dipakai)."""
+        with self._kunci_daftar:
+            return self._kunci_tabel.setdefault(table_name, threading.Lock())
+
+    def sync(self, supabase, table_name):
+        """
+        Menyamakan mirror dengan Supabase untuk satu tabel.
+
+        Tiga langkah: baca status (watermark, id yang ditandai berubah) di bawah
+        kunci tabel; unduh tanpa kunci; terapkan ke SQLite di bawah kunci tabel.
+        Bila dua sesi menyinkronkan tabel yang sama bersamaan, hasil sinkron yang
+        dimulai lebih dulu tidak diterapkan setelah yang dimulai belakangan,
+        sehingga baris yang lebih baru tidak tertimpa versi lama.
+
+        Returns:
+            dict: Ringkasan `{"mode": "penuh"/"delta", "baris": n, "jumlah_halaman": n}`.
+        """
+        with self._kunci(table_name):
+            nomor = self._nomor_mulai[table_name] = self._nomor_mulai.get(table_name, 0) + 1
+            with self._connect() as conn:
+                wm = conn.execute("SELECT kolom, nilai, sinkron_penuh FROM watermark WHERE tabel = ?", (table_name,)).fetchone()
+                ids_berubah = [r[0] for r in conn.execute("SELECT id FROM berubah WHERE tabel = ?", (table_name,))]
+        perlu_penuh = wm is None or wm[0] is None or (time.time() - wm[2]) > self.interval_sinkron_penuh
+
+        if perlu_penuh:
+            rows, halaman = self._unduh(supabase, table_name)
+            terapkan = partial(self._terapkan_penuh, table_name=table_name, rows=rows, ids_berubah=ids_berubah)
+        else:
+            rows, rows_berubah, halaman = self._unduh_delta(supabase, table_name, wm[0], wm[1], ids_berubah)
+            terapkan = partial(
+                self._terapkan_delta, table_name=table_name, kolom=wm[0], rows=rows,
+                ids_berubah=ids_berubah, rows_berubah=rows_berubah,
+            )
+
+        with self._kunci(table_name):
+            if nomor > self._nomor_diterapkan.get(table_name, 0):
+                with self._connect() as conn:
+                    terapkan(conn)
+                self._nomor_diterapkan[table_name] = nomor
+        return {"mode": "penuh" if perlu_penuh else "delta", "baris": len(rows), "jumlah_halaman": halaman}
+
+    def _terapkan_penuh(self, conn, table_name, rows, ids_berubah):
+        kolom = next((k for k in KOLOM_WATERMARK if rows and k in rows[0]), None)
+        conn.execute("DELETE FROM baris WHERE tabel = ?", (table_name,))
+        # Tanda yang masuk selama unduhan mungkin belum tercakup unduhan ini, jadi dibiarkan
+        conn.executemany("DELETE FROM berubah WHERE tabel = ? AND id = ?", [(table_name, i) for i in ids_berubah])
+        self._simpan(conn, table_name, rows)
+        nilai = max((str(r[kolom]) for r in rows if r.get(kolom) is not None), default=None) if kolom else None
+        conn.execute(
+            "INSERT OR REPLACE INTO watermark (tabel, kolom, nilai, sinkron_penuh) VALUES (?, ?, ?, ?)",
+            (table_name, kolom, nilai, time.time()),
+        )
+
+    def _unduh_delta(self, supabase, table_name, kolom, nilai, ids_berubah):
+        """Baris sejak watermark, ditambah baris yang ditandai berubah (diambil ulang berdasarkan id)."""
+        def filter_delta(query):
+            return query.gte(kolom, nilai) if nilai is not None else query
+
+        rows, halaman = self._unduh(supabase, table_name, filter_delta)
+        rows_berubah = []
+        if ids_berubah:
+            ids_query = [int(i) if i.lstrip("-").isdigit() else i for i in ids_berubah]
+            rows_berubah, halaman_berubah = self._unduh(supabase, table_name, lambda q: q.in_("id", ids_query))
+            halaman += halaman_berubah
+        return rows, rows_berubah, halaman
+
+    def _terapkan_delta(self, conn, table_name, kolom, rows, ids_berubah, rows_berubah):
+        wm = conn.execute("SELECT nilai FROM watermark WHERE tabel = ?", (table_name,)).fetchone()
+        if wm is None:
+            # Mirror di-`reset` selama unduhan: sinkron berikutnya penuh, delta ini dibuang
+            return
+        if ids_berubah:
+            # Yang tidak kembali dari Supabase berarti sudah dihapus. Hanya id yang sudah
+            # diproses yang dilepas; tanda yang masuk selama unduhan tetap untuk sinkron berikutnya.
+            ada = {str(r["id"]) for r in rows_berubah}
+            conn.executemany(
+                "DELETE FROM baris WHERE tabel = ? AND id = ?",
+                [(table_name, i) for i in ids_berubah if i not in ada],
+            )
+            conn.executemany("DELETE FROM berubah WHERE tabel = ? AND id = ?", [(table_name, i) for i in ids_berubah])
+        self._simpan(conn, table_name, rows + rows_berubah)
+        # Watermark dibaca di dalam transaksi penerapan (sesi lain mungkin sudah memajukannya)
+        nilai_baru = max([wm[0]] + [str(r[kolom]) for r in rows + rows_berubah if r.get(kolom) is not None], key=lambda v: v or "")
+        conn.execute("UPDATE watermark SET nilai = ? WHERE tabel = ?", (nilai_baru, table_name))
+
+    def _unduh(self, supabase, table_name, apply_filters=None):
+        """Mengunduh baris mentah (tanpa konversi pandas) beserta jumlah halamannya."""
+        rows, halaman = [], 0
+        for chunk in iter_table_rows(supabase, table_name, apply_filters=apply_filters):
+            rows.extend(chunk)
+            halaman += 1
+        return rows, halaman
+
+    def _simpan(self, conn, table_name, rows):
+        conn.executemany(
+            "INSERT OR REPLACE INTO baris (tabel, id, data) VALUES (?, ?, ?)",
+            [(table_name, str(r["id"]), json.dumps(r, default=str)) for r in rows],
+        )
+
+    def tandai_berubah(self, table_name, ids):
+        """Menandai baris (berdasarkan id) agar dimuat ulang pada sinkron berikutnya."""
+        # Satu transaksi SQLite sudah atomik; tidak perlu menunggu sinkron yang sedang mengunduh
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO berubah (tabel, id) VALUES (?, ?)",
+                [(table_name, str(i)) for i in ids],
+            )
+
+    def reset(self, table_name=None):
+        """Menghapus isi mirror (satu tabel atau semua) sehingga sinkron berikutnya penuh."""
+        with self._connect() as conn:
+            for tabel in ("baris", "watermark", "berubah"):
+                if table_name is None:
+                    conn.execute(f"DELETE FROM {tabel}")
+                else:
+                    conn.execute(f"DELETE FROM {tabel} WHERE tabel = ?", (table_name,))
+
+    def hapus(self):
+        """Menghapus berkas mirror (beserta berkas WAL-nya) dari disk, mis. saat server dinonaktifkan."""
+        for akhiran in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.path + akhiran)
+            except FileNotFoundError:
+                pass
+
+    # --- PEMBACAAN ---
+
+    def _baca(self, sql, params):
+        with self._connect() as conn:
+            rows = [json.loads(data) for (data,) in conn.execute(sql, params)]
+        return pd.DataFrame(rows) if rows else pd.DataFrame()
+
+    def read(self, table_name):
+        """Mengembalikan seluruh isi tabel dari mirror sebagai DataFrame."""
+        return self._baca("SELECT data FROM baris WHERE tabel = ?", (table_name,))
+
+    def read_where_date(self, table_name, column, tanggal):
+        """Mengembalikan baris yang kolom tanggalnya (10 karakter pertama) sama dengan `tanggal`."""
+        return self._baca(
+            "SELECT data FROM baris WHERE tabel = ? AND substr(json_extract(data, ?), 1, 10) = ?",
+            (table_name, f"$.{column}", str(tanggal)),
+        )
+
+    def read_where_in(self, table_name, column, values):
+        """Mengembalikan baris yang nilai kolomnya termasuk dalam `values` (mis. semua riwayat beberapa warga)."""
+        return self._baca(
+            "SELECT data FROM baris WHERE tabel = ? AND json_extract(data, ?) IN (SELECT value FROM json_each(?))",
+            (table_name, f"$.{column}", json.dumps(list(values), default=str)),
+        )
+
+    def distinct_dates(self, table_name, column):
+        """Mengembalikan nilai tanggal unik (format YYYY-MM-DD) dari sebuah kolom."""
+        with self._connect() as conn:
+            return [
+                v for (v,) in conn.execute(
+                    "SELECT DISTINCT substr(json_extract(data, ?), 1, 10) FROM baris WHERE tabel = ?",
+                    (f"$.{column}", table_name),
+                ) if v
+            ]
@@ -2,12 +2,15 @@
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-from supabase import create_client
-from datetime import date, datetime
-from matplotlib.ticker import MultipleLocator
-from typing import Dict, Any, Tuple
+from datetime import date
+from supabase_pool import client_sesi
+from skema import KOLOM_PEMERIKSAAN_RIWAYAT, ringkasan_memori, untuk_tampilan
+from data_utils import (
+    load_table, load_riwayat_pemeriksaan, invalidate_table, muat_bersamaan, format_waktu_muat, format_usia_teks_vektor, hitung_usia_bulan_vektor,
+    adalah_balita
+)
+# matplotlib dan renderer KMS (figure_utils, kms_charts) di-import di dalam fungsi grafik
+# agar halaman tetap ringan bila pengguna hanya menambah atau mengubah data warga.
 
 # --- KONEKSI & KEAMANAN ---
 st.set_page_config(page_title="Manajemen Warga", page_icon="👨‍👩‍👧‍👦", layout="wide")
@@ -23,285 +26,83 @@ if not st.session_state.get("authenticated", False):
     st.stop()
 
 # Ambil koneksi super-admin dari session state yang sudah dibuat saat login
-supabase = st.session_state.get('supabase_client')
+supabase = client_sesi()
 if not supabase:
     st.error("Koneksi Supabase tidak ditemukan. Silakan login kembali.")
     st.stop()
 
 
-# --- FUNGSI-FUNGSI PEMBANTU ---
-
-def hitung_usia_saat_periksa(tanggal_lahir_warga, tanggal_pemeriksaan):
-    """
-    Menghitung usia pada tanggal pemeriksaan berdasarkan tanggal lahir warga.
-    Mengembalikan usia dalam format string "X thn, Y bln".
-    """
-    try:
-        # Konversi string tanggal lahir ke objek date
-        tgl_lahir = datetime.strptime(tanggal_lahir_warga, '%Y-%m-%d').date()
-
-        # Konversi string tanggal pemeriksaan ke objek date
-        # Mengatasi format ISO 8601 dengan informasi zona waktu
-        tgl_periksa = datetime.fromisoformat(tanggal_pemeriksaan.replace('Z', '+00:00')).date()
-
-        # Menghitung selisih hari total
-        selisih_hari = (tgl_periksa - tgl_lahir).days
-        
-        # Menghitung tahun dan sisa hari
-        tahun = selisih_hari // 365
-        sisa_hari = selisih_hari % 365
-        
-        # Menghitung bulan dari sisa hari (aproksimasi)
-        bulan = sisa_hari // 30
-        
-        return f"{tahun} thn, {bulan} bln"
-    except (ValueError, TypeError, AttributeError):
-        # Mengembalikan N/A jika ada masalah dengan format tanggal
-        return "N/A"
-
-
 # ==============================================================================
 # BAGIAN KODE UNTUK GRAFIK KMS (0-5 TAHUN)
 # ==============================================================================
 
-# --- KONFIGURASI KURVA PERTUMBUHAN WHO ---
-CONFIG: Dict[str, Dict[str, Any]] = {
-    "wfa": {
-        "title": "Berat Badan menurut Umur", "y_col": "berat_kg", "y_label": "Berat Badan (kg)",
-        "interpretation_func": lambda berat, z: get_interpretation_wfa(berat, z),
-        "ranges": [
-            {"max_age": 24, "xlim": (0, 24), "ylim": (0, 18), "x_major": 1, "y_major": 1, "age_range_label": "0-24 Bulan"},
-            {"max_age": 61, "xlim": (24, 60), "ylim": (7, 30), "x_major": 1, "y_major": 1, "age_range_label": "24-60 Bulan"},
-        ],
-        "file_pattern": "wfa_{gender}_0-to-5-years_zscores.xlsx", "x_axis_label": "Umur (Bulan)",
-    },
-    "wfh": {
-        "title": "Berat Badan menurut Tinggi/Panjang Badan", "x_col": "tinggi_cm", "y_col": "berat_kg", "y_label": "Berat Badan (kg)",
-        "interpretation_func": lambda berat, z: get_interpretation_wfh(berat, z),
-        "ranges": [
-            {"max_age": 24, "file_key": "wfl", "x_col_std": "Length", "x_label": "Panjang Badan (cm)", "xlim": (45, 110), "ylim": (1, 25), "x_major": 5, "y_major": 2},
-            {"max_age": 61, "file_key": "wfh", "x_col_std": "Height", "x_label": "Tinggi Badan (cm)", "xlim": (65, 120), "ylim": (5, 31), "x_major": 5, "y_major": 2},
-        ],
-        "file_pattern": "{file_key}_{gender}_{age_group}_zscores.xlsx",
-    },
-    "bmi": {
-        "title": "Indeks Massa Tubuh (IMT) menurut Umur", "y_col": "bmi", "y_label": "IMT (kg/m²)",
-        "interpretation_func": lambda bmi, z: get_interpretation_bmi(bmi, z),
-        "ranges": [
-            {"max_age": 24, "xlim": (0, 24), "ylim": (9, 23), "x_major": 1, "y_major": 1, "age_range_label": "0-24 Bulan"},
-            {"max_age": 61, "xlim": (24, 60), "ylim": (11.6, 21), "x_major": 2, "y_major": 1, "age_range_label": "24-60 Bulan"},
-        ],
-        "file_pattern": "bmi_{gender}_{age_group}_zscores.xlsx", "x_axis_label": "Umur (Bulan)",
-    },
-    "lhfa": {
-        "title": "Panjang/Tinggi Badan menurut Umur", "y_col": "tinggi_cm", "y_label": "Panjang/Tinggi Badan (cm)",
-        "interpretation_func": lambda tinggi, z: get_interpretation_lhfa(tinggi, z),
-        "ranges": [
-            {"max_age": 24, "xlim": (0, 24), "ylim": (43, 100), "x_major": 1, "y_major": 5, "age_range_label": "0-24 Bulan"},
-            {"max_age": 61, "xlim": (24, 60), "ylim": (76, 125), "x_major": 2, "y_major": 5, "age_range_label": "2-5 Tahun"},
-        ],
-        "file_pattern": "lhfa_{gender}_{age_group}_zscores.xlsx", "x_axis_label": "Umur (Bulan)",
-    },
-    "hcfa": {
-        "title": "Lingkar Kepala menurut Umur", "y_col": "lingkar_kepala_cm", "y_label": "Lingkar Kepala (cm)",
-        "interpretation_func": lambda hc, z: get_interpretation_hcfa(hc, z),
-        "ranges": [
-            {"max_age": 24, "xlim": (0, 24), "ylim": (32, 52), "x_major": 1, "y_major": 1, "age_range_label": "0-24 Bulan"},
-            {"max_age": 61, "xlim": (24, 60), "ylim": (42, 56), "x_major": 2, "y_major": 1, "age_range_label": "2-5 Tahun"},
-        ],
-        "file_pattern": "hcfa_{gender}_0-to-5-years-zscores.xlsx", "x_axis_label": "Umur (Bulan)",
-    },
-}
-
-# --- FUNGSI-FUNGSI PEMBANTU UNTUK KMS ---
-
-@st.cache_data(ttl=3600)
-def load_who_data(file_path: str) -> pd.DataFrame:
-    """Memuat dan menyimpan cache data dari file Excel standar WHO."""
-    try:
-        return pd.read_excel(file_path)
-    except FileNotFoundError:
-        st.error(f"File standar WHO tidak ditemukan: {file_path}. Pastikan file ada di direktori aplikasi.")
-        return None
-
-def calculate_age_in_months(birth_date: date, measurement_date: date) -> int:
-    """Menghitung usia dalam bulan penuh."""
-    if isinstance(birth_date, str):
-        birth_date = datetime.strptime(birth_date, '%Y-%m-%d').date()
-    if isinstance(measurement_date, str):
-        measurement_date = datetime.fromisoformat(measurement_date.replace('Z', '+00:00')).date()
-    
-    return (measurement_date.year - birth_date.year) * 12 + (measurement_date.month - birth_date.month)
-
-def calculate_bmi(weight_kg: float, height_cm: float) -> float:
-    """Menghitung Indeks Massa Tubuh (IMT)."""
-    if height_cm == 0 or weight_kg == 0:
-        return 0.0
-    return weight_kg / ((height_cm / 100) ** 2)
-
-# --- FUNGSI INTERPRETASI STATUS GIZI ---
-def get_interpretation_wfa(berat_anak: float, z: Dict) -> Tuple[str, str]:
-    if berat_anak > z['SD3']: return "Berat badan sangat lebih", 'red'
-    elif berat_anak > z['SD2']: return "Berat badan lebih", 'yellow'
-    elif berat_anak >= z['SD2neg']: return "Berat badan normal", 'darkgreen'#'forestgreen'
-    elif berat_anak > z['SD3neg']: return "Berat badan kurang", 'yellow'
-    else: return "Berat badan sangat kurang (Underweight)", 'red'
-
-def get_interpretation_wfh(berat_anak: float, z: Dict) -> Tuple[str, str]:
-    if berat_anak > z['SD3']: return "Gizi lebih (Obesitas)", 'red'
-    elif berat_anak > z['SD2']: return "Berisiko gizi lebih (Overweight)", 'yellow'
-    elif berat_anak >= z['SD2neg']: return "Gizi baik (Normal)", 'darkgreen'#'forestgreen'
-    elif berat_anak >= z['SD3neg']: return "Gizi kurang (Wasting)", 'yellow'
-    else: return "Gizi buruk (Severe Wasting)", 'red'
-
-def get_interpretation_bmi(bmi_anak: float, z: Dict) -> Tuple[str, str]:
-    if bmi_anak > z['SD3']: return "Gizi lebih (Obesitas)", 'red'
-    elif bmi_anak > z['SD2']: return "Berisiko gizi lebih (Overweight)", 'yellow'
-    elif bmi_anak >= z['SD2neg']: return "Gizi baik (Normal)", 'darkgreen'#'forestgreen'
-    elif bmi_anak >= z['SD3neg']: return "Gizi kurang (Wasting)", 'yellow'
-    else: return "Gizi buruk (Severe Wasting)", 'red'
-
-def get_interpretation_lhfa(panjang_anak: float, z: Dict) -> Tuple[str, str]:
-    if panjang_anak > z['SD2']: return "Tinggi", 'forestgreen'
-    elif panjang_anak >= z['SD2neg']: return "Normal", 'darkgreen'#'forestgreen'
-    elif panjang_anak >= z['SD3neg']: return "Pendek (Stunting)", 'yellow'
-    else: return "Sangat Pendek (Severe Stunting)", 'red'
-
-def get_interpretation_hcfa(hc_anak: float, z: Dict) -> Tuple[str, str]:
-    if hc_anak > z['SD2']: return "Makrosefali", 'yellow'
-    elif hc_anak >= z['SD2neg']: return "Normal", 'darkgreen'#'forestgreen'
-    else: return "Mikrosefali", 'yellow'
-
-# --- FUNGSI PLOTTING UTAMA UNTUK KMS ---
-def create_growth_chart(ax: plt.Axes, chart_type: str, history_df: pd.DataFrame, gender: str, latest_data: pd.Series):
-    cfg = CONFIG[chart_type]
-    is_age_based = cfg.get("x_axis_label", "").endswith("(Bulan)")
-    x_col = cfg.get("x_col", "usia_bulan")
-    y_col = cfg["y_col"]
-    
-    x_latest = latest_data[x_col]
-    y_latest = latest_data[y_col]
-    
-    if y_latest is None or y_latest <= 0:
-        ax.text(0.5, 0.5, 'Data tidak tersedia', horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
-        ax.set_title(f"Grafik {cfg['title']}", pad=20, fontsize=16)
-        return
-
-    if is_age_based:
-        range_cfg = next((r for r in cfg["ranges"] if x_latest < r["max_age"]), cfg["ranges"][-1])
-        age_group_map = {24: "0-to-2-years", 61: "2-to-5-years"}
-        age_group = next((v for k, v in age_group_map.items() if x_latest < k), "2-to-5-years")
-        file_name = cfg["file_pattern"].format(gender="girls" if gender == 'P' else "boys", age_group=age_group)
-        x_col_std = "Month"
-    else: 
-        range_cfg = next((r for r in cfg["ranges"] if latest_data['usia_bulan'] < r["max_age"]), cfg["ranges"][-1])
-        age_group_map = {24: "0-to-2-years", 61: "2-to-5-years"}
-        age_group = next((v for k, v in age_group_map.items() if latest_data['usia_bulan'] < k), "2-to-5-years")
-        file_name = cfg["file_pattern"].format(file_key=range_cfg["file_key"], gender="girls" if gender == 'P' else "boys", age_group=age_group)
-        x_col_std = range_cfg["x_col_std"]
-        
-    df_std = load_who_data(f"data/{file_name}")
-    if df_std is None: return
-    
-    df_std = df_std.rename(columns={x_col_std: 'x_std'}).sort_values('x_std').drop_duplicates('x_std')
-    z_cols = ['SD3neg', 'SD2neg', 'SD1neg', 'SD0', 'SD1', 'SD2', 'SD3']
-    poly_funcs = {col: np.poly1d(np.polyfit(df_std['x_std'], df_std[col], 5)) for col in z_cols}
-    z_scores_at_point = {col: func(x_latest) for col, func in poly_funcs.items()}
-    
-    interpretation, color = cfg["interpretation_func"](y_latest, z_scores_at_point)
-    st.info(f"**{cfg['title']}:** {interpretation}")
-
-    fig = ax.figure
-    fig.set_facecolor('hotpink' if gender == 'P' else 'steelblue')
-    x_smooth = np.linspace(df_std['x_std'].min(), df_std['x_std'].max(), 300)
-    smooth_data = {col: func(x_smooth) for col, func in poly_funcs.items()}
-
-    ax.fill_between(x_smooth, smooth_data['SD3neg'], smooth_data['SD2neg'], color='yellow', alpha=0.5)
-    ax.fill_between(x_smooth, smooth_data['SD2neg'], smooth_data['SD2'], color='green', alpha=0.4)
-    ax.fill_between(x_smooth, smooth_data['SD2'], smooth_data['SD3'], color='yellow', alpha=0.5)
-    
-    for col, data in smooth_data.items():
-        ax.plot(x_smooth, data, color='red' if col in ['SD3', 'SD3neg'] else 'black', lw=1, alpha=0.8)
-
-    ax.plot(history_df[x_col].astype(float), history_df[y_col].astype(float), marker='o', linestyle='-', color='darkviolet', label='Riwayat Pertumbuhan')
-    ax.scatter(x_latest, y_latest, marker='*', c='cyan', s=300, ec='black', zorder=10, label='Pengukuran Terakhir')
-
-    # Anotasi dan Label
-    props = dict(boxstyle='round', facecolor=color, alpha=0.8)
-    ax.text(0.03, 0.97, f"Interpretasi: {interpretation}", transform=ax.transAxes, fontsize=12, color='white', fontweight='bold', va='top', bbox=props)
-
-    title_text = f"Grafik {cfg['title']} - {'Perempuan' if gender == 'P' else 'Laki-laki'}"
-    if 'age_range_label' in range_cfg:
-        title_text += f" ({range_cfg['age_range_label']})"
-        
-    ax.set_title(title_text, pad=20, fontsize=16, color='white', fontweight='bold')
-    ax.set_xlabel(cfg.get('x_axis_label') or range_cfg.get('x_label'), fontsize=12, color='white')
-    ax.set_ylabel(cfg['y_label'], fontsize=12, color='white')
-    
-    ax.set_xlim(range_cfg["xlim"])
-    ax.set_ylim(range_cfg["ylim"])
-
-    ax2 = ax.twinx(); ax2.set_ylim(ax.get_ylim())
-    ax2.yaxis.set_major_locator(MultipleLocator(range_cfg["y_major"]))
-    #ax2.yaxis.set_minor_locator(MultipleLocator(range_cfg["y_minor"]))
-
-    ax.xaxis.set_major_locator(MultipleLocator(range_cfg["x_major"]))
-    ax.yaxis.set_major_locator(MultipleLocator(range_cfg["y_major"]))
-
-    for spine_position in ['top', 'bottom', 'left', 'right']:
-        ax.spines[spine_position].set_visible(False)
-        ax2.spines[spine_position].set_visible(False)
-
-    ax.grid(which='major', linestyle='-', linewidth='0.8', color='gray')
-    ax.grid(which='minor', axis='y', linestyle=':', linewidth='0.5', color='lightgray')
-    
-    # ax.tick_params(axis='x', colors='white')
-    # ax.tick_params(axis='y', colors='white')
-    ax.tick_params(which='major', axis='x', labelcolor='white', length=0)
-    ax.tick_params(which='major', axis='y', labelcolor='white', length=0)
-    ax2.tick_params(which='both', axis='y', labelcolor='white', length=0)
-
-    ax.legend(loc='lower right')
-    fig.tight_layout()
-
-def plot_all_kms_curves(history_df: pd.DataFrame):
+def plot_all_kms_curves(history_df: pd.DataFrame, warga_id):
     """Fungsi utama untuk menampilkan semua kurva pertumbuhan KMS."""
     st.subheader("📈 Grafik Pertumbuhan Anak (KMS)")
     if history_df.empty:
         st.warning("Data riwayat tidak tersedia untuk membuat grafik.")
         return
 
+    from kms_charts import (
+        CONFIG, JENIS_GRAFIK_KMS, calculate_bmi, hash_riwayat, get_kms_render_cache,
+        get_kms_process_pool, render_kms_charts
+    )
+
     # Siapkan data
     history_df['bmi'] = history_df.apply(lambda row: calculate_bmi(row['berat_kg'], row['tinggi_cm']), axis=1)
     latest_data = history_df.sort_values(by='usia_bulan').iloc[-1]
     gender = latest_data['jenis_kelamin']
 
-    charts_to_plot = ["wfa", "lhfa", "wfh", "bmi", "hcfa"]
-    for chart_type in charts_to_plot:
+    # Grafik hanya dirender ulang jika riwayat pengukuran anak ini berubah
+    render_cache = get_kms_render_cache()
+    riwayat_hash = hash_riwayat(history_df)
+
+    # Satu tempat per grafik agar urutan tetap walau grafik selesai tidak berurutan
+    tempat_grafik = {}
+    for chart_type in JENIS_GRAFIK_KMS:
         st.markdown("---")
-        fig, ax = plt.subplots(figsize=(12, 7))
+        tempat_grafik[chart_type] = st.empty()
+
+    def tampilkan(chart_type, png, interpretation):
+        with tempat_grafik[chart_type].container():
+            if interpretation:
+                st.info(f"**{CONFIG[chart_type]['title']}:** {interpretation}")
+            st.image(png, use_container_width=True)
+
+    belum_ada = []
+    for chart_type in JENIS_GRAFIK_KMS:
+        hasil = render_cache.get((warga_id, chart_type, riwayat_hash))
+        if hasil is None:
+            belum_ada.append(chart_type)
+            tempat_grafik[chart_type].caption(f"Membuat grafik {CONFIG[chart_type]['title']}...")
+        else:
+            tampilkan(chart_type, *hasil)
+
+    # Grafik yang belum ada di cache dirender paralel dan ditampilkan begitu selesai
+    for chart_type, future in render_kms_charts(belum_ada, history_df, gender, latest_data, get_kms_process_pool()):
         try:
-            create_growth_chart(ax, chart_type, history_df, gender, latest_data)
-            st.pyplot(fig)
+            hasil = future.result()
+            render_cache.put((warga_id, chart_type, riwayat_hash), hasil)
+            tampilkan(chart_type, *hasil)
         except Exception as e:
-            st.error(f"Gagal membuat grafik {chart_type.upper()}: {e}")
-        plt.close(fig)
+            tempat_grafik[chart_type].error(f"Gagal membuat grafik {chart_type.upper()}: {e}")
 
 # ==============================================================================
 # BAGIAN KODE UNTUK GRAFIK TREN UMUM (DI ATAS 5 TAHUN)
 # ==============================================================================
 def plot_individual_trends(df_pemeriksaan):
     st.subheader("📈 Grafik Tren Kesehatan Individu")
+    from figure_utils import figur
     df_pemeriksaan['tanggal_pemeriksaan'] = pd.to_datetime(df_pemeriksaan['tanggal_pemeriksaan'])
     df_pemeriksaan = df_pemeriksaan.sort_values(by='tanggal_pemeriksaan')
 
     col1, col2 = st.columns(2)
     with col1:
-        fig, ax = plt.subplots(figsize=(6, 4)); ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['tensi_sistolik'], marker='o', label='Sistolik'); ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['tensi_diastolik'], marker='o', label='Diastolik'); ax.set_title("Tren Tensi Darah"); ax.set_ylabel("mmHg"); ax.legend(); ax.grid(True, linestyle=':'); plt.xticks(rotation=45); fig.tight_layout(); st.pyplot(fig)
-        fig, ax = plt.subplots(figsize=(6, 4)); ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['gula_darah'], marker='o', color='g'); ax.set_title("Tren Gula Darah"); ax.set_ylabel("mg/dL"); ax.grid(True, linestyle=':'); plt.xticks(rotation=45); fig.tight_layout(); st.pyplot(fig)
+        with figur(figsize=(6, 4)) as (fig, ax): ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['tensi_sistolik'], marker='o', label='Sistolik'); ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['tensi_diastolik'], marker='o', label='Diastolik'); ax.set_title("Tren Tensi Darah"); ax.set_ylabel("mmHg"); ax.legend(); ax.grid(True, linestyle=':'); ax.tick_params(axis='x', labelrotation=45); fig.tight_layout(); st.pyplot(fig)
+        with figur(figsize=(6, 4)) as (fig, ax): ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['gula_darah'], marker='o', color='g'); ax.set_title("Tren Gula Darah"); ax.set_ylabel("mg/dL"); ax.grid(True, linestyle=':'); ax.tick_params(axis='x', labelrotation=45); fig.tight_layout(); st.pyplot(fig)
     with col2:
-        fig, ax = plt.subplots(figsize=(6, 4)); ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['berat_badan_kg'], marker='o', color='r'); ax.set_title("Tren Berat Badan"); ax.set_ylabel("kg"); ax.grid(True, linestyle=':'); plt.xticks(rotation=45); fig.tight_layout(); st.pyplot(fig)
-        fig, ax = plt.subplots(figsize=(6, 4)); ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['kolesterol'], marker='o', color='purple'); ax.set_title("Tren Kolesterol"); ax.set_ylabel("mg/dL"); ax.grid(True, linestyle=':'); plt.xticks(rotation=45); fig.tight_layout(); st.pyplot(fig)
+        with figur(figsize=(6, 4)) as (fig, ax): ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['berat_badan_kg'], marker='o', color='r'); ax.set_title("Tren Berat Badan"); ax.set_ylabel("kg"); ax.grid(True, linestyle=':'); ax.tick_params(axis='x', labelrotation=45); fig.tight_layout(); st.pyplot(fig)
+        with figur(figsize=(6, 4)) as (fig, ax): ax.plot(df_pemeriksaan['tanggal_pemeriksaan'], df_pemeriksaan['kolesterol'], marker='o', color='purple'); ax.set_title("Tren Kolesterol"); ax.set_ylabel("mg/dL"); ax.grid(True, linestyle=':'); ax.tick_params(axis='x', labelrotation=45); fig.tight_layout(); st.pyplot(fig)
 
 
 # ==============================================================================
@@ -338,6 +139,7 @@ def page_manajemen_warga():
                             "jenis_kelamin": jenis_kelamin_db, "alamat": alamat, "telepon": telepon,
                             "rt": rt, "blok": blok
                         }).execute()
+                        invalidate_table("warga")
                         st.success(f"Warga baru '{nama_lengkap}' berhasil ditambahkan."); st.rerun()
                     except Exception as e:
                         st.error(f"Gagal menambahkan warga: {e}")
@@ -347,16 +149,24 @@ def page_manajemen_warga():
     # --- Menampilkan dan Mengelola Data Warga yang Ada ---
     st.subheader("Daftar Warga Terdaftar")
     try:
-        response = supabase.table("warga").select("*").order("created_at", desc=True).execute()
-        if not response.data:
+        # Halaman ini menampilkan dan mengubah seluruh isian warga, jadi semua kolom diambil
+        tugas_muat = {"warga": (load_table, supabase, "warga")}
+        id_dikelola = st.session_state.get("warga_dikelola")
+        if id_dikelola is not None:
+            # Warga sudah dipilih: hanya riwayat warga itu yang diambil, bersamaan dengan daftar warga
+            tugas_muat["pemeriksaan"] = (load_riwayat_pemeriksaan, supabase, [id_dikelola], KOLOM_PEMERIKSAAN_RIWAYAT)
+        data_muat, waktu_muat = muat_bersamaan(**tugas_muat)
+        df_warga = data_muat["warga"]
+        if df_warga.empty:
             st.info("Belum ada data warga yang terdaftar.")
             return
 
-        df_warga = pd.DataFrame(response.data)
+        df_warga = df_warga.sort_values("created_at", ascending=False).reset_index(drop=True)
         # st.dataframe(df_warga)
 
         # Tabel ringkas (hanya kolom tertentu)
-        df_warga_tampil = df_warga[["nik", "nama_lengkap", "tanggal_lahir", "jenis_kelamin", "rt"]]
+        df_warga_tampil = df_warga[["nik", "nama_lengkap", "tanggal_lahir", "jenis_kelamin", "rt"]].copy()
+        df_warga_tampil["tanggal_lahir"] = df_warga_tampil["tanggal_lahir"].dt.date
 
         # Ganti nama kolom untuk tampilan
         df_warga_tampil = df_warga_tampil.rename(columns={
@@ -368,16 +178,20 @@ def page_manajemen_warga():
             "blok": "Blok"
         })
         st.dataframe(df_warga_tampil)
+        st.caption(f"Waktu muat: {format_waktu_muat(waktu_muat)}. Memori warga: {ringkasan_memori(df_warga)}.")
 
         df_warga['display_name'] = df_warga['nama_lengkap'] + " (RT-" + df_warga['rt'].astype(str) + ", BLOK-" + df_warga['blok'].astype(str) + ")"
-        
+        nama_tampilan = dict(zip(df_warga['id'], df_warga['display_name']))
+
+        # Pilihan disimpan sebagai id warga, sehingga riwayatnya bisa dimuat bersama daftar warga pada rerun berikutnya
         warga_to_manage = st.selectbox(
             "Pilih warga untuk dikelola:",
-            options=df_warga['display_name'], index=None, placeholder="Pilih warga..."
+            options=df_warga['id'].tolist(), format_func=lambda warga_id: nama_tampilan.get(warga_id, str(warga_id)),
+            index=None, placeholder="Pilih warga...", key="warga_dikelola"
         )
 
-        if warga_to_manage:
-            selected_warga_data = df_warga[df_warga['display_name'] == warga_to_manage].iloc[0]
+        if warga_to_manage is not None and warga_to_manage in nama_tampilan:
+            selected_warga_data = df_warga[df_warga['id'] == warga_to_manage].iloc[0]
 
             with st.expander("✏️ Edit Data Diri Warga"):
                 with st.form("edit_warga_form"):
@@ -388,7 +202,7 @@ def page_manajemen_warga():
                     with col_edit1: edit_rt = st.text_input("RT", value=selected_warga_data.get('rt', ''))
                     with col_edit2: edit_blok = st.text_input("Blok", value=selected_warga_data.get('blok', ''))
 
-                    edit_tgl_lahir_val = datetime.strptime(selected_warga_data['tanggal_lahir'], '%Y-%m-%d').date()
+                    edit_tgl_lahir_val = selected_warga_data['tanggal_lahir'].date()
                     edit_tgl_lahir = st.date_input("Tanggal Lahir", value=edit_tgl_lahir_val)
                     edit_alamat = st.text_area("Alamat", value=selected_warga_data['alamat'])
                     edit_telepon = st.text_input("Nomor Telepon", value=selected_warga_data.get('telepon', ''))
@@ -401,6 +215,7 @@ def page_manajemen_warga():
                                 "rt": edit_rt, "blok": edit_blok
                             }
                             supabase.table("warga").update(update_data).eq("id", selected_warga_data['id']).execute()
+                            invalidate_table("warga", ids=[selected_warga_data['id']])
                             st.success("Data warga berhasil diperbarui."); st.rerun()
                         except Exception as e:
                             st.error(f"Gagal memperbarui data: {e}")
@@ -408,12 +223,16 @@ def page_manajemen_warga():
             st.divider()
             st.subheader(f"Riwayat Pemeriksaan untuk {selected_warga_data['nama_lengkap']}")
             
-            pemeriksaan_response = supabase.table("pemeriksaan").select("*").eq("warga_id", selected_warga_data['id']).order("tanggal_pemeriksaan", desc=True).execute()
+            df_semua_pemeriksaan = data_muat.get("pemeriksaan")
+            if df_semua_pemeriksaan is None:
+                df_semua_pemeriksaan = load_riwayat_pemeriksaan(supabase, [selected_warga_data['id']], KOLOM_PEMERIKSAAN_RIWAYAT)
 
-            if not pemeriksaan_response.data:
+            if df_semua_pemeriksaan.empty:
                 st.info("Warga ini belum memiliki riwayat pemeriksaan.")
             else:
-                df_pemeriksaan = pd.DataFrame(pemeriksaan_response.data).fillna(0)
+                # Ukuran float32 dikembalikan ke float64 yang dibulatkan untuk tabel dan form revisi
+                df_pemeriksaan = untuk_tampilan(df_semua_pemeriksaan).sort_values("tanggal_pemeriksaan", ascending=False).reset_index(drop=True).fillna(0)
+                df_pemeriksaan['tanggal_pemeriksaan'] = df_pemeriksaan['tanggal_pemeriksaan'].dt.date
 
                 # # df_pemeriksaan['usia_thn_bln'] = df_pemeriksaan['tanggal_lahir'].apply(
                 # #     lambda tgl: format_usia_teks(tgl, df_pemeriksaan['tanggal_pemeriksaan'])
@@ -425,11 +244,9 @@ def page_manajemen_warga():
                 # 1. Ambil tanggal lahir warga yang sedang dipilih.
                 tgl_lahir_warga = selected_warga_data['tanggal_lahir']
 
-                # 2. Buat kolom baru 'Usia' dengan menerapkan fungsi hitung_usia_saat_periksa.
-                #    Kita gunakan lambda untuk memberikan tanggal lahir (konstan) dan tanggal pemeriksaan (berubah per baris) ke fungsi.
-                df_pemeriksaan['Usia'] = df_pemeriksaan['tanggal_pemeriksaan'].apply(
-                    lambda tgl_periksa: hitung_usia_saat_periksa(tgl_lahir_warga, tgl_periksa)
-                )
+                # 2. Buat kolom baru 'Usia' untuk semua baris sekaligus.
+                #    Tanggal lahir (konstan) di-broadcast ke setiap tanggal pemeriksaan.
+                df_pemeriksaan['Usia'] = format_usia_teks_vektor(tgl_lahir_warga, df_pemeriksaan['tanggal_pemeriksaan'])
 
                 # 3. Definisikan urutan kolom untuk ditampilkan, letakkan 'Usia' di depan.
                 kolom_tampil = [
@@ -450,14 +267,12 @@ def page_manajemen_warga():
                 # === AKHIR PERUBAHAN ===
 
                 # --- MODIFIKASI DIMULAI DI SINI: LOGIKA KONDISIONAL UNTUK GRAFIK ---
-                # 1. Hitung usia pada pemeriksaan terakhir dalam bulan
-                latest_exam_date = pd.to_datetime(df_pemeriksaan['tanggal_pemeriksaan'].iloc[0]).date()
-                birth_date_obj = pd.to_datetime(selected_warga_data['tanggal_lahir']).date()
-                latest_age_months = calculate_age_in_months(birth_date_obj, latest_exam_date)
-
-                # 2. Tentukan grafik yang akan ditampilkan berdasarkan usia
-                if latest_age_months <= 60:
-                    # --- JIKA USIA <= 5 TAHUN, TAMPILKAN GRAFIK KMS ---
+                # 1. Hitung usia (bulan penuh) pada setiap pemeriksaan; baris pertama adalah yang terakhir
+                usia_bulan = hitung_usia_bulan_vektor(tgl_lahir_warga, df_pemeriksaan['tanggal_pemeriksaan'])
+
+                # 2. Tentukan grafik yang akan ditampilkan berdasarkan usia (definisi balita yang sama dengan laporan)
+                if adalah_balita(usia_bulan).iloc[0]:
+                    # --- JIKA BALITA (0-60 BULAN), TAMPILKAN GRAFIK KMS ---
                     df_kms = df_pemeriksaan.copy()
                     df_kms = df_kms.rename(columns={
                         'berat_badan_kg': 'berat_kg',
@@ -465,11 +280,9 @@ def page_manajemen_warga():
                     })
                     
                     df_kms['jenis_kelamin'] = selected_warga_data['jenis_kelamin']
-                    df_kms['usia_bulan'] = df_kms.apply(
-                        lambda row: calculate_age_in_months(birth_date_obj, row['tanggal_pemeriksaan']), axis=1
-                    )
+                    df_kms['usia_bulan'] = usia_bulan.astype(float)
                     
-                    plot_all_kms_curves(df_kms)
+                    plot_all_kms_curves(df_kms, selected_warga_data['id'])
                 else:
                     # --- JIKA USIA > 5 TAHUN, TAMPILKAN GRAFIK TREN BIASA ---
                     plot_individual_trends(df_pemeriksaan.copy())
@@ -514,6 +327,7 @@ def page_manajemen_warga():
                                     "kolesterol": edit_kolesterol, "catatan": edit_catatan
                                 }
                                 supabase.table("pemeriksaan").update(update_data).eq("id", selected_pemeriksaan['id']).execute()
+                                invalidate_table("pemeriksaan", ids=[selected_pemeriksaan['id']])
                                 st.success("Data pemeriksaan berhasil diperbarui."); st.rerun()
                             except Exception as e:
                                 st.error(f"Gagal memperbarui data pemeriksaan: {e}")
@@ -524,6 +338,7 @@ def page_manajemen_warga():
                         if st.button("Hapus Pemeriksaan Ini Secara Permanen"):
                             try:
                                 supabase.table("pemeriksaan").delete().eq("id", selected_pemeriksaan['id']).execute()
+                                invalidate_table("pemeriksaan", ids=[selected_pemeriksaan['id']])
                                 st.success("Data pemeriksaan berhasil dihapus."); st.rerun()
                             except Exception as e:
                                 st.error(f"Gagal menghapus data pemeriksaan: {e}")
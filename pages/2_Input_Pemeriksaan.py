@@ -2,9 +2,13 @@
 
 import streamlit as st
 import pandas as pd
-from supabase import create_client
-from datetime import date, datetime
+from datetime import date
 from dateutil.relativedelta import relativedelta #11082025 untuk tampilan tahun..bulan
+from supabase_pool import client_sesi
+from skema import KOLOM_WARGA_RINGKAS, KOLOM_PEMERIKSAAN_HADIR
+from data_utils import load_table, load_pemeriksaan_harian, invalidate_table, muat_bersamaan, format_waktu_muat
+from laporan import COLUMN_MAPS, daftar_wilayah
+from roster import BATAS_UKURAN, KELOMPOK_ROSTER, KOLOM_IDENTITAS_ROSTER, siapkan_roster, validasi_roster, simpan_roster
 
 # --- KONEKSI & KEAMANAN ---
 st.set_page_config(page_title="Input Pemeriksaan", page_icon="🗓️", layout="wide")
@@ -19,7 +23,7 @@ if not st.session_state.get("authenticated", False):
     st.stop()
 
 # Ambil koneksi super-admin dari session state yang sudah dibuat saat login
-supabase = st.session_state.get('supabase_client')
+supabase = client_sesi()
 if not supabase:
     st.error("Koneksi Supabase tidak ditemukan. Silakan login kembali.")
     st.stop()
@@ -29,12 +33,13 @@ if not supabase:
 def calculate_age(birth_date, reference_date):
     """
     Menghitung umur dalam tahun dan bulan.
+    `birth_date` berupa Timestamp (kolom datetime64 dari `load_table`) atau teks 'YYYY-MM-DD'.
     Mengembalikan tuple (tahun, bulan), atau None jika tanggal lahir tidak valid.
     """
-    if not birth_date or not isinstance(birth_date, str):
+    if birth_date is None or pd.isna(birth_date):
         return None
     try:
-        birth_date_obj = datetime.strptime(birth_date, '%Y-%m-%d').date()
+        birth_date_obj = pd.Timestamp(birth_date).date()
     except ValueError:
         return None
 
@@ -43,18 +48,151 @@ def calculate_age(birth_date, reference_date):
     
     return (delta.years, delta.months)
 
+MODE_SATU_WARGA = "Satu warga"
+MODE_ROSTER = "Roster (banyak warga sekaligus)"
+
+
+def kolom_config_roster(kolom_ukur):
+    """Konfigurasi `st.data_editor` roster: identitas hanya-baca, kolom ukur dengan batas `BATAS_UKURAN`."""
+    config = {
+        'hadir': st.column_config.CheckboxColumn("Hadir", default=False),
+        'nama_lengkap': st.column_config.TextColumn("Nama Lengkap", disabled=True),
+        'rt': st.column_config.TextColumn("RT", disabled=True),
+        'blok': st.column_config.TextColumn("Blok", disabled=True),
+        'usia_teks': st.column_config.TextColumn("Usia", disabled=True),
+        'catatan': st.column_config.TextColumn("Catatan"),
+    }
+    for kolom in kolom_ukur:
+        minimum, maksimum, bulat = BATAS_UKURAN[kolom]
+        config[kolom] = st.column_config.NumberColumn(
+            COLUMN_MAPS[kolom].replace("\n", " "), min_value=minimum, max_value=maksimum,
+            step=1 if bulat else 0.1, format="%d" if bulat else "%.1f",
+        )
+    return config
+
+
+def tampilkan_hasil_roster(hasil):
+    """Ringkasan penyimpanan roster terakhir (disimpan di session_state agar tetap terlihat setelah rerun)."""
+    if hasil["tersimpan"]:
+        st.success(f"{hasil['tersimpan']} pemeriksaan tersimpan"
+                   + (" (insert bulk ditolak, disimpan per baris)." if hasil["per_baris"] else " dengan satu insert."))
+    if not hasil["kesalahan"].empty:
+        st.error(f"{len(hasil['kesalahan'])} baris belum tersimpan; isiannya tetap ada di tabel untuk diperbaiki.")
+        st.dataframe(
+            hasil["kesalahan"].rename(columns={'nama_lengkap': 'Nama Lengkap', 'pesan': 'Masalah'})[['Nama Lengkap', 'Masalah']],
+            use_container_width=True, hide_index=True,
+        )
+    if not hasil["tidak_pasti"].empty:
+        st.warning(
+            f"Status {len(hasil['tidak_pasti'])} baris tidak diketahui (koneksi/timeout saat menyimpan); "
+            "data mungkin sudah tersimpan. Tabel sudah dimuat ulang: warga yang tersimpan tidak muncul lagi di roster. "
+            "Periksa sebelum menyimpan ulang agar tidak ganda. Isian yang dikirim:"
+        )
+        st.dataframe(hasil["tidak_pasti"], use_container_width=True, hide_index=True)
+    if not hasil["tersimpan"] and hasil["kesalahan"].empty and hasil["tidak_pasti"].empty:
+        st.info("Tidak ada warga yang dicentang hadir.")
+
+
+def input_roster():
+    """
+    Mode roster: semua warga yang diharapkan hadir ditampilkan dalam satu tabel yang bisa diedit.
+
+    Tabel berada di dalam form, sehingga mengisi sel tidak memicu rerun. Saat
+    disimpan, semua baris divalidasi sekaligus dan baris yang valid dikirim dengan
+    satu insert bulk; baris yang gagal dilaporkan dan isiannya dipasang kembali.
+    """
+    hasil = st.session_state.pop("hasil_roster", None)
+    if hasil:
+        tampilkan_hasil_roster(hasil)
+
+    try:
+        tanggal_pemeriksaan = st.date_input("Tanggal Posyandu/Pemeriksaan", value=date.today())
+        data_muat, waktu_muat = muat_bersamaan(
+            warga=(load_table, supabase, "warga", KOLOM_WARGA_RINGKAS),
+            tercatat=(load_pemeriksaan_harian, supabase, tanggal_pemeriksaan, KOLOM_PEMERIKSAAN_HADIR),
+        )
+        df_warga = data_muat["warga"]
+        if df_warga.empty:
+            st.warning("Belum ada data warga. Silakan tambahkan data warga terlebih dahulu.")
+            return
+
+        col_f1, col_f2 = st.columns(2)
+        with col_f1:
+            wilayah = st.selectbox("Wilayah", daftar_wilayah(df_warga))
+        with col_f2:
+            kelompok = st.selectbox("Kelompok Usia", list(KELOMPOK_ROSTER))
+        kolom_ukur = KELOMPOK_ROSTER[kelompok][2]
+
+        roster = siapkan_roster(
+            df_warga, data_muat["tercatat"], tanggal_pemeriksaan, wilayah, kelompok,
+            tertunda=st.session_state.get("roster_tertunda"),
+        )
+        st.caption(
+            f"{len(roster)} warga belum tercatat pada tanggal ini, {roster.attrs['sudah_tercatat']} sudah tercatat. "
+            f"Waktu muat: {format_waktu_muat(waktu_muat)}."
+        )
+        if roster.empty:
+            st.info("Tidak ada warga lain dalam wilayah dan kelompok usia ini yang perlu dicatat.")
+            return
+
+        # Kunci editor berganti setelah setiap penyimpanan, agar suntingan lama tidak terpasang ke baris yang sudah bergeser
+        versi = st.session_state.get("versi_roster", 0)
+        with st.form("roster_form"):
+            df_edit = st.data_editor(
+                roster, key=f"roster_{tanggal_pemeriksaan}_{wilayah}_{kelompok}_{versi}",
+                column_config=kolom_config_roster(kolom_ukur),
+                column_order=['hadir', *KOLOM_IDENTITAS_ROSTER, *kolom_ukur, 'catatan'],
+                hide_index=True, num_rows="fixed", use_container_width=True,
+            )
+            submitted = st.form_submit_button("Simpan Semua yang Hadir")
+
+        if submitted:
+            baris, kesalahan = validasi_roster(df_edit, tanggal_pemeriksaan, kolom_ukur)
+            hasil = simpan_roster(supabase, baris)
+            if hasil["tersimpan"] or hasil["tidak_pasti"]:
+                # Juga saat status tidak pasti, agar roster berikutnya memperlihatkan apa yang sudah tersimpan
+                invalidate_table("pemeriksaan")
+            nama = df_edit['nama_lengkap']
+            gagal_simpan = pd.DataFrame(
+                [(data["warga_id"], nama.get(data["warga_id"], ""), pesan) for data, pesan in hasil["gagal"]],
+                columns=kesalahan.columns,
+            )
+            kesalahan = pd.concat([kesalahan, gagal_simpan], ignore_index=True)
+            # Baris berstatus tidak pasti tidak dipasang kembali ke roster, agar tidak tersimpan ganda
+            tidak_pasti = pd.DataFrame([
+                {"Nama Lengkap": nama.get(data["warga_id"], ""), **{k: v for k, v in data.items() if k != "warga_id"}, "Galat": pesan}
+                for data, pesan in hasil["tidak_pasti"]
+            ])
+            st.session_state.hasil_roster = {
+                "tersimpan": len(hasil["tersimpan"]), "per_baris": hasil["per_baris"], "kesalahan": kesalahan,
+                "tidak_pasti": tidak_pasti,
+            }
+            st.session_state.roster_tertunda = df_edit.loc[df_edit.index.isin(kesalahan['warga_id'])]
+            st.session_state.versi_roster = versi + 1
+            st.rerun()
+
+    except Exception as e:
+        st.error(f"Terjadi kesalahan saat memuat data: {e}")
+
+
 # --- FUNGSI HALAMAN UTAMA ---
 def page_input_pemeriksaan():
     st.header("🗓️ Input Kehadiran & Pemeriksaan")
     if not supabase: return
 
+    # Roster: banyak warga dicatat dalam satu tabel dan disimpan dengan satu insert
+    mode = st.radio("Mode Input", [MODE_SATU_WARGA, MODE_ROSTER], horizontal=True)
+    if mode == MODE_ROSTER:
+        input_roster()
+        return
+
     try:
-        response = supabase.table("warga").select("id, nik, nama_lengkap, rt, blok, tanggal_lahir").execute()
-        if not response.data:
+        # Cukup identitas, tanggal lahir, RT, dan blok; alamat/telepon/created_at tidak diunduh
+        df_warga = load_table(supabase, "warga", KOLOM_WARGA_RINGKAS)
+        if df_warga.empty:
             st.warning("Belum ada data warga. Silakan tambahkan data warga terlebih dahulu.")
             return
 
-        df_warga = pd.DataFrame(response.data)
         df_warga['display_name'] = df_warga['nama_lengkap'] + " (RT-" + df_warga['rt'].astype(str) + ", BLOK-" + df_warga['blok'].astype(str) + ")"
         
         # === LANGKAH 1: Widget pemilihan ditaruh DI LUAR FORM ===
@@ -74,16 +212,16 @@ def page_input_pemeriksaan():
         # Sekarang 'age_tuple' akan berisi (tahun, bulan), contoh: (1, 3) atau (5, 11)
         age_tuple = calculate_age(selected_warga_data['tanggal_lahir'], tanggal_pemeriksaan)
 
+        if age_tuple is None:
+            st.error(f"Data tanggal lahir untuk '{selected_display_name}' tidak ada atau formatnya salah di database. Mohon perbarui data warga.")
+            return
+
         # ---- Untuk Debugging (bisa dihapus nanti) ----
-        st.info(f"Nama: {selected_display_name}, Tanggal Lahir: {selected_warga_data['tanggal_lahir']}, Umur: {age_tuple[0]} Tahun {age_tuple[1]} Bulan")
+        st.info(f"Nama: {selected_display_name}, Tanggal Lahir: {selected_warga_data['tanggal_lahir']:%Y-%m-%d}, Umur: {age_tuple[0]} Tahun {age_tuple[1]} Bulan")
         #st.write(f"1. Nama Dipilih: `{selected_display_name}`")
         #st.write(f"2. Tanggal Lahir dari Database: `{selected_warga_data['tanggal_lahir']}`")
         #st.write(f"3. Umur Dihitung: `{umur}` tahun")
         # ---- Akhir Debugging ----
-
-        if age_tuple is None:
-            st.error(f"Data tanggal lahir untuk '{selected_display_name}' tidak ada atau formatnya salah di database. Mohon perbarui data warga.")
-            return
         # Ekstrak tahun dan bulan untuk logika dan tampilan
         tahun, bulan = age_tuple
         umur_dalam_tahun = tahun # Tetap gunakan ini untuk logika if-else
@@ -146,6 +284,7 @@ def page_input_pemeriksaan():
                 }
                 try:
                     supabase.table("pemeriksaan").insert(data_to_insert).execute()
+                    invalidate_table("pemeriksaan")
                     st.success(f"Data pemeriksaan untuk '{selected_display_name}' berhasil disimpan.")
                 except Exception as e:
                     st.error(f"Gagal menyimpan data pemeriksaan: {e}")
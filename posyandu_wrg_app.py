@@ -1,16 +1,14 @@
 # posyandu_wrg_app.py
 
 import streamlit as st
-from supabase import create_client, Client
+from supabase_pool import get_supabase_pool
 
 # Fungsi login akan menggunakan client publik (anon key)
 def login_page():
     st.header("🔑 Login Admin Posyandu Mawar")
     
-    # Inisialisasi client publik HANYA untuk login
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    supabase_public = create_client(url, key)
+    # Semua client meminjam koneksi dari pool bersama; tidak ada handshake TLS baru per login
+    pool = get_supabase_pool()
 
     with st.form("login_form"):
         email = st.text_input("Email")
@@ -20,18 +18,15 @@ def login_page():
         if submitted:
             try:
                 # 1. Lakukan login dengan client publik
-                session = supabase_public.auth.sign_in_with_password({
+                session = pool.client_login().auth.sign_in_with_password({
                     "email": email, "password": password
                 })
                 
-                # 2. Jika berhasil, buat client baru dengan KUNCI SUPER ADMIN
-                service_key = st.secrets["SUPABASE_SERVICE_KEY"]
-                supabase_service_client = create_client(url, service_key)
-
-                # 3. Simpan client super admin ini di session_state
+                # 2. Jika berhasil, sesi meminjam client KUNCI SUPER ADMIN bersama dari pool
                 st.session_state.authenticated = True
                 st.session_state.user_email = session.user.email
-                st.session_state.supabase_client = supabase_service_client # INI KUNCINYA
+                st.session_state.supabase_pool = True
+                st.session_state.supabase_client = pool.service # INI KUNCINYA
                 
                 st.rerun()
 
@@ -0,0 +1,128 @@
+# report_jobs.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+import streamlit as st
+
+from data_utils import CACHE_TTL_DETIK
+
+# Jumlah laporan yang dibuat bersamaan; pembuatan PDF berat di CPU, jadi cukup sedikit
+JUMLAH_WORKER_LAPORAN = 2
+
+
+class ReportJob:
+    """
+    Satu pekerjaan pembuatan laporan di thread latar.
+
+    Atribut `progres` (0..1) dan `pesan` diperbarui oleh fungsi pembuat lewat
+    `laporkan`, lalu dibaca halaman untuk menampilkan indikator kemajuan.
+    """
+
+    def __init__(self, kunci: str):
+        self.kunci = kunci
+        self.future: Optional[Future] = None
+        self.progres = 0.0
+        self.pesan = "Menunggu giliran..."
+        self.dibuat = time.time()
+        self.durasi: Optional[float] = None
+
+    def laporkan(self, fraksi: float, pesan: str) -> None:
+        self.progres = max(0.0, min(1.0, fraksi))
+        self.pesan = pesan
+
+    @property
+    def selesai(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        return self.future.exception() if self.selesai else None
+
+    @property
+    def hasil(self):
+        """Hasil fungsi pembuat (None bila belum selesai atau gagal)."""
+        return self.future.result() if self.selesai and self.error is None else None
+
+
+class ReportJobStore:
+    """
+    Antrean dan cache hasil laporan, dibagi oleh semua sesi dalam satu proses.
+
+    Pekerjaan diidentifikasi dengan kunci dari filter laporan + versi data
+    (lihat `kunci`). Permintaan dengan kunci yang sama ketika pekerjaannya
+    masih berjalan atau sudah selesai tidak membuat ulang laporan, sehingga
+    unduhan berulang langsung tersedia. Hasil kedaluwarsa setelah `ttl` detik,
+    sama dengan umur cache data, dan paling banyak `max_items` hasil disimpan.
+    """
+
+    def __init__(self, max_workers: int = JUMLAH_WORKER_LAPORAN, max_items: int = 32, ttl: float = CACHE_TTL_DETIK):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="laporan")
+        self._jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def kunci(filters: dict, *versi) -> str:
+        """Kunci stabil dari filter laporan dan versi data (mis. `versi_tabel`)."""
+        isi = json.dumps([filters, versi], sort_keys=True, default=str)
+        return hashlib.sha1(isi.encode("utf-8")).hexdigest()
+
+    def _kedaluwarsa(self, job: ReportJob) -> bool:
+        return job.selesai and time.time() - job.dibuat > self.ttl
+
+    def ambil(self, kunci: str) -> Optional[ReportJob]:
+        """Pekerjaan untuk kunci ini (berjalan atau selesai), atau None."""
+        with self._lock:
+            job = self._jobs.get(kunci)
+            if job is None:
+                return None
+            if self._kedaluwarsa(job):
+                del self._jobs[kunci]
+                return None
+            self._jobs.move_to_end(kunci)
+            return job
+
+    def ajukan(self, kunci: str, fungsi: Callable, *args, **kwargs) -> ReportJob:
+        """
+        Menjalankan `fungsi(*args, progres=job.laporkan, **kwargs)` di thread latar.
+
+        Bila kunci yang sama sedang berjalan atau sudah berhasil, pekerjaan itu
+        yang dikembalikan; pekerjaan yang gagal atau kedaluwarsa diulang.
+        """
+        with self._lock:
+            job = self._jobs.get(kunci)
+            if job is not None and not self._kedaluwarsa(job) and not (job.selesai and job.error is not None):
+                self._jobs.move_to_end(kunci)
+                return job
+            job = ReportJob(kunci)
+            self._jobs[kunci] = job
+            self._buang_kelebihan()
+
+        def jalankan():
+            mulai = time.perf_counter()
+            try:
+                return fungsi(*args, progres=job.laporkan, **kwargs)
+            finally:
+                job.durasi = time.perf_counter() - mulai
+
+        job.future = self._executor.submit(jalankan)
+        return job
+
+    def _buang_kelebihan(self) -> None:
+        # Hanya hasil yang sudah selesai yang dibuang; pekerjaan berjalan tetap disimpan
+        for kunci in [k for k, j in self._jobs.items() if j.selesai]:
+            if len(self._jobs) <= self.max_items:
+                break
+            del self._jobs[kunci]
+
+
+@st.cache_resource
+def get_report_jobs() -> ReportJobStore:
+    """Antrean laporan bersama untuk semua sesi."""
+    return ReportJobStore()
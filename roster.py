@@ -0,0 +1,192 @@
+# roster.py
+import pandas as pd
+from postgrest import APIError
+
+from data_utils import hitung_usia_vektor, format_usia_teks_vektor
+from laporan import filter_wilayah
+
+# ==============================================================================
+# INPUT ROSTER: BANYAK PEMERIKSAAN DALAM SATU TABEL DAN SATU INSERT
+# ==============================================================================
+
+# Batas nilai wajar per kolom ukur: (minimum, maksimum, harus bilangan bulat)
+BATAS_UKURAN = {
+    'berat_badan_kg': (0.0, 300.0, False),
+    'tinggi_badan_cm': (0.0, 250.0, False),
+    'lingkar_lengan_cm': (0.0, 100.0, False),
+    'lingkar_perut_cm': (0.0, 250.0, False),
+    'lingkar_kepala_cm': (0.0, 100.0, False),
+    'tensi_sistolik': (0, 300, True),
+    'tensi_diastolik': (0, 200, True),
+    'gula_darah': (0, 1000, True),
+    'kolesterol': (0, 1000, True),
+}
+
+# Kelompok usia (tahun penuh, [awal, akhir)) dan kolom yang diukur; sama dengan form satu warga
+KELOMPOK_ROSTER = {
+    "Balita (< 5 thn)": (0, 5, ['berat_badan_kg', 'tinggi_badan_cm', 'lingkar_lengan_cm', 'lingkar_kepala_cm']),
+    "Anak (5 - 14 thn)": (5, 15, ['berat_badan_kg', 'tinggi_badan_cm', 'lingkar_lengan_cm']),
+    "Remaja & Dewasa (>= 15 thn)": (15, None, [
+        'berat_badan_kg', 'tinggi_badan_cm', 'lingkar_lengan_cm', 'lingkar_perut_cm',
+        'tensi_sistolik', 'tensi_diastolik', 'gula_darah', 'kolesterol',
+    ]),
+}
+
+KOLOM_IDENTITAS_ROSTER = ['nama_lengkap', 'rt', 'blok', 'usia_teks']
+
+
+def siapkan_roster(df_warga, df_pemeriksaan_harian, tanggal, wilayah, kelompok, tertunda=None):
+    """
+    Tabel roster: warga kelompok usia `kelompok` di `wilayah` yang belum tercatat pada `tanggal`.
+
+    Args:
+        df_warga (pd.DataFrame): Data warga (cukup `skema.KOLOM_WARGA_RINGKAS`).
+        df_pemeriksaan_harian (pd.DataFrame): Pemeriksaan pada `tanggal` (minimal 'warga_id');
+            warga yang sudah punya pemeriksaan tidak dimasukkan lagi.
+        kelompok (str): Kunci `KELOMPOK_ROSTER`.
+        tertunda (pd.DataFrame, opsional): Baris yang gagal disimpan sebelumnya (index id warga);
+            isiannya dipasang kembali agar tidak perlu diketik ulang.
+
+    Returns:
+        pd.DataFrame: Index id warga; kolom 'hadir', `KOLOM_IDENTITAS_ROSTER`, kolom ukur
+        kelompok (kosong), dan 'catatan'. Jumlah warga yang sudah tercatat ada di
+        `attrs["sudah_tercatat"]`.
+    """
+    awal, akhir, kolom_ukur = KELOMPOK_ROSTER[kelompok]
+    df = filter_wilayah(df_warga, wilayah)
+    sudah = df['id'].isin(df_pemeriksaan_harian['warga_id']) if not df_pemeriksaan_harian.empty else pd.Series(False, index=df.index)
+    tahun = hitung_usia_vektor(df['tanggal_lahir'], tanggal)['tahun']
+    cocok = (tahun >= awal) & (tahun < akhir) if akhir is not None else tahun >= awal
+    cocok = cocok.fillna(False).astype(bool)
+    df = df[cocok & ~sudah].sort_values(['rt', 'blok', 'nama_lengkap']).set_index('id')
+
+    roster = pd.DataFrame({
+        'hadir': False,
+        'nama_lengkap': df['nama_lengkap'].astype(str),
+        'rt': df['rt'].astype(str),
+        'blok': df['blok'].astype(str),
+        'usia_teks': format_usia_teks_vektor(df['tanggal_lahir'], tanggal),
+    }).rename_axis('warga_id')
+    # Semua kolom ukur float agar isian yang gagal validasi (mis. 110.5 untuk gula darah) bisa dipasang kembali
+    for kolom in kolom_ukur:
+        roster[kolom] = float('nan')
+    roster['catatan'] = ""
+
+    if tertunda is not None and not tertunda.empty:
+        ids = roster.index.intersection(tertunda.index)
+        for kolom in [k for k in kolom_ukur if k in tertunda.columns]:
+            roster.loc[ids, kolom] = pd.to_numeric(tertunda.loc[ids, kolom], errors='coerce').astype(float).to_numpy()
+        roster.loc[ids, 'hadir'] = tertunda.loc[ids, 'hadir'].fillna(False).astype(bool).to_numpy()
+        roster.loc[ids, 'catatan'] = tertunda.loc[ids, 'catatan'].fillna("").astype(str).to_numpy()
+    roster.attrs["sudah_tercatat"] = int((cocok & sudah).sum())
+    return roster
+
+
+def validasi_roster(df_edit, tanggal, kolom_ukur):
+    """
+    Memeriksa semua baris roster sekaligus dan menyusun baris insert untuk yang valid.
+
+    Baris yang dicentang 'hadir' wajib punya minimal satu hasil ukur, semua nilainya
+    dalam `BATAS_UKURAN`, dan nilai tensi/gula/kolesterol bulat. Baris yang diisi
+    tetapi tidak dicentang juga ditolak agar isiannya tidak hilang diam-diam.
+
+    Args:
+        df_edit (pd.DataFrame): Hasil `st.data_editor` atas `siapkan_roster`.
+        tanggal (date): Tanggal pemeriksaan.
+        kolom_ukur (list): Kolom ukur kelompok (`KELOMPOK_ROSTER[...][2]`).
+
+    Returns:
+        tuple: (list[dict] baris siap insert, pd.DataFrame kesalahan berkolom
+        'warga_id', 'nama_lengkap', 'pesan'). Kolom ukur di luar kelompok diisi 0,
+        sama seperti form satu warga.
+    """
+    ukur = df_edit[kolom_ukur].apply(pd.to_numeric, errors='coerce').astype(float)
+    hadir = df_edit['hadir'].fillna(False).astype(bool)
+    catatan = df_edit['catatan'].fillna("").astype(str).str.strip()
+    ada_ukur = ukur.notna().any(axis=1)
+
+    pesan = {warga_id: [] for warga_id in df_edit.index}
+
+    def tandai(salah, teks):
+        for warga_id in salah[salah].index:
+            pesan[warga_id].append(teks)
+
+    tandai(~hadir & (ada_ukur | catatan.ne("")), "ada isian tetapi kolom Hadir tidak dicentang")
+    tandai(hadir & ~ada_ukur, "hadir tetapi belum ada hasil ukur")
+    for kolom in kolom_ukur:
+        minimum, maksimum, bulat = BATAS_UKURAN[kolom]
+        nilai = ukur[kolom]
+        tandai(hadir & nilai.notna() & ((nilai < minimum) | (nilai > maksimum)), f"{kolom} di luar {minimum}-{maksimum}")
+        if bulat:
+            tandai(hadir & nilai.notna() & (nilai != nilai.round()), f"{kolom} harus bilangan bulat")
+
+    valid = hadir & pd.Series([not pesan[warga_id] for warga_id in df_edit.index], index=df_edit.index)
+    isi = ukur[valid].reindex(columns=list(BATAS_UKURAN)).fillna(0)
+    baris = []
+    for warga_id, nilai in isi.iterrows():
+        data = {"tanggal_pemeriksaan": str(tanggal), "warga_id": int(warga_id)}
+        data.update({k: int(v) if BATAS_UKURAN[k][2] else float(v) for k, v in nilai.items()})
+        data["catatan"] = catatan[warga_id]
+        baris.append(data)
+
+    kesalahan = pd.DataFrame(
+        [(warga_id, df_edit.at[warga_id, 'nama_lengkap'], "; ".join(p)) for warga_id, p in pesan.items() if p],
+        columns=['warga_id', 'nama_lengkap', 'pesan'],
+    )
+    return baris, kesalahan
+
+
+def _ditolak_database(e):
+    """
+    True bila insert jelas ditolak PostgREST/database (constraint, tipe salah, izin), sehingga
+    tidak ada yang tersimpan. Galat jaringan/timeout dan 5xx dari gateway (tanpa badan JSON,
+    `code` berupa status HTTP) tidak pasti: batch mungkin sudah tersimpan di server.
+    """
+    return isinstance(e, APIError) and not (isinstance(e.code, int) and e.code >= 500)
+
+
+def simpan_roster(supabase, baris):
+    """
+    Menyimpan baris pemeriksaan dengan satu insert bulk.
+
+    Insert bulk di PostgREST bersifat semua-atau-tidak-sama-sekali: satu baris yang
+    ditolak database menggagalkan seluruh batch. Hanya bila batch jelas ditolak
+    (`APIError`), baris dikirim ulang satu per satu sehingga baris lain tetap
+    tersimpan dan hanya baris yang bermasalah yang dilaporkan.
+
+    Galat lain (timeout, koneksi putus) bisa terjadi setelah server menyimpan batch.
+    Karena `pemeriksaan` tidak punya kunci unik per warga dan tanggal, mengirim ulang
+    akan menggandakan data; baris tersebut dilaporkan sebagai 'tidak_pasti' dan tidak
+    dikirim ulang. Pemanggil sebaiknya memuat ulang data tanggal itu sebelum menyimpan lagi.
+
+    Returns:
+        dict: 'tersimpan' (list[dict] baris tersimpan), 'gagal' (list[(dict, str pesan)] yang
+        ditolak), 'tidak_pasti' (list[(dict, str pesan)] yang statusnya tidak diketahui), dan
+        'per_baris' (True bila insert bulk ditolak dan dipakai jalur per baris).
+    """
+    hasil = {"tersimpan": [], "gagal": [], "tidak_pasti": [], "per_baris": False}
+    if not baris:
+        return hasil
+    try:
+        respons = supabase.table("pemeriksaan").insert(baris).execute()
+        hasil["tersimpan"] = respons.data or baris
+        return hasil
+    except Exception as e:
+        if not _ditolak_database(e):
+            hasil["tidak_pasti"] = [(data, str(e)) for data in baris]
+            return hasil
+
+    hasil["per_baris"] = True
+    for i, data in enumerate(baris):
+        try:
+            respons = supabase.table("pemeriksaan").insert(data).execute()
+            hasil["tersimpan"].extend(respons.data or [data])
+        except Exception as e:
+            if _ditolak_database(e):
+                hasil["gagal"].append((data, e.message or str(e)))
+                continue
+            # Koneksi bermasalah: baris ini tidak pasti, sisanya belum dikirim dan tidak dicoba lagi
+            hasil["tidak_pasti"].append((data, str(e)))
+            hasil["gagal"] += [(sisa, "belum dikirim: koneksi ke database terputus") for sisa in baris[i + 1:]]
+            break
+    return hasil
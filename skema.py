@@ -0,0 +1,130 @@
+# skema.py
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# PROYEKSI KOLOM PER KEBUTUHAN
+# ==============================================================================
+
+# Semua kolom; hanya untuk halaman yang menampilkan/mengubah seluruh isian (Manajemen Warga)
+SEMUA_KOLOM = "*"
+
+# Identitas warga untuk daftar pilihan, dashboard, laporan, dan buku KMS (tanpa alamat, telepon, created_at).
+# Satu proyeksi untuk semua kebutuhan ini, sehingga halaman-halaman itu berbagi satu entri cache.
+KOLOM_WARGA_RINGKAS = "id,nik,nama_lengkap,tanggal_lahir,jenis_kelamin,rt,blok"
+
+# Hasil ukur untuk dashboard dan PDF laporan (tanpa catatan dan created_at)
+KOLOM_PEMERIKSAAN_UKURAN = (
+    "id,warga_id,tanggal_pemeriksaan,berat_badan_kg,tinggi_badan_cm,lingkar_lengan_cm,lingkar_perut_cm,"
+    "lingkar_kepala_cm,tensi_sistolik,tensi_diastolik,gula_darah,kolesterol"
+)
+
+# Riwayat satu warga di Manajemen Warga: hasil ukur ditambah catatan untuk form revisi
+KOLOM_PEMERIKSAAN_RIWAYAT = KOLOM_PEMERIKSAAN_UKURAN + ",catatan"
+
+# Siapa yang sudah tercatat pada satu tanggal (roster Input Pemeriksaan)
+KOLOM_PEMERIKSAAN_HADIR = "id,warga_id,tanggal_pemeriksaan"
+
+# Tiga ukuran yang digambar di grafik KMS (buku KMS)
+KOLOM_PEMERIKSAAN_KMS = "id,warga_id,tanggal_pemeriksaan,berat_badan_kg,tinggi_badan_cm,lingkar_kepala_cm"
+
+
+def proyeksikan(df, columns):
+    """Memilih kolom `columns` (format `.select()` Supabase) dari DataFrame, mis. hasil baca mirror lokal."""
+    if columns == SEMUA_KOLOM:
+        return df
+    return df[[kolom for kolom in columns.split(",") if kolom in df.columns]]
+
+# ==============================================================================
+# TIPE DATA RINGKAS
+# ==============================================================================
+
+KATEGORI = "category"
+UKURAN = "float32"
+BILANGAN_KECIL = "Int16"
+TANGGAL = "datetime"
+
+# Kolom yang tidak disebut (id, teks bebas) dibiarkan apa adanya
+SKEMA = {
+    "warga": {
+        "tanggal_lahir": TANGGAL, "jenis_kelamin": KATEGORI, "rt": KATEGORI, "blok": KATEGORI, "created_at": TANGGAL,
+    },
+    "pemeriksaan": {
+        "tanggal_pemeriksaan": TANGGAL,
+        "berat_badan_kg": UKURAN, "tinggi_badan_cm": UKURAN, "lingkar_lengan_cm": UKURAN,
+        "lingkar_perut_cm": UKURAN, "lingkar_kepala_cm": UKURAN,
+        "tensi_sistolik": BILANGAN_KECIL, "tensi_diastolik": BILANGAN_KECIL,
+        "gula_darah": BILANGAN_KECIL, "kolesterol": BILANGAN_KECIL,
+        "created_at": TANGGAL,
+    },
+}
+
+# Ukuran float32 dikembalikan ke float64 dengan pembulatan ini sebelum ditampilkan atau disimpan ulang
+# (nilai ukur berdesimal 1-2 angka; galat float32 untuk nilai < 1000 jauh di bawah 0,0005)
+DESIMAL_UKURAN = 3
+
+
+def _ke_bilangan_kecil(seri):
+    """Int16 nullable bila semua nilai bulat dan muat; selain itu float32 agar tidak ada nilai yang terpotong."""
+    angka = pd.to_numeric(seri, errors='coerce')
+    nilai = angka.dropna().to_numpy(dtype=float)
+    info = np.iinfo(np.int16)
+    if np.all(nilai == np.round(nilai)) and np.all((nilai >= info.min) & (nilai <= info.max)):
+        return angka.astype(BILANGAN_KECIL)
+    return angka.astype(UKURAN)
+
+
+def _ubah_kolom(seri, tipe):
+    if tipe == TANGGAL:
+        return pd.to_datetime(seri, errors='coerce', format='ISO8601')
+    if tipe == UKURAN:
+        return pd.to_numeric(seri, errors='coerce').astype(UKURAN)
+    if tipe == BILANGAN_KECIL:
+        return _ke_bilangan_kecil(seri)
+    return seri.astype(tipe)
+
+
+def terapkan_skema(df, table_name):
+    """
+    Mengubah kolom hasil query ke tipe ringkas menurut `SKEMA[table_name]`.
+
+    Kategori untuk kode berulang (RT, blok, jenis kelamin), float32 untuk ukuran,
+    Int16 nullable untuk tensi/gula/kolesterol, dan datetime64 untuk tanggal.
+    Kolom yang tidak ada di `df` (karena proyeksi) dilewati.
+
+    Returns:
+        pd.DataFrame: Salinan bertipe ringkas; `df.attrs["memori"]` berisi
+        `{"sebelum": byte, "sesudah": byte}` (lihat `ringkasan_memori`).
+    """
+    sebelum = int(df.memory_usage(deep=True).sum())
+    hasil = df.copy()
+    for kolom, tipe in SKEMA.get(table_name, {}).items():
+        if kolom in hasil.columns:
+            hasil[kolom] = _ubah_kolom(hasil[kolom], tipe)
+    hasil.attrs["memori"] = {"sebelum": sebelum, "sesudah": int(hasil.memory_usage(deep=True).sum())}
+    return hasil
+
+
+def ringkasan_memori(df):
+    """Teks penghematan memori satu frame, misal "1.20 MB -> 0.41 MB (hemat 66%)"; kosong bila tidak tercatat."""
+    memori = df.attrs.get("memori")
+    if not memori or not memori["sebelum"]:
+        return ""
+    hemat = 1 - memori["sesudah"] / memori["sebelum"]
+    return f"{memori['sebelum'] / 2**20:.2f} MB -> {memori['sesudah'] / 2**20:.2f} MB (hemat {hemat:.0%})"
+
+
+def untuk_tampilan(df):
+    """
+    Salinan `df` dengan kolom float32 dikembalikan ke float64 yang dibulatkan `DESIMAL_UKURAN`.
+
+    Dipakai sebelum nilai ukur ditampilkan, dicetak, atau diisikan ke form edit,
+    agar 65.3 tidak muncul sebagai 65.30000305.
+    """
+    kolom_float32 = [kolom for kolom, tipe in df.dtypes.items() if tipe == np.float32]
+    if not kolom_float32:
+        return df
+    hasil = df.copy()
+    for kolom in kolom_float32:
+        hasil[kolom] = hasil[kolom].astype(float).round(DESIMAL_UKURAN)
+    return hasil
@@ -0,0 +1,135 @@
+# supabase_pool.py
+import importlib.util
+import os
+import threading
+import time
+from typing import Optional
+
+import httpx
+import streamlit as st
+from supabase import Client, ClientOptions, create_client
+
+# ==============================================================================
+# POOL KONEKSI SUPABASE BERSAMA (SATU PER PROSES)
+# ==============================================================================
+
+# Batas koneksi HTTP ke Supabase untuk seluruh sesi dalam satu proses
+BATAS_KONEKSI_DEFAULT = 20
+# Berapa lama koneksi menganggur dipertahankan (keep-alive)
+KEEPALIVE_DETIK = 60
+# Timeout per request; menunggu slot koneksi kosong termasuk `pool`
+TIMEOUT_HTTP = httpx.Timeout(30.0, connect=10.0, pool=30.0)
+# Health check dilakukan paling sering sekali per interval ini
+INTERVAL_CEK_DETIK = 60
+
+
+def _pengaturan(nama: str, default):
+    """Nilai dari env, lalu secrets, lalu `default`."""
+    nilai = os.environ.get(nama)
+    if nilai is None:
+        try:
+            nilai = st.secrets.get(nama)
+        except Exception:
+            nilai = None
+    return default if nilai is None else nilai
+
+
+def buat_http_client(max_connections: int = BATAS_KONEKSI_DEFAULT, http2: Optional[bool] = None) -> httpx.Client:
+    """
+    Client httpx dengan keep-alive dan jumlah koneksi terbatas.
+
+    Args:
+        max_connections (int): Jumlah koneksi bersamaan paling banyak; request
+            berikutnya menunggu slot kosong (paling lama `TIMEOUT_HTTP.pool`).
+            Semua koneksi boleh tetap terbuka selama `KEEPALIVE_DETIK`.
+        http2 (bool, opsional): Default: HTTP/2 bila paket `h2` terpasang, sehingga
+            banyak request berbagi satu koneksi TLS.
+    """
+    if http2 is None:
+        http2 = importlib.util.find_spec("h2") is not None
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=KEEPALIVE_DETIK,
+        ),
+        timeout=TIMEOUT_HTTP,
+        follow_redirects=True,
+    )
+
+
+class SupabasePool:
+    """
+    Koneksi Supabase bersama untuk semua sesi dalam satu proses.
+
+    Semua client memakai satu `httpx.Client`, sehingga koneksi TLS dipakai ulang
+    antar sesi dan jumlahnya dibatasi. Client service (kunci super admin) dibagi
+    oleh semua sesi yang sudah login; client publik untuk login dibuat baru per
+    percobaan login agar status auth satu pengguna tidak terbawa ke sesi lain,
+    tetapi tetap meminjam koneksi dari pool yang sama.
+    """
+
+    def __init__(self, url: str, anon_key: str, service_key: str, http_client: Optional[httpx.Client] = None):
+        self.url = url
+        self.anon_key = anon_key
+        self.http = http_client or buat_http_client()
+        self.service = self._client(service_key)
+        self._lock = threading.Lock()
+        self._cek_terakhir = time.monotonic()
+
+    def _client(self, key: str) -> Client:
+        # Tanpa refresh token otomatis: tidak ada timer per client, sesi login tidak dipakai untuk query
+        options = ClientOptions(httpx_client=self.http, auto_refresh_token=False, persist_session=False)
+        return create_client(self.url, key, options=options)
+
+    def client_login(self) -> Client:
+        """Client publik (anon key) untuk satu percobaan login."""
+        return self._client(self.anon_key)
+
+    def sehat(self) -> bool:
+        """
+        Health check: satu query kecil ke Supabase, paling sering sekali per `INTERVAL_CEK_DETIK`.
+
+        Returns:
+            bool: False bila query gagal; pool lalu dibuat ulang oleh `get_supabase_pool`.
+        """
+        with self._lock:
+            if time.monotonic() - self._cek_terakhir < INTERVAL_CEK_DETIK:
+                return True
+            try:
+                self.service.table("warga").select("id").limit(1).execute()
+            except Exception:
+                return False
+            self._cek_terakhir = time.monotonic()
+            return True
+
+
+# Pool yang gagal health check tidak ditutup: sesi lain mungkin sedang memakainya,
+# dan koneksinya dilepas sendiri begitu pool lama tidak dirujuk lagi.
+@st.cache_resource(validate=lambda pool: pool.sehat(), show_spinner=False)
+def get_supabase_pool() -> SupabasePool:
+    """
+    Pool koneksi Supabase bersama (satu per proses), diambil dari secrets.
+
+    Jumlah koneksi diatur lewat env/secrets `SUPABASE_MAX_CONNECTIONS`
+    (default `BATAS_KONEKSI_DEFAULT`).
+    """
+    http = buat_http_client(int(_pengaturan("SUPABASE_MAX_CONNECTIONS", BATAS_KONEKSI_DEFAULT)))
+    return SupabasePool(
+        st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"], st.secrets["SUPABASE_SERVICE_KEY"], http_client=http,
+    )
+
+
+def client_sesi() -> Optional[Client]:
+    """
+    Client Supabase untuk sesi ini, atau None bila belum login.
+
+    Sesi yang login lewat pool (`st.session_state.supabase_pool`) selalu
+    meminjam client service terbaru dari `get_supabase_pool`, sehingga pool
+    yang dibuat ulang setelah health check gagal langsung dipakai. Client
+    yang dipasang langsung di `st.session_state.supabase_client` dipakai apa adanya.
+    """
+    if st.session_state.get("supabase_pool"):
+        st.session_state.supabase_client = get_supabase_pool().service
+    return st.session_state.get("supabase_client")
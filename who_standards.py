@@ -0,0 +1,319 @@
+# who_standards.py
+# Penyimpanan ringkas tabel standar pertumbuhan WHO (0-5 tahun).
+#
+# Ke-16 file data/*_zscores.xlsx dikompilasi menjadi satu artefak NumPy
+# (data/who_standards.npz) yang dimuat dalam hitungan milidetik. Bila artefak
+# hilang atau sudah tidak cocok dengan file xlsx (hash berbeda), loader
+# otomatis kembali membaca xlsx.
+#
+# Bangun ulang artefak setelah mengganti file xlsx:
+#     python who_standards.py build
+# Periksa bahwa artefak dan xlsx memberi nilai identik:
+#     python who_standards.py verify
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+STORE_PATH = os.path.join(DATA_DIR, "who_standards.npz")
+
+# Kunci meta di dalam artefak; kunci tabel = nama file tanpa .xlsx
+_KUNCI_META = "__meta__"
+
+
+def _daftar_file_xlsx(data_dir=DATA_DIR):
+    return sorted(f for f in os.listdir(data_dir) if f.endswith("zscores.xlsx"))
+
+
+def _hash_file(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _hash_sumber(data_dir=DATA_DIR):
+    """Hash isi setiap file xlsx; dipakai untuk mendeteksi artefak yang usang."""
+    return {f: _hash_file(os.path.join(data_dir, f)) for f in _daftar_file_xlsx(data_dir)}
+
+
+def build_who_store(data_dir=DATA_DIR, out_path=STORE_PATH):
+    """
+    Mengompilasi semua tabel WHO xlsx menjadi satu file .npz.
+
+    Setiap tabel disimpan sebagai satu array 2D float64 dengan kunci
+    "<indikator>_<gender>_<kelompok umur>_zscores", ditambah meta berisi
+    urutan kolom dan hash file sumber.
+
+    Returns:
+        str: Path artefak yang ditulis.
+    """
+    arrays = {}
+    kolom_per_tabel = {}
+    for nama_file in _daftar_file_xlsx(data_dir):
+        df = pd.read_excel(os.path.join(data_dir, nama_file))
+        stem = nama_file[:-len(".xlsx")]
+        kolom_per_tabel[stem] = list(df.columns)
+        arrays[stem] = df.to_numpy(dtype=np.float64)
+    meta = {"kolom": kolom_per_tabel, "sumber": _hash_sumber(data_dir)}
+    arrays[_KUNCI_META] = np.array(json.dumps(meta))
+    # Tanpa kompresi: artefak kecil dan dimuat lebih cepat
+    np.savez(out_path, **arrays)
+    return out_path
+
+
+@lru_cache(maxsize=1)
+def _muat_store(store_path=STORE_PATH, data_dir=DATA_DIR):
+    """Memuat artefak sekali per proses sebagai {stem: (array, kolom)}; None jika tidak ada atau usang."""
+    if not os.path.exists(store_path):
+        return None
+    with np.load(store_path) as npz:
+        meta = json.loads(str(npz[_KUNCI_META]))
+        if meta["sumber"] != _hash_sumber(data_dir):
+            return None
+        return {stem: (npz[stem], kolom) for stem, kolom in meta["kolom"].items()}
+
+
+def load_who_table(file_name, data_dir=DATA_DIR):
+    """
+    Mengembalikan tabel standar WHO untuk satu file (misal "wfa_boys_0-to-5-years_zscores.xlsx").
+
+    Dibaca dari artefak .npz bila tersedia dan masih cocok; jika tidak, dari xlsx.
+
+    Raises:
+        FileNotFoundError: Bila tabel tidak ada di artefak maupun sebagai xlsx.
+    """
+    nama_file = os.path.basename(file_name)
+    store = _muat_store()
+    stem = nama_file[:-len(".xlsx")] if nama_file.endswith(".xlsx") else nama_file
+    if store is not None and stem in store:
+        array, kolom = store[stem]
+        return pd.DataFrame(array.copy(), columns=kolom)
+    return pd.read_excel(os.path.join(data_dir, nama_file))
+
+
+# ==============================================================================
+# MESIN Z-SCORE LMS
+# ==============================================================================
+
+# Tabel penyusun tiap indikator; indikator berbasis umur dengan dua tabel
+# memakai tabel 0-2 tahun untuk x < 24 bulan dan tabel 2-5 tahun untuk x >= 24.
+_INDIKATOR = {
+    "wfa": [("wfa_{g}_0-to-5-years_zscores", "Month")],
+    "lhfa": [("lhfa_{g}_0-to-2-years_zscores", "Month"), ("lhfa_{g}_2-to-5-years_zscores", "Month")],
+    "bmi": [("bmi_{g}_0-to-2-years_zscores", "Month"), ("bmi_{g}_2-to-5-years_zscores", "Month")],
+    "hcfa": [("hcfa_{g}_0-to-5-years-zscores", "Month")],
+    "wfl": [("wfl_{g}_0-to-2-years_zscores", "Length")],
+    "wfh": [("wfh_{g}_2-to-5-years_zscores", "Height")],
+}
+
+# Indikator yang memakai penyesuaian WHO untuk |z| > 3 (distribusi miring)
+_INDIKATOR_DIBATASI = {"wfa", "bmi", "wfl", "wfh"}
+
+KOLOM_SD = {"SD3neg": -3, "SD2neg": -2, "SD1neg": -1, "SD0": 0, "SD1": 1, "SD2": 2, "SD3": 3}
+
+
+@lru_cache(maxsize=None)
+def _segmen(indikator, gender):
+    """Array x, L, M, S per tabel penyusun indikator untuk satu jenis kelamin ('L'/'P')."""
+    g = "girls" if gender in ("P", "girls") else "boys"
+    segmen = []
+    for pola, kolom_x in _INDIKATOR[indikator]:
+        # Beberapa berkas sumber memiliki spasi di nama kolom (mis. "M       ")
+        df = load_who_table(pola.format(g=g)).rename(columns=str.strip)
+        df = df.sort_values(kolom_x).drop_duplicates(kolom_x)
+        segmen.append({
+            "x": df[kolom_x].to_numpy(float),
+            "L": df["L"].to_numpy(float), "M": df["M"].to_numpy(float), "S": df["S"].to_numpy(float),
+        })
+    return segmen
+
+
+def _pilih_segmen(segmen, x):
+    """Indeks segmen untuk setiap x (0 kecuali x >= awal segmen kedua)."""
+    if len(segmen) == 1:
+        return np.zeros(x.shape, dtype=int)
+    return (x >= segmen[1]["x"][0]).astype(int)
+
+
+def lms(indikator, gender, x):
+    """
+    Parameter L, M, S hasil interpolasi linear tabel WHO pada titik-titik x.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: L, M, S (NaN di luar rentang tabel).
+    """
+    x = np.asarray(x, dtype=float)
+    segmen = _segmen(indikator, gender)
+    pilihan = _pilih_segmen(segmen, x)
+    L, M, S = (np.full(x.shape, np.nan) for _ in range(3))
+    for i, seg in enumerate(segmen):
+        m = (pilihan == i) & (x >= seg["x"][0]) & (x <= seg["x"][-1])
+        L[m] = np.interp(x[m], seg["x"], seg["L"])
+        M[m] = np.interp(x[m], seg["x"], seg["M"])
+        S[m] = np.interp(x[m], seg["x"], seg["S"])
+    return L, M, S
+
+
+def _nilai_sd(L, M, S, z):
+    """Nilai pengukuran pada z-score tertentu: M * (1 + L*S*z)^(1/L)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(np.abs(L) < 1e-12, M * np.exp(S * z), M * (1 + L * S * z) ** (1 / L))
+
+
+def zscore(indikator, gender, x, y):
+    """
+    Menghitung z-score WHO dengan metode LMS untuk satu atau banyak pengukuran sekaligus.
+
+    Args:
+        indikator (str): "wfa", "lhfa", "bmi", "hcfa", "wfl" (BB/PB) atau "wfh" (BB/TB).
+        gender (str): 'L' atau 'P'.
+        x: Umur dalam bulan (indikator berbasis umur) atau panjang/tinggi badan (cm).
+        y: Nilai pengukuran (kg, cm, atau kg/m²).
+
+    Returns:
+        float | np.ndarray: z-score; NaN bila y <= 0 atau x di luar rentang tabel.
+    """
+    L, M, S = lms(indikator, gender, x)
+    y = np.asarray(y, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        y = np.where(y > 0, y, np.nan)
+        z = np.where(np.abs(L) < 1e-12, np.log(y / M) / S, ((y / M) ** L - 1) / (L * S))
+        if indikator in _INDIKATOR_DIBATASI:
+            sd3, sd2 = _nilai_sd(L, M, S, 3), _nilai_sd(L, M, S, 2)
+            sd3neg, sd2neg = _nilai_sd(L, M, S, -3), _nilai_sd(L, M, S, -2)
+            z = np.where(z > 3, 3 + (y - sd3) / (sd3 - sd2), z)
+            z = np.where(z < -3, -3 + (y - sd3neg) / (sd2neg - sd3neg), z)
+    return float(z) if z.ndim == 0 else z
+
+
+def kurva_sd(indikator, gender, x):
+    """Nilai garis SD3neg..SD3 pada titik-titik x, sebagai dict {nama kolom: array}."""
+    L, M, S = lms(indikator, gender, x)
+    return {kolom: _nilai_sd(L, M, S, z) for kolom, z in KOLOM_SD.items()}
+
+
+def rentang_x(indikator, gender, x_acuan):
+    """Rentang x (min, max) tabel yang dipakai untuk titik `x_acuan`."""
+    segmen = _segmen(indikator, gender)
+    seg = segmen[int(_pilih_segmen(segmen, np.asarray([x_acuan], dtype=float))[0])]
+    return float(seg["x"][0]), float(seg["x"][-1])
+
+
+# --- FUNGSI INTERPRETASI STATUS GIZI (BERDASARKAN Z-SCORE) ---
+_DI_LUAR_RENTANG = ("Di luar rentang standar WHO", 'gray')
+
+# Aturan kategori per indikator, dari z tertinggi ke terendah:
+# (batas z, inklusif (>=) atau tidak (>), label, warna). Dipakai bersama oleh
+# interpretasi per anak (get_interpretation_*) dan klasifikasi massal (kategori_z).
+_KATEGORI_BB_TB = [
+    (3, False, "Gizi lebih (Obesitas)", 'red'),
+    (2, False, "Berisiko gizi lebih (Overweight)", 'yellow'),
+    (-2, True, "Gizi baik (Normal)", 'darkgreen'),
+    (-3, True, "Gizi kurang (Wasting)", 'yellow'),
+    (-np.inf, True, "Gizi buruk (Severe Wasting)", 'red'),
+]
+KATEGORI_Z = {
+    "wfa": [
+        (3, False, "Berat badan sangat lebih", 'red'),
+        (2, False, "Berat badan lebih", 'yellow'),
+        (-2, True, "Berat badan normal", 'darkgreen'),
+        (-3, False, "Berat badan kurang", 'yellow'),
+        (-np.inf, True, "Berat badan sangat kurang (Underweight)", 'red'),
+    ],
+    "wfh": _KATEGORI_BB_TB,
+    "wfl": _KATEGORI_BB_TB,
+    "bmi": _KATEGORI_BB_TB,
+    "lhfa": [
+        (2, False, "Tinggi", 'forestgreen'),
+        (-2, True, "Normal", 'darkgreen'),
+        (-3, True, "Pendek (Stunting)", 'yellow'),
+        (-np.inf, True, "Sangat Pendek (Severe Stunting)", 'red'),
+    ],
+    "hcfa": [
+        (2, False, "Makrosefali", 'yellow'),
+        (-2, True, "Normal", 'darkgreen'),
+        (-np.inf, True, "Mikrosefali", 'yellow'),
+    ],
+}
+
+
+def _interpretasi(indikator: str, z: float) -> Tuple[str, str]:
+    for batas, inklusif, label, warna in KATEGORI_Z[indikator]:
+        if (z >= batas) if inklusif else (z > batas):
+            return label, warna
+    return _DI_LUAR_RENTANG
+
+
+def kategori_z(indikator, z):
+    """
+    Klasifikasi status gizi untuk banyak z-score sekaligus.
+
+    Returns:
+        np.ndarray: Label kategori per elemen; z NaN diberi label di luar rentang.
+    """
+    z = np.asarray(z, dtype=float)
+    aturan = KATEGORI_Z[indikator]
+    with np.errstate(invalid="ignore"):
+        kondisi = [(z >= batas) if inklusif else (z > batas) for batas, inklusif, _, _ in aturan]
+    return np.select(kondisi, [label for _, _, label, _ in aturan], default=_DI_LUAR_RENTANG[0])
+
+
+def get_interpretation_wfa(z: float) -> Tuple[str, str]:
+    return _interpretasi("wfa", z)
+
+def get_interpretation_wfh(z: float) -> Tuple[str, str]:
+    return _interpretasi("wfh", z)
+
+def get_interpretation_bmi(z: float) -> Tuple[str, str]:
+    return _interpretasi("bmi", z)
+
+def get_interpretation_lhfa(z: float) -> Tuple[str, str]:
+    return _interpretasi("lhfa", z)
+
+def get_interpretation_hcfa(z: float) -> Tuple[str, str]:
+    return _interpretasi("hcfa", z)
+
+
+def verify_who_store(store_path=STORE_PATH, data_dir=DATA_DIR):
+    """
+    Membandingkan setiap tabel di artefak dengan file xlsx sumbernya.
+
+    Returns:
+        list[str]: Daftar perbedaan; kosong berarti kedua sumber identik.
+    """
+    if not os.path.exists(store_path):
+        return [f"Artefak tidak ditemukan: {store_path}"]
+    with np.load(store_path) as npz:
+        meta = json.loads(str(npz[_KUNCI_META]))
+        masalah = []
+        if meta["sumber"] != _hash_sumber(data_dir):
+            masalah.append("Hash file xlsx tidak cocok dengan artefak (artefak usang).")
+        for nama_file in _daftar_file_xlsx(data_dir):
+            stem = nama_file[:-len(".xlsx")]
+            df = pd.read_excel(os.path.join(data_dir, nama_file))
+            if meta["kolom"].get(stem) != list(df.columns):
+                masalah.append(f"{stem}: kolom berbeda")
+                continue
+            tersimpan = pd.DataFrame(npz[stem], columns=meta["kolom"][stem])
+            for kolom in df.columns:
+                if not np.array_equal(tersimpan[kolom].to_numpy(), df[kolom].to_numpy(dtype=np.float64), equal_nan=True):
+                    masalah.append(f"{stem}/{kolom}: nilai berbeda")
+    return masalah
+
+
+if __name__ == "__main__":
+    perintah = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if perintah == "build":
+        print(f"Artefak ditulis ke {build_who_store()}")
+    elif perintah == "verify":
+        masalah = verify_who_store()
+        print("\n".join(masalah) if masalah else "OK: artefak identik dengan file xlsx.")
+        sys.exit(1 if masalah else 0)
+    else:
+        print("Penggunaan: python who_standards.py [build|verify]")
+        sys.exit(2)